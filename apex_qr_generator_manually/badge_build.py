@@ -0,0 +1,507 @@
+"""
+The batch run both generators share.
+
+generate_qr.py and generate_student_qr.py each used to carry their own copy
+of the batch loop, watch mode and command line, and the copies drifted (the
+student --auto-ecc preview, for one, tuned every code as if it had no logo
+disc whatever the spec said). Each script now keeps only its roster and
+badge specifics and describes them with a BadgeKind; everything else is
+here:
+
+    EVENT_BADGES = BadgeKind(noun='events', ..., spec=event_spec, render=render_event_badge, ...)
+    if __name__ == "__main__":
+        main(EVENT_BADGES, "Generate event QR badges")
+
+A kind's render function runs in worker processes, so it must be a module-
+level function of its script; the other callables only run in the main
+process.
+"""
+import argparse
+import itertools
+import os
+import sys
+from collections import namedtuple
+from functools import partial
+from pathlib import Path
+
+from badge_engine import (QR_BORDER, RASTER_BACKENDS, badge_image, badge_svg, encode_badge, logo_disc_size,
+                          qr_image_kwargs, render_badge)
+from badge_pool import run_batch, resolve_workers, Throughput, format_worker_peaks
+from badge_watch import DEFAULT_DEBOUNCE, DEFAULT_LATENCY_BUDGET, WatchedBuild, watch_build
+from build_manifest import BuildManifest
+from compact_payload import (DecodeTable, default_decode_table, describe_decode_table, format_footprint,
+                             payload_footprint)
+from ecc_tuner import describe_choice, parse_recovery_margin, tune_qr
+from image_output import (DEFAULT_COMPRESS_LEVEL, PNG_STRATEGIES, RASTER_FORMATS, format_encoders,
+                          measure_encoders, save_badge)
+from matrix_cache import ENCODERS, MEMORY_CACHE, get_matrix_cache
+from native_render import measure_native_savings, format_savings
+from output_sink import SINKS, open_sink
+from print_sheet import PAGE_SIZES, PrintSheets, RosterOrder
+from roster_input import FORMATS as ROSTER_FORMATS, describe_source
+from shard_manifest import ShardManifest, parse_shard
+from stage_timer import StageReport, report_path, stage, timed_render
+from supabase_roster import DEFAULT_CONNECTIONS, DEFAULT_PAGE_SIZE, RosterFetchError, is_postgrest
+from svg_render import SVG_LOGO_MODES
+
+OUTPUT_FORMATS = RASTER_FORMATS + ('svg',)
+
+# What a generator tells the batch run about its badges:
+#   noun, badges   'events' / 'QR codes': how progress lines count rows and badges
+#   title          banner name of the script
+#   app_url        where the badges point, for the banner
+#   data_name      the built-in roster variable (EVENTS_DATA), for help and errors
+#   output_dir     badge folder (shards and archives go next to it)
+#   logo_dir       logo folder to check and watch, or None for badges without logos
+#   route          DecodeTable prefix of the app route --compact URLs use
+#   recovery_margin  --recovery-margin default
+#   rows(input_path, input_format, page_size, connections)  -> validated rows
+#   key(row) -> ID, label(row) -> name for error messages, logo_name(row) or None
+#   spec(row, compact) -> BadgeSpec, filename(row, output_format) -> file name
+#   digest(row, style, compact) -> input digest for the build manifest
+#   fingerprint(raster, native, recovery_margin, [svg_logo,] png_options) -> style dict
+#   render(row, output_dir, compact, **write_badge options) -> (filename, notes)
+#   details, empty_help, tips  extra banner lines, lines printed for an empty roster, closing tips
+BadgeKind = namedtuple(
+    'BadgeKind',
+    'noun badges title app_url data_name output_dir logo_dir route recovery_margin '
+    'rows key label logo_name spec filename digest fingerprint render details empty_help tips',
+)
+
+
+def write_badge(spec, output_dir, filename, raster='pil', native=False, logo_cache_dir=None,
+                matrix_cache_dir=None, encoder='qrcode', recovery_margin=None, output_format='png',
+                svg_logo='embed', png_compress_level=DEFAULT_COMPRESS_LEVEL, png_strategy='auto'):
+    """Encode a badge spec and save it as output_dir/filename in output_format"""
+    with stage('encode'):
+        qr = encode_badge(spec, matrix_cache_dir, encoder, recovery_margin)
+
+    filepath = os.path.join(output_dir, filename)
+    if output_format == 'svg':
+        with stage('svg'):
+            badge = badge_svg(qr, spec, svg_logo, output_dir, logo_cache_dir)
+        with stage('save'):
+            badge.save(filepath)
+        return
+
+    final_img = badge_image(qr, spec, raster, native, logo_cache_dir)
+
+    # Save final image (palette or 1-bit PNG where the colours allow)
+    with stage('save'):
+        save_badge(final_img, filepath, output_format, png_compress_level, png_strategy)
+
+
+def build_style(kind, raster, native, recovery_margin=None, output_format='png', svg_logo='embed',
+                png_compress_level=DEFAULT_COMPRESS_LEVEL, png_strategy='auto'):
+    """The kind's style fingerprint for these options (only what changes the output file)"""
+    options = {}
+    if output_format == 'svg' and kind.logo_dir:
+        options['svg_logo'] = svg_logo
+    if output_format == 'png':
+        options['png_options'] = (png_compress_level, png_strategy)
+    return kind.fingerprint(raster, native, recovery_margin, **options)
+
+
+def plan_builds(kind, rows, manifest, style, force, wanted, compact=False, decode_table=None,
+                output_format='png'):
+    """
+    Pass on only the rows whose badge is missing or stale.
+
+    Every row seen is noted in wanted (filename -> input digest), so the
+    caller can record fresh builds and prune orphans afterwards, and in
+    decode_table if one is given.
+    """
+    for row in rows:
+        if decode_table is not None:
+            decode_table.add(kind.key(row))
+        filename = kind.filename(row, output_format)
+        wanted[filename] = kind.digest(row, style, compact)
+        if force or not manifest.is_fresh(filename, wanted[filename]):
+            yield row
+
+
+def check_logo_dir(kind):
+    """False (with a message) if the kind has a logo folder and it is missing"""
+    if kind.logo_dir and not Path(kind.logo_dir).exists():
+        print(f"❌ Logo directory not found: {kind.logo_dir}")
+        print(f"   Please create the directory and add club logos")
+        return False
+    return True
+
+
+def generate_badges(kind, workers=1, chunksize=None, raster='pil', native=False,
+                    logo_cache_dir=None, force=False, input_path=None, input_format=None,
+                    matrix_cache_dir=None, encoder='qrcode', compact=False, decode_table_file=None,
+                    recovery_margin=None, output_format='png', svg_logo='embed',
+                    png_compress_level=DEFAULT_COMPRESS_LEVEL, png_strategy='auto', encode_report=False,
+                    print_sheet=None, sheet_size='a4', sheet_up=8, sink='dir',
+                    profile=False, cprofile_dir=None, fetch_page_size=DEFAULT_PAGE_SIZE,
+                    fetch_connections=DEFAULT_CONNECTIONS, shard=None):
+    """Generate the badges of every row in the kind's roster"""
+
+    # Create output directory (one per shard, so shards never prune each other's badges)
+    output_dir = shard.output_dir(kind.output_dir) if shard else kind.output_dir
+    Path(output_dir).mkdir(exist_ok=True)
+
+    if not check_logo_dir(kind):
+        return
+
+    print(f"🚀 {kind.title} (Enhanced with Vercel-style Position Markers)")
+    print("=" * 60)
+    print(f"📱 App URL: {kind.app_url}")
+    print(f"📥 {kind.noun.capitalize()} from: {describe_source(input_path)}")
+    print(f"📁 Output folder: {output_dir}/")
+    if shard:
+        print(f"🧩 Shard: {shard} ({kind.noun} whose ID hashes to it)")
+    for line in kind.details:
+        print(line)
+    print(f"✨ QR Style: Vercel-style with rounded position markers\n")
+
+    # Rows are streamed: rendering starts with the first one
+    rows = kind.rows(input_path, input_format, fetch_page_size, fetch_connections)
+    try:
+        first_row = next(rows, None)
+    except (RosterFetchError, OSError, ValueError) as e:
+        print(f"❌ Can't read the roster: {e}")
+        sys.exit(1)
+    if first_row is None:
+        for line in kind.empty_help:
+            print(line)
+        return
+    rows = itertools.chain([first_row], rows)
+    first_spec = kind.spec(first_row, compact)
+
+    # Compact payloads: show what they save on the first code, collect short IDs
+    decode_table = None
+    if compact:
+        current = payload_footprint(kind.spec(first_row).url)
+        print(format_footprint(current, payload_footprint(first_spec.url)))
+        decode_table = DecodeTable(kind.route)
+
+    # Show what --auto-ecc picks for the first code (tuned as make_qr does, around its logo disc)
+    if recovery_margin is not None:
+        style = first_spec.style
+        disc_size = logo_disc_size(style) if first_spec.logo_path else 0
+        try:
+            version, error_correction = tune_qr(first_spec.url, disc_size, style.qr_size, QR_BORDER,
+                                                recovery_margin)
+        except ValueError as e:
+            print(f"❌ --recovery-margin {recovery_margin}: {e}")
+            sys.exit(1)
+        print(f"🎚️  Auto ECC: {describe_choice(version, error_correction, disc_size, style.qr_size)} "
+              f"(always H: version {payload_footprint(first_spec.url)[1]})")
+
+    # Time native vs resized rendering once on the first code
+    savings = None
+    if native:
+        first_qr = encode_badge(first_spec, encoder=encoder, recovery_margin=recovery_margin)
+        savings = measure_native_savings(first_qr, first_spec.style.qr_size, **qr_image_kwargs(raster))
+
+    # Encode the first badge every way it can be saved
+    encoders = None
+    if encode_report:
+        first_qr = encode_badge(first_spec, encoder=encoder, recovery_margin=recovery_margin)
+        first_img = badge_image(first_qr, first_spec, raster, native, logo_cache_dir)
+        encoders = measure_encoders(first_img, png_compress_level, png_strategy)
+
+    # Only render badges whose inputs changed since the last build
+    sink = open_sink(sink, output_dir)
+    manifest = BuildManifest.load(sink.path, store=sink)
+    wanted = {}
+    shard_manifest = None
+    if shard:
+        # Every shard's decode table still covers the whole roster, so any one can be deployed
+        shard_manifest = ShardManifest(shard, kind.output_dir, key=kind.key,
+                                       filename=lambda row: kind.filename(row, output_format))
+        rows = shard_manifest.select(rows, seen=decode_table.add if decode_table is not None else None)
+    style = build_style(kind, raster, native, recovery_margin, output_format, svg_logo,
+                        png_compress_level, png_strategy)
+    pending = plan_builds(kind, rows, manifest, style, force, wanted, compact, decode_table, output_format)
+
+    # Impose badges onto print sheets in roster order, unchanged ones included
+    sheets = None
+    if print_sheet:
+        sheets = PrintSheets(print_sheet, sheet_size, sheet_up)
+        roster = RosterOrder(wanted)
+        pending = roster.track(pending)
+
+    generated_count = 0
+    failed_count = 0
+    workers = resolve_workers(workers)
+    throughput = Throughput()
+    worker_peaks = {}
+
+    render = sink.wrap(partial(kind.render, output_dir=output_dir, compact=compact, raster=raster, native=native,
+                               logo_cache_dir=logo_cache_dir, matrix_cache_dir=matrix_cache_dir, encoder=encoder,
+                               recovery_margin=recovery_margin, output_format=output_format, svg_logo=svg_logo,
+                               png_compress_level=png_compress_level, png_strategy=png_strategy))
+
+    # Time each render stage in whichever process runs it
+    stage_report = None
+    if profile or cprofile_dir:
+        stage_report = StageReport(cprofile_dir)
+        render = partial(timed_render, render, profile_dir=cprofile_dir)
+    # A failed build leaves the previous archive as it was, and no scratch files behind.
+    # A roster that breaks off part way is incomplete, so nothing is pruned against it
+    try:
+        for row, result, error in run_batch(render, pending, workers, chunksize, worker_peaks, stage_report):
+            if error:
+                message, tb = error
+                print(f"❌ Error generating QR for {kind.label(row)}: {message}")
+                print(tb, end='')
+                failed_count += 1
+                if shard_manifest:
+                    shard_manifest.fail(row)
+                if sheets:
+                    sheets.add_files(sink.read, roster.up_to(kind.filename(row, output_format)))
+                continue
+
+            filename, notes = sink.store(result)
+            for note in notes:
+                print(note)
+
+            manifest.record(filename, wanted[filename])
+            generated_count += 1
+            print(f"✅ Generated: {filename}")
+            if sheets:
+                sheets.add_files(sink.read, roster.up_to(filename) + [filename])
+
+        # Unchanged badges after the last rendered one, then the last partial page
+        if sheets:
+            sheets.add_files(sink.read, roster.rest())
+            sheets.close()
+        sink.close(wanted)
+    except (RosterFetchError, OSError, ValueError) as e:
+        sink.abort()
+        if sheets:
+            sheets.abort()
+        print(f"❌ Build stopped after {generated_count} {kind.badges}, nothing pruned: {e}")
+        sys.exit(1)
+    except BaseException:
+        sink.abort()
+        if sheets:
+            sheets.abort()
+        raise
+
+    # Fold the per-worker matrix cache segments back together
+    if matrix_cache_dir:
+        get_matrix_cache(matrix_cache_dir).compact_if_fragmented()
+
+    # Remove badges for rows that are no longer in the roster
+    pruned = manifest.prune(wanted)
+    manifest.save()
+    if shard_manifest:
+        shard_path = shard_manifest.save(output_dir, wanted, sink.path)
+
+    # Short ID lookup for the app's /S/[id] and /C/[id] redirect routes
+    if decode_table is not None:
+        table_path = decode_table_file or default_decode_table(output_dir)
+        decode_table.save(table_path)
+        print(describe_decode_table(table_path))
+    for filename in pruned:
+        print(f"🧹 Removed orphan: {filename}")
+
+    skipped_count = len(wanted) - generated_count - failed_count
+
+    print("\n" + "=" * 60)
+    print(f"📋 Processed {len(wanted)} {kind.noun}")
+    print(f"🎉 Successfully generated {generated_count} {kind.badges}!")
+    if skipped_count:
+        print(f"♻️  Skipped {skipped_count} unchanged {kind.badges}")
+    print(throughput.report(generated_count, workers))
+    peaks = format_worker_peaks(worker_peaks)
+    if peaks:
+        print(peaks)
+    if savings:
+        print(format_savings(*savings, generated_count))
+    if encoders:
+        print(format_encoders(encoders))
+    if sheets:
+        print(sheets.summary())
+    if stage_report:
+        print(stage_report.format())
+        print(f"📊 Profile report: {stage_report.save(report_path(output_dir))}")
+        if cprofile_dir:
+            print(f"   cProfile stats: {Path(cprofile_dir) / 'combined.pstats'} (python -m pstats)")
+    print(sink.summary())
+    if shard_manifest:
+        print(shard_manifest.summary())
+        print(f"🧩 Shard manifest: {shard_path} (merge with: python shard_manifest.py {kind.output_dir})")
+    print("\n💡 Tips:")
+    for line in kind.tips:
+        print(f"  • {line}")
+
+
+def watch_badges(kind, workers=1, raster='pil', native=False, logo_cache_dir=None, force=False,
+                 input_path=None, input_format=None, matrix_cache_dir=None, encoder='qrcode',
+                 compact=False, decode_table_file=None, recovery_margin=None, output_format='png',
+                 svg_logo='embed', png_compress_level=DEFAULT_COMPRESS_LEVEL, png_strategy='auto',
+                 debounce=DEFAULT_DEBOUNCE, latency_budget=DEFAULT_LATENCY_BUDGET):
+    """Bring the kind's badges up to date, then re-render the ones each roster or logo change affects"""
+    Path(kind.output_dir).mkdir(exist_ok=True)
+    if not check_logo_dir(kind):
+        return
+
+    print(f"🚀 {kind.title} (watch mode)")
+    print("=" * 60)
+    print(f"📥 {kind.noun.capitalize()} from: {describe_source(input_path)}")
+    print(f"📁 Output folder: {kind.output_dir}/")
+    for line in kind.details:
+        print(line)
+
+    # QR matrices stay in memory between changes unless a cache folder was given
+    matrix_cache_dir = matrix_cache_dir or MEMORY_CACHE
+    style = build_style(kind, raster, native, recovery_margin, output_format, svg_logo,
+                        png_compress_level, png_strategy)
+
+    # The decode table always lists exactly the roster's rows
+    save_decode_table = None
+    if compact:
+        table_path = decode_table_file or default_decode_table(kind.output_dir)
+        print(describe_decode_table(table_path))
+
+        def save_decode_table(ids):
+            decode_table = DecodeTable(kind.route)
+            for badge_id in ids:
+                decode_table.add(badge_id)
+            decode_table.save(table_path)
+
+    build = WatchedBuild(
+        kind.output_dir, partial(kind.rows, input_path, input_format),
+        key=kind.key,
+        filename=lambda row: kind.filename(row, output_format),
+        digest=lambda row: kind.digest(row, style, compact),
+        render=partial(kind.render, output_dir=kind.output_dir, compact=compact, raster=raster, native=native,
+                       logo_cache_dir=logo_cache_dir, matrix_cache_dir=matrix_cache_dir, encoder=encoder,
+                       recovery_margin=recovery_margin, output_format=output_format, svg_logo=svg_logo,
+                       png_compress_level=png_compress_level, png_strategy=png_strategy),
+        logo_name=kind.logo_name,
+        on_roster=save_decode_table,
+        warm=lambda row: render_badge(kind.spec(row, compact), raster=raster, native=native, encoder=encoder,
+                                      matrix_cache_dir=matrix_cache_dir, recovery_margin=recovery_margin,
+                                      logo_cache_dir=logo_cache_dir),
+    )
+    try:
+        watch_build(build, input_path, kind.logo_dir, resolve_workers(workers), debounce, latency_budget, force)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+
+
+def parse_args(kind, description):
+    """The generators' shared command line (logo options only for kinds with a logo folder)"""
+    logos = bool(kind.logo_dir)
+    changes = "roster or logo change" if logos else "roster change"
+    parser = argparse.ArgumentParser(description=description)
+    parser.set_defaults(logo_cache=None, svg_logo='embed')
+    parser.add_argument('--workers', type=int, default=1,
+                        help="render in N worker processes (0 = one per CPU core)")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="badges handed to a worker at a time (default: automatic)")
+    parser.add_argument('--raster', choices=RASTER_BACKENDS, default='pil',
+                        help="module rasterizer: per-module PIL drawing or NumPy (faster)")
+    parser.add_argument('--native', action='store_true',
+                        help="draw straight at the badge's QR size instead of box_size=10 + LANCZOS resize")
+    if logos:
+        parser.add_argument('--logo-cache', metavar='DIR', default=None,
+                            help="also keep finished logo discs in DIR for later runs and workers")
+    parser.add_argument('--encoder', choices=ENCODERS, default='qrcode',
+                        help="mask pattern scoring: qrcode's pure Python or vectorized NumPy (same output, faster)")
+    parser.add_argument('--matrix-cache', metavar='DIR', default=None,
+                        help="reuse encoded QR matrices stored in DIR (style-only re-renders skip encoding)")
+    parser.add_argument('--input', metavar='PATH', default=None,
+                        help=f"read {kind.noun} from a CSV/TSV/JSONL file ('-' for stdin), 'supabase' (the "
+                        f"{kind.noun} table at $SUPABASE_URL) or a PostgREST table URL instead of {kind.data_name}")
+    parser.add_argument('--format', choices=ROSTER_FORMATS, default=None,
+                        help="input format (default: from the file extension, CSV for stdin)")
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE, metavar='N',
+                        help="rows per request when reading from Supabase/PostgREST (default: %(default)s)")
+    parser.add_argument('--fetch-connections', type=int, default=DEFAULT_CONNECTIONS, metavar='N',
+                        help="pooled connections, each paging its own key range (default: %(default)s)")
+    parser.add_argument('--compact', action='store_true',
+                        help="encode short uppercase URLs (QR alphanumeric mode, smaller version) with a JSON decode table")
+    parser.add_argument('--decode-table', metavar='PATH', default=None,
+                        help="where --compact writes the short ID table (default: the app's lib/compact-ids.json, "
+                        "which its /S/ and /C/ redirect routes read)")
+    parser.add_argument('--auto-ecc', action='store_true',
+                        help="pick the smallest QR version/error-correction level that stays readable "
+                        f"{'under the logo ' if logos else ''}instead of always H")
+    parser.add_argument('--recovery-margin', type=parse_recovery_margin, default=kind.recovery_margin, metavar='SHARE',
+                        help="with --auto-ecc: share of every error-correction block left spare, "
+                        "at least 0 and below 1 (default: %(default)s)")
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS, default='png',
+                        help="badge file format: palette, 1-bit or RGB PNG, lossless WebP, lossy AVIF (quality 100), "
+                        "or vector SVG (small, scales to any print size)")
+    if logos:
+        parser.add_argument('--svg-logo', choices=SVG_LOGO_MODES, default='embed',
+                            help="SVG badges: embed the logo disc as JPEG data, or link to the file in the logo folder")
+    parser.add_argument('--png-compress-level', type=int, choices=range(10), default=DEFAULT_COMPRESS_LEVEL,
+                        metavar='0-9', help="PNG zlib level: 1 is fastest, 9 smallest (default: %(default)s)")
+    parser.add_argument('--png-strategy', choices=PNG_STRATEGIES, default='auto',
+                        help="PNG zlib strategy (default: Pillow's choice for the image mode)")
+    parser.add_argument('--encode-report', action='store_true',
+                        help="time and size the first badge as RGB PNG, reduced PNG, WebP and AVIF")
+    parser.add_argument('--print-sheet', metavar='PDF', default=None,
+                        help="also impose the badges N-up with crop marks into a multi-page PDF for printing")
+    parser.add_argument('--sheet-size', choices=PAGE_SIZES, default='a4',
+                        help="print sheet paper size (default: %(default)s)")
+    parser.add_argument('--sheet-up', type=int, default=8, metavar='N',
+                        help="badges per print sheet page (default: %(default)s)")
+    parser.add_argument('--sink', choices=SINKS, default='dir',
+                        help="write loose files, one ZIP/TAR archive, or a sprite atlas with a JSON offset index "
+                        "(next to the output folder)")
+    parser.add_argument('--profile', action='store_true',
+                        help="time every render stage across workers: p50/p95/p99 report, "
+                        "plus JSON next to the output folder")
+    parser.add_argument('--cprofile', metavar='DIR', default=None,
+                        help="with --profile (implied): also dump cProfile stats per worker and merged into DIR")
+    parser.add_argument('--shard', type=parse_shard, default=None, metavar='I/N',
+                        help=f"render only the {kind.noun} whose ID hashes to shard I of N, into their own folder "
+                        "with a partial manifest for shard_manifest.py to merge")
+    parser.add_argument('--force', action='store_true',
+                        help="re-render every badge, even ones the build manifest says are up to date")
+    parser.add_argument('--watch', action='store_true',
+                        help=f"keep running: re-render only the badges each {changes} affects, "
+                        "with caches kept warm")
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE, metavar='SECONDS',
+                        help="with --watch: wait this long after the last change before rebuilding (default: %(default)s)")
+    parser.add_argument('--latency-budget', type=float, default=DEFAULT_LATENCY_BUDGET, metavar='SECONDS',
+                        help="with --watch: warn when a rebuild takes longer (default: %(default)s)")
+    args = parser.parse_args()
+    if args.watch and (args.input == '-' or is_postgrest(args.input)):
+        parser.error(f"--watch needs a roster file to watch (or the built-in {kind.data_name})")
+    if args.watch and (args.sink != 'dir' or args.print_sheet or args.shard or args.profile or args.cprofile
+                       or args.encode_report):
+        parser.error("--watch keeps loose files up to date: it can't be combined with --sink, --print-sheet, "
+                     "--shard, --profile, --cprofile or --encode-report")
+    if args.debounce < 0 or args.latency_budget <= 0:
+        parser.error("--debounce can't be negative and --latency-budget must be positive")
+    if args.print_sheet and args.output_format == 'svg':
+        parser.error("--print-sheet needs raster badges (--output-format png, webp or avif)")
+    if args.svg_logo == 'link' and args.output_format == 'svg' and args.sink != 'dir':
+        parser.error("--svg-logo link needs loose files: the links are relative to the output folder")
+    if args.sheet_up < 1:
+        parser.error("--sheet-up must be at least 1")
+    if args.page_size < 1 or args.fetch_connections < 1:
+        parser.error("--page-size and --fetch-connections must be at least 1")
+    return args
+
+
+def main(kind, description):
+    """A generator's command line: one batch run, or watch mode"""
+    args = parse_args(kind, description)
+    options = dict(workers=args.workers, raster=args.raster, native=args.native,
+                   logo_cache_dir=args.logo_cache, force=args.force,
+                   input_path=args.input, input_format=args.format,
+                   matrix_cache_dir=args.matrix_cache, encoder=args.encoder,
+                   compact=args.compact, decode_table_file=args.decode_table,
+                   recovery_margin=args.recovery_margin if args.auto_ecc else None,
+                   output_format=args.output_format, svg_logo=args.svg_logo,
+                   png_compress_level=args.png_compress_level, png_strategy=args.png_strategy)
+    if args.watch:
+        watch_badges(kind, debounce=args.debounce, latency_budget=args.latency_budget, **options)
+    else:
+        generate_badges(kind, chunksize=args.chunksize, encode_report=args.encode_report,
+                        print_sheet=args.print_sheet, sheet_size=args.sheet_size, sheet_up=args.sheet_up,
+                        sink=args.sink, profile=args.profile, cprofile_dir=args.cprofile,
+                        fetch_page_size=args.page_size, fetch_connections=args.fetch_connections,
+                        shard=args.shard, **options)
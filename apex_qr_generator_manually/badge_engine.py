@@ -0,0 +1,253 @@
+"""
+The badge renderer both generators share, importable on its own.
+
+generate_qr.py and generate_student_qr.py each used to carry their own copy
+of the Vercel-style image factory, the badge composition and the text
+layout, and none of it could be called without importing a whole script. A
+badge is now described by a BadgeSpec (QR payload, label lines, optional
+logo, BadgeStyle) and rendered here:
+
+    from badge_engine import BadgeSpec, render_badge
+    png = render_badge(BadgeSpec(url, ('Poetry Slam', 'English Club'), EVENT_STYLE, logo_path), 'png')
+
+render_badge returns the encoded file as bytes, or a PIL image without an
+output format. Importing this module loads neither PIL nor qrcode: the
+backends are imported on the first render. Everything they build (badge
+templates, fonts and label runs, logo discs, matrix cache handles) is cached
+per process, so a CLI, a pool worker or a long-running service pays for it
+once and every later badge renders warm.
+"""
+import io
+import os
+from collections import namedtuple
+
+from stage_timer import stage
+
+RASTER_BACKENDS = ('pil', 'numpy')
+
+MARKER_RADIUS_RATIO = 0.3  # Position-marker module corner radius, as a share of the module size
+QR_BOX_SIZE = 10  # Module size before any resize
+QR_BORDER = 4  # Quiet zone, in modules
+
+# One line of the text band: fonts tried in order, size, colour, bold
+LineStyle = namedtuple('LineStyle', 'font_files font_size color bold')
+
+# Everything about a badge's look; lines holds one LineStyle per label line
+BadgeStyle = namedtuple(
+    'BadgeStyle',
+    'qr_size corner_radius text_height lines line_spacing text_margin logo_size_percent logo_bg_padding',
+    defaults=(0, 0, 0, 0),
+)
+
+# One badge: the QR payload, the text of each label line, and a logo file (or None)
+BadgeSpec = namedtuple('BadgeSpec', 'url texts style logo_path', defaults=(None,))
+
+
+def logo_size(style):
+    """Logo diameter on the badge, in pixels"""
+    return int(style.qr_size * style.logo_size_percent)
+
+
+def logo_disc_size(style):
+    """Largest diameter the logo disc (logo plus white padding) can have, in pixels"""
+    return logo_size(style) + 2 * style.logo_bg_padding
+
+
+def make_qr(qr_url, style, matrix_cache_dir=None, encoder='qrcode', recovery_margin=None, with_logo=False):
+    """
+    Encode a URL as a QR code with high error correction.
+
+    With a matrix cache directory, payloads encoded before are rebuilt from
+    their stored module matrix instead of being encoded again. encoder picks
+    how the mask pattern is scored; the matrix is the same either way. With a
+    recovery margin the version and error-correction level are tuned for the
+    payload and logo instead of always using H.
+    """
+    import qrcode
+    from matrix_cache import cached_qr
+
+    version, error_correction = 1, qrcode.constants.ERROR_CORRECT_H  # Highest error correction
+    if recovery_margin is not None:
+        from ecc_tuner import tune_qr
+        disc_size = logo_disc_size(style) if with_logo else 0
+        version, error_correction = tune_qr(qr_url, disc_size, style.qr_size, QR_BORDER, recovery_margin)
+    return cached_qr(
+        qr_url,
+        matrix_cache_dir,
+        version=version,
+        error_correction=error_correction,
+        box_size=QR_BOX_SIZE,
+        border=QR_BORDER,
+        encoder=encoder,
+    )
+
+
+def encode_badge(spec, matrix_cache_dir=None, encoder='qrcode', recovery_margin=None):
+    """The QR code for a badge spec (tuned around its logo with a recovery margin)"""
+    return make_qr(spec.url, spec.style, matrix_cache_dir, encoder, recovery_margin,
+                   with_logo=spec.logo_path is not None)
+
+
+def qr_image_kwargs(raster):
+    """make_image arguments for the chosen rasterizer"""
+    if raster == 'numpy':
+        from numpy_raster import VercelStyleNumpyImage
+        return dict(image_factory=VercelStyleNumpyImage, radius_ratio=MARKER_RADIUS_RATIO)
+    from pil_raster import VercelStyleImage, VercelStyleModuleDrawer
+    return dict(
+        image_factory=VercelStyleImage,
+        vercel_drawer=VercelStyleModuleDrawer(MARKER_RADIUS_RATIO),
+        fill_color="black",
+        back_color="white"
+    )
+
+
+def place_qr_on_badge(qr_image, style):
+    """
+    Paste the QR code with rounded corners onto a blank badge (white text band below).
+
+    The badge is this process's reusable buffer, so it must be saved before
+    the next badge is started.
+    """
+    from badge_template import get_badge_template
+    template = get_badge_template(style.qr_size, style.text_height, style.corner_radius)
+    return template.compose(qr_image)
+
+
+def add_logo_to_qr(badge, logo_path, style, logo_cache_dir=None):
+    """Add a logo to the center of the QR code on a white circular background"""
+    from logo_cache import get_logo_cache
+
+    # Finished logo disc, built once per logo file and reused for every badge
+    background = get_logo_cache(logo_cache_dir).get(logo_path, logo_size(style), style.logo_bg_padding)
+    bg_size = background.size[0]
+
+    # Calculate position to center the logo on QR code
+    logo_pos = ((style.qr_size - bg_size) // 2, (style.qr_size - bg_size) // 2)
+
+    # Paste logo with white background onto QR code
+    badge.paste(background, logo_pos, background)
+    return badge
+
+
+def layout_text_below_qr(style, texts):
+    """
+    Label runs for the text band with their draw positions and colours:
+    [(run, (x, y), color, bold), ...]
+
+    Each text is set in its line's style and centred; the lines are centred
+    as a block in the text band.
+    """
+    from label_render import layout_label
+
+    # Fonts, measurements and glyphs are cached per string (club names repeat a lot)
+    max_width = style.qr_size - 2 * style.text_margin
+    runs = [(layout_label(text, line.font_files, line.font_size, max_width, bold=line.bold), line)
+            for text, line in zip(texts, style.lines)]
+
+    total_text_height = sum(run.height for run, _ in runs) + style.line_spacing * (len(runs) - 1)
+    y = style.qr_size + (style.text_height - total_text_height) // 2
+    layout = []
+    for run, line in runs:
+        layout.append((run, ((style.qr_size - run.width) // 2, y), line.color, line.bold))
+        y += run.height + style.line_spacing
+    return layout
+
+
+def add_text_below_qr(badge, style, texts):
+    """Draw the label lines onto the badge's text band"""
+    for run, position, color, _ in layout_text_below_qr(style, texts):
+        run.draw(badge, position, color)
+    return badge
+
+
+def render_qr_image(qr, style, raster='pil', native=False):
+    """The QR code drawn at the badge's QR size, natively or resized from QR_BOX_SIZE"""
+    from native_render import render_native, render_resized
+
+    if native:
+        return render_native(qr, style.qr_size, pad=False, **qr_image_kwargs(raster))
+    return render_resized(qr, style.qr_size, **qr_image_kwargs(raster))
+
+
+def badge_image(qr, spec, raster='pil', native=False, logo_cache_dir=None):
+    """
+    The finished raster badge for an encoded QR code.
+
+    This is the process's reusable badge buffer: save or copy it before the
+    next badge is rendered.
+    """
+    # Create QR code image with Vercel-style position markers
+    qr_img = render_qr_image(qr, spec.style, raster, native)
+
+    # Rounded-corner QR code on a blank badge
+    with stage('compose'):
+        final_img = place_qr_on_badge(qr_img, spec.style)
+
+    # Add logo if available
+    if spec.logo_path:
+        with stage('logo'):
+            add_logo_to_qr(final_img, spec.logo_path, spec.style, logo_cache_dir)
+
+    # Add the label lines below the QR code
+    with stage('text'):
+        add_text_below_qr(final_img, spec.style, spec.texts)
+    return final_img
+
+
+def badge_svg(qr, spec, svg_logo='embed', output_dir='.', logo_cache_dir=None):
+    """
+    The badge as an svg_render.SvgBadge: same layout as the raster badge,
+    with the logo disc embedded or linked (relative to output_dir)
+    """
+    from svg_render import SvgBadge, jpeg_data_uri
+
+    style = spec.style
+    badge = SvgBadge(style.qr_size, style.qr_size + style.text_height)
+    badge.add_qr(qr.modules, qr.border, style.qr_size, MARKER_RADIUS_RATIO)
+
+    if spec.logo_path:
+        if svg_logo == 'link':
+            href = os.path.relpath(spec.logo_path, output_dir).replace(os.sep, '/')
+            center = style.qr_size / 2
+            badge.add_disc_image(href, (center, center), logo_size(style), style.logo_bg_padding)
+        else:
+            from logo_cache import get_logo_cache
+            # The finished disc, placed exactly where add_logo_to_qr pastes it
+            background = get_logo_cache(logo_cache_dir).get(spec.logo_path, logo_size(style),
+                                                            style.logo_bg_padding)
+            bg_size = background.size[0]
+            center = (style.qr_size - bg_size) // 2 + bg_size / 2
+            badge.add_disc_image(jpeg_data_uri(background), (center, center), bg_size)
+
+    for run, position, color, bold in layout_text_below_qr(style, spec.texts):
+        badge.add_text(run, position, color, bold)
+    return badge
+
+
+def render_badge(spec, output_format=None, raster='pil', native=False, encoder='qrcode',
+                 matrix_cache_dir=None, recovery_margin=None, logo_cache_dir=None,
+                 png_compress_level=None, png_strategy='auto'):
+    """
+    Render one badge.
+
+    Returns the file as bytes for an output format ('png', 'webp', 'avif' or
+    'svg', with the logo embedded), or a PIL image of its own without one.
+    """
+    with stage('encode'):
+        qr = encode_badge(spec, matrix_cache_dir, encoder, recovery_margin)
+
+    if output_format == 'svg':
+        with stage('svg'):
+            return badge_svg(qr, spec, logo_cache_dir=logo_cache_dir).tostring().encode('utf-8')
+
+    image = badge_image(qr, spec, raster, native, logo_cache_dir)
+    if output_format is None:
+        return image.copy()
+
+    from image_output import DEFAULT_COMPRESS_LEVEL, save_badge
+    buffer = io.BytesIO()
+    with stage('save'):
+        save_badge(image, buffer, output_format,
+                   DEFAULT_COMPRESS_LEVEL if png_compress_level is None else png_compress_level, png_strategy)
+    return buffer.getvalue()
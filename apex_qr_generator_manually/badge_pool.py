@@ -0,0 +1,174 @@
+"""
+Process-pool batch runner shared by the QR badge generators.
+
+Rendering a badge is CPU-bound PIL / qrcode work, so a batch is fanned out
+across worker processes in chunks. Results are handed back in input order,
+and a badge that fails is reported back instead of aborting the whole batch.
+"""
+import os
+import sys
+import time
+import traceback
+from collections import deque
+
+import stage_timer
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Badges per task sent to a worker (amortises pickling / IPC overhead)
+DEFAULT_CHUNKSIZE = 8
+
+# How many chunks each worker may have queued before we wait for results.
+# Keeps memory bounded no matter how long the input list is.
+CHUNKS_IN_FLIGHT_PER_WORKER = 4
+
+
+def resolve_workers(workers):
+    """Turn the --workers value into a process count (0 means every core)"""
+    if workers is None or workers < 0:
+        return 1
+    if workers == 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def pick_chunksize(item_count, workers):
+    """Choose a chunk size that still gives every worker several chunks"""
+    if not item_count or workers <= 1:
+        return DEFAULT_CHUNKSIZE
+    return max(1, min(DEFAULT_CHUNKSIZE * 4, item_count // (workers * 4)))
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far, or None if unknown"""
+    # Linux: VmHWM is this process's own peak. ru_maxrss keeps the parent's
+    # RSS at fork time across exec, so a freshly spawned interpreter would
+    # report at least its parent's size
+    try:
+        with open('/proc/self/status', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes everywhere else
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _render_chunk(render_func, chunk):
+    """
+    Render every item of a chunk, capturing errors per item.
+
+    Runs inside the worker process. Returns (results, pid, peak_rss,
+    stage_samples) where results is a list of (result, error) pairs, error
+    is None or a (message, formatted traceback) tuple, and stage_samples is
+    the worker's stage_timer samples (None while timing is off).
+    """
+    results = []
+    for item in chunk:
+        try:
+            results.append((render_func(item), None))
+        except Exception as e:
+            results.append((None, (str(e), traceback.format_exc())))
+    return results, os.getpid(), peak_rss_bytes(), stage_timer.drain()
+
+
+def _iter_chunks(items, chunksize):
+    """Group any iterable into lists of at most chunksize items"""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _collect(chunk, chunk_result, worker_peaks, stage_report=None):
+    """Yield (item, result, error) triples for a finished chunk"""
+    results, pid, peak_rss, stage_samples = chunk_result
+    if worker_peaks is not None and peak_rss is not None:
+        worker_peaks[pid] = max(peak_rss, worker_peaks.get(pid, 0))
+    if stage_report is not None:
+        stage_report.add(pid, stage_samples)
+    for item, (result, error) in zip(chunk, results):
+        yield item, result, error
+
+
+def run_batch(render_func, items, workers=1, chunksize=None, worker_peaks=None, stage_report=None, pool=None):
+    """
+    Render items with render_func and yield (item, result, error) in input order.
+
+    With workers <= 1 everything runs in this process, exactly like the old
+    plain for loop. Otherwise chunks are submitted to a process pool;
+    render_func must be picklable (a module-level function or a
+    functools.partial of one). If worker_peaks is a dict it is filled with
+    the peak RSS in bytes of every process that rendered badges, by pid.
+    If stage_report is a stage_timer.StageReport, the stage timings each
+    process recorded are merged into it. pool, if given, is an open
+    ProcessPoolExecutor of that many workers to use instead of a new one, so
+    its workers and their caches outlive the batch.
+    """
+    if workers <= 1:
+        for item in items:
+            yield from _collect([item], _render_chunk(render_func, [item]), worker_peaks, stage_report)
+        return
+
+    if chunksize is None:
+        chunksize = pick_chunksize(len(items) if hasattr(items, '__len__') else 0, workers)
+
+    if pool is not None:
+        yield from _run_on_pool(pool, render_func, items, workers, chunksize, worker_peaks, stage_report)
+        return
+    from concurrent.futures import ProcessPoolExecutor  # single-process runs never need it
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from _run_on_pool(pool, render_func, items, workers, chunksize, worker_peaks, stage_report)
+
+
+def _run_on_pool(pool, render_func, items, workers, chunksize, worker_peaks, stage_report):
+    """run_batch's pool side: a bounded number of chunks in flight, results in input order"""
+    max_in_flight = workers * CHUNKS_IN_FLIGHT_PER_WORKER
+    pending = deque()
+    for chunk in _iter_chunks(items, chunksize):
+        pending.append((chunk, pool.submit(_render_chunk, render_func, chunk)))
+        if len(pending) >= max_in_flight:
+            done_chunk, future = pending.popleft()
+            yield from _collect(done_chunk, future.result(), worker_peaks, stage_report)
+    while pending:
+        done_chunk, future = pending.popleft()
+        yield from _collect(done_chunk, future.result(), worker_peaks, stage_report)
+
+
+class Throughput:
+    """Wall-clock timer for a batch that reports badges per second"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def report(self, count, workers):
+        elapsed = self.elapsed
+        rate = count / elapsed if elapsed > 0 else 0.0
+        return (f"⚡ Throughput: {rate:.1f} badges/s "
+                f"({count} in {elapsed:.2f}s, {workers} worker{'s' if workers != 1 else ''})")
+
+
+def format_worker_peaks(worker_peaks):
+    """One-line summary of the peak RSS of each rendering process, None if no process rendered anything"""
+    if not worker_peaks:
+        if peak_rss_bytes() is None:
+            return "🧠 Peak RSS per worker: not available on this platform"
+        return None
+    peaks = sorted(worker_peaks.values())
+    per_worker = ", ".join(f"{peak / 2**20:.0f}" for peak in peaks)
+    return f"🧠 Peak RSS per worker: max {peaks[-1] / 2**20:.1f} MB ({per_worker} MB)"
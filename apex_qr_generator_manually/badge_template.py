@@ -0,0 +1,95 @@
+"""
+Static layers shared by every badge, built once per configuration.
+
+Each badge used to allocate its own rounded-corner mask, an RGBA copy of the
+QR code, a transparent output image, an RGB copy composited on white and a
+fresh white canvas with the text band. None of that depends on the badge
+itself, only on QR_SIZE, TEXT_HEIGHT and QR_BORDER_RADIUS. A BadgeTemplate
+holds the corner mask and the blank badge (white frame around the rounded QR
+area plus the empty text band); a badge is then one copy of the blank with
+the QR code pasted through the mask.
+
+Batch rendering goes one step further with compose(): every badge in a
+process is drawn into the same preallocated buffer, which is reset from the
+blank instead of reallocated. The QR code, logo disc and text are all drawn
+straight into it, so a badge costs no full-size intermediate images.
+"""
+from functools import lru_cache
+
+from PIL import Image, ImageDraw
+
+
+class BadgeTemplate:
+    """Corner mask and blank badge canvas for one configuration"""
+
+    def __init__(self, qr_size, text_height, corner_radius):
+        self.qr_size = qr_size
+        self.text_height = text_height
+        self.corner_radius = corner_radius
+
+        # Rounded-corner mask for the QR area
+        self.corner_mask = Image.new('L', (qr_size, qr_size), 0)
+        draw = ImageDraw.Draw(self.corner_mask)
+        draw.rounded_rectangle([(0, 0), (qr_size, qr_size)], radius=corner_radius, fill=255)
+
+        # White badge: the frame outside the rounded corners and the text band
+        self.blank = Image.new('RGB', (qr_size, qr_size + text_height), 'white')
+
+        # Reusable output buffer for compose(), allocated on first use
+        self._buffer = None
+        # Corner-mask crops for native renders smaller than the QR area
+        self._mask_regions = {}
+
+    @property
+    def size(self):
+        return self.blank.size
+
+    def new_badge(self, qr_image):
+        """Blank badge with qr_image pasted at the top through the corner mask"""
+        badge = self.blank.copy()
+        self._paste_qr(badge, qr_image)
+        return badge
+
+    def compose(self, qr_image):
+        """
+        Like new_badge, but drawn into this template's reusable buffer.
+
+        The returned image is overwritten by the next compose() call, so save
+        (or copy) it before rendering the next badge.
+        """
+        if self._buffer is None:
+            self._buffer = self.blank.copy()
+        else:
+            self._buffer.paste(self.blank, (0, 0))
+        self._paste_qr(self._buffer, qr_image)
+        return self._buffer
+
+    def _paste_qr(self, badge, qr_image):
+        """
+        Paste qr_image through the corner mask, centring it if it is smaller
+        than the QR area (native renders are pasted as-is, without padding)
+        """
+        if qr_image.size == (self.qr_size, self.qr_size):
+            badge.paste(qr_image, (0, 0), self.corner_mask)
+            return
+        position = self.center_position(qr_image.size)
+        badge.paste(qr_image, position, self._mask_region(position, qr_image.size))
+
+    def _mask_region(self, position, size):
+        """The part of the corner mask under an image pasted at position"""
+        key = (position, size)
+        if key not in self._mask_regions:
+            x, y = position
+            self._mask_regions[key] = self.corner_mask.crop((x, y, x + size[0], y + size[1]))
+        return self._mask_regions[key]
+
+    def center_position(self, overlay_size):
+        """Top-left corner that centres an overlay of overlay_size on the QR area"""
+        width, height = overlay_size
+        return ((self.qr_size - width) // 2, (self.qr_size - height) // 2)
+
+
+@lru_cache(maxsize=None)
+def get_badge_template(qr_size, text_height, corner_radius):
+    """Shared BadgeTemplate for a configuration (one per process)"""
+    return BadgeTemplate(qr_size, text_height, corner_radius)
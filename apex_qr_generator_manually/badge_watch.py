@@ -0,0 +1,274 @@
+"""
+Watch mode: keep a badge folder up to date while its inputs change.
+
+During fest week logos and rosters change many times a day, and every
+change used to mean a cold full run of a generator: new processes, fonts
+loaded again, logo discs and badge masks rebuilt, every QR code encoded
+again. With --watch the generator stays running instead. It polls the roster
+file and the logo folder, waits until changes settle (--debounce, so an
+editor's save or a copy of many logos counts once), and re-renders only the
+badges the change affects:
+
+- a roster edit re-renders the rows that were added or changed, and removes
+  the badges of rows that are gone
+- a logo edit re-renders the badges that use that logo (by logo name, so
+  adding iste_logo.jpg where none existed counts too)
+
+Every rendering process stays alive between changes: the main process, or a
+pool of --workers processes kept open for the whole session. Their fonts,
+label runs, logo discs, badge templates and QR matrices (in memory, or in
+--matrix-cache) stay warm. Each rebuild is timed against --latency-budget,
+and the build manifest is kept up to date, so a normal run after watch mode
+skips everything.
+"""
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+
+from badge_pool import run_batch
+from build_manifest import BuildManifest
+from stage_timer import percentile
+
+POLL_INTERVAL = 0.2  # Seconds between checks of the watched files
+DEFAULT_DEBOUNCE = 0.5  # Seconds without changes before a rebuild starts
+DEFAULT_LATENCY_BUDGET = 2.0  # Seconds a rebuild should take, from settled change to last badge saved
+
+
+class FileWatcher:
+    """Polls files and the files directly inside folders for changes (no inotify needed)"""
+
+    def __init__(self, paths):
+        self.paths = [str(path) for path in paths]
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        """path -> (mtime, size), None for a missing file"""
+        snapshot = {}
+        for path in self.paths:
+            if os.path.isdir(path):
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            stat = entry.stat()
+                            snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+            else:
+                try:
+                    stat = os.stat(path)
+                    snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+                except OSError:
+                    snapshot[path] = None
+        return snapshot
+
+    def changes(self):
+        """Paths added, removed or modified since the last call"""
+        snapshot = self._scan()
+        changed = {path for path in snapshot.keys() | self.snapshot.keys()
+                   if snapshot.get(path) != self.snapshot.get(path)}
+        self.snapshot = snapshot
+        return changed
+
+    def wait(self, debounce=DEFAULT_DEBOUNCE):
+        """Block until something changes and then stays unchanged for debounce seconds; the changed paths"""
+        changed = set()
+        while not changed:
+            time.sleep(POLL_INTERVAL)
+            changed = self.changes()
+        quiet_since = time.monotonic()
+        while time.monotonic() - quiet_since < debounce:
+            time.sleep(POLL_INTERVAL)
+            more = self.changes()
+            if more:
+                changed |= more
+                quiet_since = time.monotonic()
+        return changed
+
+
+class WatchedBuild:
+    """
+    A badge folder and everything needed to keep it current, held in memory.
+
+    The generator supplies how to read the roster and how to name, digest
+    and render one row; logo_name (row -> logo name or None) makes logo
+    changes re-render the rows that use the logo, and on_roster (called
+    with every ID after each roster load) keeps side files such as the
+    decode table in step. warm (row -> anything) renders a row without
+    saving it, to warm this process's caches up before the first change.
+    """
+
+    def __init__(self, output_dir, load_rows, key, filename, digest, render, logo_name=None, on_roster=None,
+                 warm=None):
+        self.output_dir = output_dir
+        self.load_rows = load_rows
+        self.key = key
+        self.filename = filename
+        self.digest = digest
+        self.render = render
+        self.logo_name = logo_name
+        self.on_roster = on_roster
+        self.warm = warm
+        self.manifest = BuildManifest.load(output_dir)
+        self.rows = {}  # ID -> row
+        self.wanted = {}  # filename -> input digest, for every row
+        self.logo_users = {}  # logo name -> IDs of the rows that use it
+
+    def _forget(self, item_id):
+        row = self.rows.pop(item_id)
+        self.wanted.pop(self.filename(row), None)
+        if self.logo_name and self.logo_name(row):
+            self.logo_users[self.logo_name(row)].discard(item_id)
+
+    def _track(self, item_id, row):
+        self.rows[item_id] = row
+        if self.logo_name and self.logo_name(row):
+            self.logo_users.setdefault(self.logo_name(row), set()).add(item_id)
+
+    def reload_roster(self):
+        """Read the roster again; (IDs of added or changed rows, number of removed rows)"""
+        rows = {}
+        for row in self.load_rows():
+            rows[self.key(row)] = row
+        removed = [item_id for item_id in self.rows if item_id not in rows]
+        for item_id in removed:
+            self._forget(item_id)
+        changed = []
+        for item_id, row in rows.items():
+            if self.rows.get(item_id) != row:
+                if item_id in self.rows:
+                    self._forget(item_id)
+                self._track(item_id, row)
+                changed.append(item_id)
+        if self.on_roster:
+            self.on_roster(list(rows))
+        return changed, len(removed)
+
+    def logo_users_of(self, paths):
+        """IDs of the rows whose logo is one of the changed files"""
+        users = set()
+        for path in paths:
+            users |= self.logo_users.get(Path(path).stem, set())
+        return users
+
+    def warm_up(self):
+        """Render one row per logo in this process without saving it; the number rendered"""
+        if self.warm is None:
+            return 0
+        samples = {}
+        for row in self.rows.values():
+            samples.setdefault(self.logo_name(row) if self.logo_name else None, row)
+        for row in samples.values():
+            self.warm(row)
+        return len(samples)
+
+    def rebuild(self, item_ids, workers=1, pool=None, force=False):
+        """
+        Re-render whichever of item_ids are stale (all of them with force)
+        and prune removed rows' badges; (rendered, failed) counts.
+        """
+        pending = []
+        for item_id in item_ids:
+            row = self.rows[item_id]
+            filename = self.filename(row)
+            self.wanted[filename] = self.digest(row)
+            if force or not self.manifest.is_fresh(filename, self.wanted[filename]):
+                pending.append(row)
+
+        rendered = failed = 0
+        for row, _, error in run_batch(self.render, pending, workers, pool=pool):
+            filename = self.filename(row)
+            if error:
+                print(f"❌ Error generating {filename}: {error[0]}")
+                print(error[1], end='')
+                failed += 1
+                continue
+            self.manifest.record(filename, self.wanted[filename])
+            rendered += 1
+            print(f"✅ Generated: {filename}")
+        for filename in self.manifest.prune(self.wanted):
+            print(f"🧹 Removed orphan: {filename}")
+        self.manifest.save()
+        return rendered, failed
+
+
+def describe_changes(changed_paths, roster_path):
+    """Short description of what changed, for the rebuild line"""
+    names = sorted(Path(path).name for path in changed_paths if path != roster_path)
+    parts = ["roster"] if roster_path in changed_paths else []
+    if names:
+        parts.append(', '.join(names[:3]) + (f" and {len(names) - 3} more" if len(names) > 3 else ''))
+    return ' + '.join(parts)
+
+
+def _ignore_interrupts():
+    """Pool worker initializer: Ctrl+C stops the watcher, which then shuts the pool down"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def watch_build(build, roster_path=None, logo_dir=None, workers=1, debounce=DEFAULT_DEBOUNCE,
+                latency_budget=DEFAULT_LATENCY_BUDGET, force=False):
+    """
+    Bring build up to date (re-rendering everything with force), then
+    rebuild what each change affects until interrupted. roster_path is None
+    for a built-in roster (only logos are watched then); logo_dir is None
+    for badges without logos.
+    """
+    pool = None
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        # Kept for the whole session, caches and all
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_ignore_interrupts)
+
+    latencies = []
+    over_budget = 0
+    try:
+        started = time.perf_counter()
+        try:
+            changed, _ = build.reload_roster()
+        except (OSError, ValueError) as e:
+            print(f"❌ Can't read the roster: {e}")
+            sys.exit(1)
+        rendered, failed = build.rebuild(changed, workers, pool, force)
+        if workers <= 1:
+            build.warm_up()  # Pool workers warm up on their first badge instead
+        print(f"👀 {len(build.rows)} badges up to date ({rendered} rendered, {failed} failed, "
+              f"{time.perf_counter() - started:.2f}s)")
+        watched = [path for path in (roster_path, logo_dir) if path]
+        watcher = FileWatcher(watched)
+        print(f"👀 Watching {' and '.join(watched) or 'nothing'} (Ctrl+C to stop)")
+
+        while True:
+            changed_paths = watcher.wait(debounce)
+            started = time.perf_counter()
+            affected = set()
+            removed = 0
+            try:
+                if roster_path and roster_path in changed_paths:
+                    changed, removed = build.reload_roster()
+                    affected.update(changed)
+                affected |= build.logo_users_of(path for path in changed_paths if path != roster_path)
+                rendered, failed = build.rebuild(affected, workers, pool)
+            except (OSError, ValueError) as e:
+                print(f"❌ Rebuild failed: {e}")
+                continue
+            elapsed = time.perf_counter() - started
+            latencies.append(elapsed)
+            if not affected and not removed:
+                print(f"🔁 {describe_changes(changed_paths, roster_path)}: no badges affected")
+                continue
+            removal = f", {removed} removed" if removed else ''
+            print(f"🔁 {describe_changes(changed_paths, roster_path)}: {rendered} of {len(affected)} affected "
+                  f"badges re-rendered{removal} in {elapsed:.2f}s" + (f", {failed} failed" if failed else ''))
+            if elapsed > latency_budget:
+                over_budget += 1
+                tip = '' if workers > 1 else " (try --workers)"
+                print(f"⚠️  Over the {latency_budget:g}s latency budget{tip}")
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching")
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    if latencies:
+        latencies.sort()
+        print(f"⏱️  {len(latencies)} rebuilds: p50 {percentile(latencies, 50):.2f}s, "
+              f"p95 {percentile(latencies, 95):.2f}s, {over_budget} over the {latency_budget:g}s budget")
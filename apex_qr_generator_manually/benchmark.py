@@ -0,0 +1,407 @@
+"""
+Benchmarks for the badge generators.
+
+Loads generate_qr and generate_student_qr as modules and renders synthetic
+rosters (random UUID events cycling through the club logos, random 4-digit
+hex student IDs) into a scratch directory, so real output folders and build
+manifests are never touched. For each generator it measures:
+
+- latency: one badge rendered in this process, cold (first call, caches
+  empty) and warm (median and best of --repeat), stage by stage
+- batch: every --sizes roster through the same process pool the
+  generators use, as badges/s, per-stage p50/p95/p99 across workers and
+  peak RSS per worker. Each batch runs in a fresh interpreter, like a real
+  generator run, so its peak RSS is its own and not the high-water mark of
+  whatever ran before it in this process
+
+Results can be saved as JSON and compared against a saved baseline. Every
+metric is listed; throughput, peak RSS, warm latency and the batch's
+p50/p95 badge time fail the run if they got worse by more than --threshold:
+
+    python benchmark.py --sizes 10,1000 --save bench_baseline.json
+    python benchmark.py --sizes 10,1000 --baseline bench_baseline.json --native --raster numpy
+
+No baseline is shipped, since the numbers only mean something on the machine
+that produced them: a --baseline file that does not exist yet is created
+from the run, and later runs are compared against it.
+
+It also times a cold `import` of the engine and of each generator in a
+fresh interpreter (best of --repeat). A module slower than its budget in
+IMPORT_BUDGETS_MS fails the run, and so does any of them loading PIL,
+qrcode, numpy or asyncio, which they must only do on the first render or
+roster fetch:
+
+    python benchmark.py --imports-only
+
+Times are wall clock on this machine, so compare runs from the same
+machine only.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+import PIL
+import qrcode
+
+import generate_qr
+import generate_student_qr
+import stage_timer
+from badge_pool import resolve_workers, run_batch
+from image_output import DEFAULT_COMPRESS_LEVEL, PNG_STRATEGIES, RASTER_FORMATS
+from matrix_cache import ENCODERS
+
+GENERATORS = ('event', 'student')
+DEFAULT_SIZES = (10, 1000, 30000)
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.10  # 10% worse than the baseline is a regression
+
+RESULTS_VERSION = 1
+
+# Metric name suffix -> True if a bigger number is better
+METRIC_DIRECTIONS = {'_per_s': True, '_ms': False, '_mb': False}
+
+# Tail latencies of single stages are too noisy to compare at all
+NOISY_METRICS = ('.p95_ms', '.p99_ms')
+
+# Only these fail the run; cold starts, p99s and stage medians swing by
+# tens of percent between identical runs, so they are reported but not gated
+GATED_METRICS = ('.badges_per_s', '.peak_rss_mb', 'latency.median_ms',
+                 '.stages.badge.p50_ms', '.stages.badge.p95_ms')
+
+# Cold import budgets: the engine must stay cheap to import for services and
+# workers; the generators also load argparse and their batch helpers
+IMPORT_BUDGETS_MS = {'badge_engine': 60, 'generate_qr': 100, 'generate_student_qr': 100}
+
+# Backends the budgeted modules may only import when they render or fetch
+LAZY_BACKENDS = ('PIL', 'qrcode', 'numpy', 'asyncio')
+
+_IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'ms': elapsed * 1000, 'loaded': [name for name in {lazy!r} if name in sys.modules]}}))
+"""
+
+
+def synthetic_events(count, seed=0):
+    """Event tuples with random UUIDs, cycling through the logos in LOGO_DIR"""
+    rng = random.Random(seed)
+    logo_dir = Path(generate_qr.LOGO_DIR)
+    logos = sorted(path.stem for path in logo_dir.iterdir() if path.is_file()) if logo_dir.exists() else []
+    events = []
+    for n in range(count):
+        event_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        logo = logos[n % len(logos)] if logos else None
+        events.append((event_id, f"Benchmark Event {n + 1}", logo, f"Benchmark Club {n % 25 + 1}"))
+    return events
+
+
+def synthetic_students(count, seed=0):
+    """Distinct 4-digit hex student IDs, like the real roster's"""
+    if count > 16 ** 4:
+        raise ValueError(f"At most {16 ** 4} distinct 4-digit student IDs")
+    rng = random.Random(seed)
+    return [f"{n:04x}" for n in rng.sample(range(16 ** 4), count)]
+
+
+def render_function(generator, output_dir, options):
+    """The generator's own render function, bound to output_dir and options"""
+    common = dict(output_dir=output_dir, raster=options['raster'], native=options['native'],
+                  encoder=options['encoder'], output_format=options['output_format'],
+                  png_compress_level=options['png_compress_level'], png_strategy=options['png_strategy'])
+    if generator == 'event':
+        return partial(generate_qr.render_event_badge, **common)
+    return partial(generate_student_qr.render_student_badge, **common)
+
+
+def synthetic_items(generator, count, seed=0):
+    if generator == 'event':
+        return synthetic_events(count, seed)
+    return synthetic_students(count, seed)
+
+
+def _stage_medians(samples):
+    return {name: {'median_ms': round(statistics.median(values) * 1000, 3)}
+            for name, values in sorted(samples.items())}
+
+
+def measure_latency(render, item, repeat=DEFAULT_REPEAT):
+    """Cold and warm single-badge times, in this process, with stage medians"""
+    stage_timer.enable()
+    stage_timer.drain()
+    start = time.perf_counter()
+    render(item)
+    cold = time.perf_counter() - start
+    stage_timer.drain()
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render(item)
+        times.append(time.perf_counter() - start)
+    return {
+        'cold_ms': round(cold * 1000, 3),
+        'median_ms': round(statistics.median(times) * 1000, 3),
+        'best_ms': round(min(times) * 1000, 3),
+        'stages': _stage_medians(stage_timer.drain()),
+    }
+
+
+def measure_batch(render, items, workers, chunksize=None):
+    """Throughput, per-stage percentiles and peak RSS for a whole roster"""
+    report = stage_timer.StageReport()
+    worker_peaks = {}
+    failures = 0
+    timed = partial(stage_timer.timed_render, render)
+    start = time.perf_counter()
+    for _, _, error in run_batch(timed, items, workers, chunksize, worker_peaks, report):
+        failures += error is not None
+    elapsed = time.perf_counter() - start
+    stages = report.summary()
+    return {
+        'badges': len(items),
+        'failures': failures,
+        'elapsed_s': round(elapsed, 3),
+        'badges_per_s': round(len(items) / elapsed, 3) if elapsed else None,
+        'peak_rss_mb': round(max(worker_peaks.values()) / 2 ** 20, 1) if worker_peaks else None,
+        'stages': {name: {key: entry[key] for key in ('count', 'p50_ms', 'p95_ms', 'p99_ms', 'total_s')}
+                   for name, entry in stages.items()},
+    }
+
+
+def _measure_fresh_batch(generator, options, items, workers):
+    """measure_batch for a synthetic roster in a scratch directory (runs in the batch's own interpreter)"""
+    with tempfile.TemporaryDirectory(prefix=f'bench-{generator}-{len(items)}-') as batch_dir:
+        return measure_batch(render_function(generator, batch_dir, options), items, workers)
+
+
+def measure_fresh_batch(generator, options, items, workers):
+    """
+    measure_batch in a freshly spawned interpreter: ru_maxrss is a high-water
+    mark for the whole process, so a batch run in this one would report the
+    peak of every batch before it.
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(_measure_fresh_batch, generator, options, items, workers).result()
+
+
+def run_suite(generators, sizes, options, workers=1, repeat=DEFAULT_REPEAT, seed=0):
+    """Every measurement for every generator, as one results dict"""
+    results = {}
+    for generator in generators:
+        with tempfile.TemporaryDirectory(prefix=f'bench-{generator}-') as scratch:
+            render = render_function(generator, scratch, options)
+            first = synthetic_items(generator, 1, seed)[0]
+            print(f"⏱️  {generator}: single-badge latency ({repeat} runs)")
+            entry = {'latency': measure_latency(render, first, repeat), 'batch': {}}
+            for size in sizes:
+                print(f"⏱️  {generator}: batch of {size}")
+                items = synthetic_items(generator, size, seed)
+                entry['batch'][str(size)] = measure_fresh_batch(generator, options, items, workers)
+            results[generator] = entry
+    return {
+        'version': RESULTS_VERSION,
+        'meta': {
+            'python': platform.python_version(), 'pillow': PIL.__version__,
+            'qrcode': getattr(qrcode, '__version__', None), 'platform': platform.platform(),
+            'cpu_count': os.cpu_count(), 'workers': workers, 'repeat': repeat, 'seed': seed,
+            'options': options,
+        },
+        'results': results,
+    }
+
+
+def measure_import(module, repeat=DEFAULT_REPEAT):
+    """Best cold import time of module over repeat fresh interpreters, and which lazy backends it loaded"""
+    probe = _IMPORT_PROBE.format(module=module, lazy=LAZY_BACKENDS)
+    best, loaded = None, []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', probe], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True).stdout
+        sample = json.loads(output.splitlines()[-1])
+        best = sample['ms'] if best is None else min(best, sample['ms'])
+        loaded = sample['loaded']
+    return {'import_ms': round(best, 3), 'budget_ms': IMPORT_BUDGETS_MS[module], 'loaded': loaded}
+
+
+def measure_imports(repeat=DEFAULT_REPEAT):
+    """measure_import for every module with a budget"""
+    print(f"⏱️  cold imports ({repeat} runs each)")
+    return {module: measure_import(module, repeat) for module in IMPORT_BUDGETS_MS}
+
+
+def import_failures(imports):
+    """Why each module broke its import budget (empty when all are within it)"""
+    failures = []
+    for module, entry in imports.items():
+        if entry['import_ms'] > entry['budget_ms']:
+            failures.append(f"{module} took {entry['import_ms']:.1f} ms (budget {entry['budget_ms']} ms)")
+        if entry['loaded']:
+            failures.append(f"{module} imported {', '.join(entry['loaded'])} before rendering anything")
+    return failures
+
+
+def format_imports(imports):
+    lines = []
+    for module, entry in imports.items():
+        mark = '❌' if entry['import_ms'] > entry['budget_ms'] else '📦'
+        backends = f", loads {', '.join(entry['loaded'])}" if entry['loaded'] else ''
+        lines.append(f"{mark} import {module}: {entry['import_ms']:.1f} ms "
+                     f"(budget {entry['budget_ms']} ms){backends}")
+    return '\n'.join(lines)
+
+
+def flatten(results, prefix=''):
+    """Nested results -> {'student.batch.1000.badges_per_s': value, ...} for comparable metrics"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and any(name.endswith(suffix) for suffix in METRIC_DIRECTIONS):
+            if '.stages.' in name and '.stages.badge.' not in name and name.endswith(NOISY_METRICS):
+                continue
+            flat[name] = value
+    return flat
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    (metric, baseline, current, change, regressed) for every metric both
+    runs have. change is the relative improvement (positive is better);
+    only GATED_METRICS can regress.
+    """
+    current, baseline = flatten(current['results']), flatten(baseline['results'])
+    rows = []
+    for name in sorted(set(current) & set(baseline)):
+        before, after = baseline[name], current[name]
+        if not before:
+            continue
+        higher_is_better = next(better for suffix, better in METRIC_DIRECTIONS.items() if name.endswith(suffix))
+        change = (after - before) / before if higher_is_better else (before - after) / before
+        rows.append((name, before, after, change, name.endswith(GATED_METRICS) and change < -threshold))
+    return rows
+
+
+def format_comparison(rows, threshold=DEFAULT_THRESHOLD):
+    lines = [f"📊 Against baseline (regression: more than {threshold:.0%} worse):"]
+    for name, before, after, change, regressed in rows:
+        if regressed:
+            mark = '❌'
+        elif change < -threshold:
+            mark = '⚠️ '  # worse, but not a gated metric
+        else:
+            mark = '✅' if change > threshold else '  '
+        lines.append(f"{mark} {name:<48} {before:>10g} → {after:<10g} {change:+6.1%}")
+    regressions = sum(row[4] for row in rows)
+    gated = sum(name.endswith(GATED_METRICS) for name, *_ in rows)
+    lines.append(f"{'❌' if regressions else '🎉'} {regressions} regression{'s' if regressions != 1 else ''} "
+                 f"in {gated} gated metrics ({len(rows)} compared)")
+    return '\n'.join(lines)
+
+
+def format_results(results):
+    lines = []
+    for generator, entry in results['results'].items():
+        latency = entry['latency']
+        lines.append(f"🏁 {generator}: cold {latency['cold_ms']:.1f} ms, warm {latency['median_ms']:.1f} ms "
+                     f"(best {latency['best_ms']:.1f} ms)")
+        stages = ', '.join(f"{name} {stage['median_ms']:.1f}" for name, stage in latency['stages'].items()
+                           if name != 'badge')
+        lines.append(f"   stages (ms): {stages}")
+        for size, batch in entry['batch'].items():
+            rss = f", peak RSS {batch['peak_rss_mb']} MB" if batch['peak_rss_mb'] else ''
+            failures = f", {batch['failures']} failed" if batch['failures'] else ''
+            badge = batch['stages'].get('badge', {})
+            lines.append(f"   {size:>6} badges: {batch['badges_per_s']:.1f} badges/s, "
+                         f"p50 {badge.get('p50_ms', 0):.1f} / p95 {badge.get('p95_ms', 0):.1f} / "
+                         f"p99 {badge.get('p99_ms', 0):.1f} ms{rss}{failures}")
+    return '\n'.join(lines)
+
+
+def parse_sizes(text):
+    try:
+        sizes = tuple(int(size) for size in text.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected comma-separated counts, e.g. 10,1000,30000")
+    if any(size < 1 for size in sizes):
+        raise argparse.ArgumentTypeError("batch sizes must be at least 1")
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the badge generators on synthetic rosters")
+    parser.add_argument('--generators', nargs='+', choices=GENERATORS, default=list(GENERATORS))
+    parser.add_argument('--sizes', type=parse_sizes, default=DEFAULT_SIZES,
+                        help="comma-separated batch sizes (default: 10,1000,30000)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="worker processes for the batches (0 = one per CPU core)")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="warm single-badge runs")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--raster', choices=generate_qr.RASTER_BACKENDS, default='pil')
+    parser.add_argument('--native', action='store_true')
+    parser.add_argument('--encoder', choices=ENCODERS, default='qrcode')
+    parser.add_argument('--output-format', choices=RASTER_FORMATS + ('svg',), default='png')
+    parser.add_argument('--png-compress-level', type=int, choices=range(10), default=DEFAULT_COMPRESS_LEVEL,
+                        metavar='0-9')
+    parser.add_argument('--png-strategy', choices=PNG_STRATEGIES, default='auto')
+    parser.add_argument('--save', metavar='JSON', help="write the results here")
+    parser.add_argument('--baseline', metavar='JSON',
+                        help="compare against results saved earlier (created from this run if missing)")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown that counts as a regression (default: %(default)s)")
+    parser.add_argument('--imports-only', action='store_true',
+                        help="only check cold import times against their budgets")
+    args = parser.parse_args()
+
+    imports = measure_imports(args.repeat)
+    print(format_imports(imports))
+    failures = import_failures(imports)
+    for failure in failures:
+        print(f"❌ Import budget: {failure}")
+    if args.imports_only:
+        sys.exit(1 if failures else 0)
+
+    options = dict(raster=args.raster, native=args.native, encoder=args.encoder,
+                   output_format=args.output_format, png_compress_level=args.png_compress_level,
+                   png_strategy=args.png_strategy)
+    results = run_suite(args.generators, args.sizes, options, resolve_workers(args.workers),
+                        args.repeat, args.seed)
+    results['imports'] = imports
+    print(format_results(results))
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+        print(f"💾 Results: {args.save}")
+
+    if args.baseline and not os.path.exists(args.baseline):
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+        print(f"💾 No baseline yet; this run is now the baseline: {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.threshold)
+        print(format_comparison(rows, args.threshold))
+        if any(row[4] for row in rows):
+            sys.exit(1)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
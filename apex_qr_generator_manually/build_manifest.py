@@ -0,0 +1,154 @@
+"""
+Content-addressed build manifest for incremental badge generation.
+
+Every output PNG is recorded with a digest of everything that went into it:
+the QR payload and label text, the style constants, the render options and
+the bytes of the logo file, plus the size and mtime of the file written. On
+the next run a badge whose digest still matches, and whose file is still the
+one the build wrote, is skipped, so adding 50 students to a 30k roster only
+renders those 50. A badge that was edited, replaced (e.g. by a git checkout)
+or deleted outside the generator is rendered again. Files the manifest built
+that are no longer in the input are pruned.
+
+The manifest lives next to the output directory, e.g. qr_codes.manifest.json
+beside qr_codes/.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+# Bump when the drawing code changes in a way the style constants don't show
+RENDER_VERSION = 1
+
+# Bump when the manifest's own layout changes; older manifests rebuild everything once
+MANIFEST_VERSION = 2
+
+# Save progress every this many recorded badges, so an interrupted run keeps its work
+SAVE_EVERY = 500
+
+
+def badge_digest(style, *inputs):
+    """Stable hex digest of a style fingerprint plus per-badge inputs"""
+    blob = json.dumps([RENDER_VERSION, style, inputs], sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _file_digest(path, mtime_ns, size):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_digest(path):
+    """sha256 of a file's bytes, read once per (path, mtime, size)"""
+    if path is None:
+        return None
+    stat = os.stat(path)
+    return _file_digest(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+def manifest_path(output_dir):
+    """Where the manifest for output_dir is stored"""
+    output_dir = Path(output_dir).resolve()
+    return output_dir.with_name(f"{output_dir.name}.manifest.json")
+
+
+class BuildManifest:
+    """Maps output filenames to the input digest they were rendered from and the file written"""
+
+    def __init__(self, output_dir, entries=None, store=None):
+        self.output_dir = Path(output_dir)
+        self.path = manifest_path(output_dir)
+        self.entries = entries or {}
+        self.store = store
+        self._unsaved = 0
+
+    @classmethod
+    def load(cls, output_dir, store=None):
+        """
+        Read the manifest for output_dir (empty if there is none yet).
+
+        store, if given, holds the outputs instead of the output_dir folder:
+        anything with stat(filename) and remove(filename), such as an
+        output_sink sink.
+        """
+        path = manifest_path(output_dir)
+        entries = {}
+        if path.exists():
+            try:
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+                entries = data.get('files', {})
+                if data.get('manifest_version') != MANIFEST_VERSION:
+                    # No file stats recorded: keep the entries (for pruning) but rebuild them
+                    entries = {filename: {'digest': None, 'stat': None} for filename in entries}
+            except (OSError, ValueError, AttributeError):
+                print(f"⚠️  Ignoring unreadable build manifest: {path}")
+        return cls(output_dir, entries, store)
+
+    def _stat(self, filename):
+        """What identifies the output file as written (see DirectorySink.stat); None if it is missing"""
+        if self.store is not None:
+            return self.store.stat(filename)
+        try:
+            stat = (self.output_dir / filename).stat()
+        except FileNotFoundError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def is_fresh(self, filename, digest):
+        """True if filename was built from exactly these inputs and is still the file the build wrote"""
+        entry = self.entries.get(filename)
+        if entry is None or entry['digest'] != digest:
+            return False
+        stat = self._stat(filename)
+        return stat is not None and stat == entry['stat']
+
+    def record(self, filename, digest):
+        """Remember a freshly rendered badge (call once its file is written)"""
+        self.entries[filename] = {'digest': digest, 'stat': self._stat(filename)}
+        self._unsaved += 1
+        if self._unsaved >= SAVE_EVERY:
+            self.save()
+
+    def prune(self, wanted):
+        """
+        Delete outputs this manifest built that are not in wanted.
+
+        Returns the removed filenames. Files the manifest never recorded are
+        left alone.
+        """
+        orphans = sorted(set(self.entries) - set(wanted))
+        for filename in orphans:
+            if self.store is not None:
+                self.store.remove(filename)
+            else:
+                try:
+                    (self.output_dir / filename).unlink()
+                except FileNotFoundError:
+                    pass
+            del self.entries[filename]
+        if orphans:
+            self._unsaved += len(orphans)
+        return orphans
+
+    def save(self):
+        """Write the manifest atomically"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'manifest_version': MANIFEST_VERSION, 'render_version': RENDER_VERSION,
+                           'files': self.entries},
+                          f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._unsaved = 0
@@ -0,0 +1,156 @@
+"""
+Compact QR payloads: short uppercase URLs that encode in alphanumeric mode.
+
+The default badge URLs (https://apexgne.vercel.app//scan?event=<uuid>) are
+lowercase and contain '?' and '=', so qrcode has to use byte mode, which
+costs 8 bits a character. At ERROR_CORRECT_H a 36-character UUID pushes the
+event badges to version 8 (49x49 modules).
+
+A compact payload uses only the QR alphanumeric character set (0-9, A-Z,
+space and $%*+-./:), which packs two characters into 11 bits:
+
+    HTTPS://APEXGNE.VERCEL.APP/S/<short id>     ->  /scan?event=<id>
+    HTTPS://APEXGNE.VERCEL.APP/C/<short id>     ->  /clubdashboard?student_id=<id>
+
+Short IDs are base32 digests of the full ID (IDs that are already short and
+alphanumeric, like student IDs, are just uppercased). They are one-way, so
+the generators export a JSON decode table:
+
+    {"routes": {"S": {"path": "/scan", "param": "event"}, ...},
+     "ids": {"S": {"<short id>": "<full id>", ...}, ...}}
+
+The app's /S/[id] and /C/[id] route handlers import it from
+lib/compact-ids.json (APP_DECODE_TABLE) and redirect to the full URL, so a
+compact badge only resolves once the app is deployed with the table that
+lists it. Run from the app checkout, the generators write that file
+directly. Several generators can share one table file; each rewrites only
+its route.
+"""
+import base64
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+# Characters QR alphanumeric mode can encode
+ALPHANUMERIC_CHARS = frozenset('0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:')
+
+# Base32 characters per hashed short ID (60 bits: collisions are checked anyway)
+SHORT_ID_LENGTH = 12
+
+# Route code in the compact URL -> the app route and query parameter it stands for
+ROUTES = {
+    'S': {'path': '/scan', 'param': 'event'},
+    'C': {'path': '/clubdashboard', 'param': 'student_id'},
+}
+
+TABLE_VERSION = 1
+
+# The table the Next.js redirect routes import (the generators live one level below the app root)
+APP_DECODE_TABLE = Path(__file__).resolve().parent.parent / 'lib' / 'compact-ids.json'
+
+
+def short_id(full_id, route):
+    """Alphanumeric-mode short ID for full_id under a route code"""
+    if len(full_id) <= SHORT_ID_LENGTH and full_id.isalnum() and full_id.isascii():
+        return full_id.upper()
+    digest = hashlib.sha256(f"{route}:{full_id}".encode('utf-8')).digest()
+    return base64.b32encode(digest).decode('ascii')[:SHORT_ID_LENGTH]
+
+
+def compact_url(app_url, route, full_id):
+    """Uppercase alphanumeric-mode URL for full_id (raises ValueError if app_url can't be)"""
+    if route not in ROUTES:
+        raise ValueError(f"Unknown compact route: {route} (expected one of {', '.join(ROUTES)})")
+    url = f"{app_url.rstrip('/').upper()}/{route}/{short_id(full_id, route)}"
+    invalid = sorted(set(url) - ALPHANUMERIC_CHARS)
+    if invalid:
+        raise ValueError(f"APP_URL has characters QR alphanumeric mode can't encode: {''.join(invalid)}")
+    return url
+
+
+def decode_table_path(output_dir):
+    """Decode table location next to the output directory"""
+    output_dir = Path(output_dir).resolve()
+    return output_dir.with_name(f"{output_dir.name}.decode.json")
+
+
+def default_decode_table(output_dir):
+    """The app's APP_DECODE_TABLE when run from the app checkout, else decode_table_path(output_dir)"""
+    if APP_DECODE_TABLE.parent.is_dir():
+        return APP_DECODE_TABLE
+    return decode_table_path(output_dir)
+
+
+def describe_decode_table(path):
+    """Progress line for a saved table, warning when the app's redirect routes won't read it"""
+    if Path(path).resolve() == APP_DECODE_TABLE:
+        return f"🔗 Decode table: {path} (deploy the app for the /S/ and /C/ links to resolve)"
+    return (f"⚠️  Decode table: {path} is not the app's {APP_DECODE_TABLE.parent.name}/{APP_DECODE_TABLE.name}: "
+            f"compact badges open a 404 until it is deployed there")
+
+
+class DecodeTable:
+    """Short ID -> full ID entries for one route, saved into a shared JSON file"""
+
+    def __init__(self, route):
+        if route not in ROUTES:
+            raise ValueError(f"Unknown compact route: {route} (expected one of {', '.join(ROUTES)})")
+        self.route = route
+        self.ids = {}
+
+    def add(self, full_id):
+        """Register full_id and return its short ID; two IDs sharing one is an error"""
+        short = short_id(full_id, self.route)
+        existing = self.ids.setdefault(short, full_id)
+        if existing != full_id:
+            raise ValueError(f"Short ID collision: {existing!r} and {full_id!r} both map to {short}")
+        return short
+
+    def save(self, path):
+        """
+        Write this route's entries into the table at path atomically, keeping
+        the other routes' entries that are already there.
+        """
+        path = Path(path)
+        data = {}
+        if path.exists():
+            try:
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                print(f"⚠️  Replacing unreadable decode table: {path}")
+        ids = data.get('ids', {})
+        ids[self.route] = self.ids
+        data = {'version': TABLE_VERSION, 'routes': ROUTES, 'ids': ids}
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+def payload_footprint(payload, error_correction=None):
+    """(characters, QR version, modules per side) payload encodes to, at level H by default"""
+    import qrcode
+    if error_correction is None:
+        error_correction = qrcode.constants.ERROR_CORRECT_H
+    qr = qrcode.QRCode(error_correction=error_correction)
+    qr.add_data(payload)
+    version = qr.best_fit()
+    return len(payload), version, version * 4 + 17
+
+
+def format_footprint(current, compact):
+    """Summary line comparing two payload_footprint results"""
+    (chars, version, modules), (compact_chars, compact_version, compact_modules) = current, compact
+    saved = 1 - compact_modules ** 2 / modules ** 2
+    return (f"📏 Payload: {chars} → {compact_chars} chars, "
+            f"version {version} ({modules}×{modules}) → version {compact_version} "
+            f"({compact_modules}×{compact_modules}), {saved:.0%} fewer modules")
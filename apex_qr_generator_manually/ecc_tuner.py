@@ -0,0 +1,208 @@
+"""
+Logo-aware choice of QR version and error-correction level.
+
+Both generators used to encode everything at ERROR_CORRECT_H from version 1
+up. Student badges have no logo, so H only makes their codes bigger; event
+badges cover a fixed share of the symbol with the logo disc, and whether H
+is actually needed depends on how many codewords that disc hides at a given
+version.
+
+For each candidate (version, level) the tuner lays the disc over the
+symbol, finds the data modules it touches, maps them through the standard
+placement order and block interleaving to the codewords they belong to, and
+counts the damaged codewords in every Reed-Solomon block. A candidate is
+safe if every block can still correct its logo damage plus a recovery
+margin (a share of the block's codewords kept free for scratches, glare and
+print defects). The tuner picks the smallest version that fits the payload
+safely at some level, and at that version the strongest such level, since
+it costs nothing extra.
+
+Occlusion per (version, level, disc) does not depend on the payload and the
+fit only depends on the payload's segment lengths, so both are cached.
+
+Usage:
+    version, error_correction = tune_qr(payload, disc_size=270, target_size=1000, margin=0.1)
+"""
+import math
+from functools import lru_cache
+
+from function_patterns import DATA, function_pattern_index, modules_count_for_version
+
+# qrcode.constants' values, so importing this module doesn't load qrcode
+ERROR_CORRECT_L = 1
+ERROR_CORRECT_M = 0
+ERROR_CORRECT_Q = 3
+ERROR_CORRECT_H = 2
+
+ERROR_CORRECTION_LEVELS = (ERROR_CORRECT_L, ERROR_CORRECT_M, ERROR_CORRECT_Q, ERROR_CORRECT_H)  # weakest first
+
+LEVEL_NAMES = {ERROR_CORRECT_L: 'L', ERROR_CORRECT_M: 'M', ERROR_CORRECT_Q: 'Q', ERROR_CORRECT_H: 'H'}
+
+# Error-correction codewords reserved for misdecode protection in the
+# smallest symbols (ISO/IEC 18004 table 9); they can't correct errors
+MISDECODE_PROTECTION = {
+    (1, ERROR_CORRECT_L): 3,
+    (1, ERROR_CORRECT_M): 2,
+    (1, ERROR_CORRECT_Q): 1,
+    (1, ERROR_CORRECT_H): 1,
+    (2, ERROR_CORRECT_L): 2,
+    (3, ERROR_CORRECT_L): 1,
+}
+
+# Share of each block's codewords that must stay correctable after the logo
+DEFAULT_RECOVERY_MARGIN = 0.1
+
+
+@lru_cache(maxsize=None)
+def placement_order(version):
+    """Data module (row, col) positions in the order their bits are placed"""
+    count = modules_count_for_version(version)
+    index = function_pattern_index(version)
+    positions = []
+    upward = True
+    col = count - 1
+    while col > 0:
+        if col == 6:  # The vertical timing pattern column is skipped
+            col -= 1
+        rows = range(count - 1, -1, -1) if upward else range(count)
+        for row in rows:
+            for c in (col, col - 1):
+                if index[row][c] == DATA:
+                    positions.append((row, c))
+        upward = not upward
+        col -= 2
+    return tuple(positions)
+
+
+@lru_cache(maxsize=None)
+def codeword_blocks(version, error_correction):
+    """Block number of every codeword in the interleaved codeword stream"""
+    from qrcode.base import rs_blocks
+    blocks = rs_blocks(version, error_correction)
+    owners = []
+    for counts in ([b.data_count for b in blocks], [b.total_count - b.data_count for b in blocks]):
+        for i in range(max(counts)):
+            owners.extend(block for block, count in enumerate(counts) if i < count)
+    return tuple(owners)
+
+
+def disc_modules(version, disc_size, target_size, border):
+    """
+    Modules (row, col) the logo disc overlaps at all.
+
+    disc_size is the disc diameter and target_size the side of the square the
+    symbol is rendered into, both in pixels, with the disc centred on it.
+    Modules are taken at the whole-pixel size the native renderer uses, which
+    is never larger than the resized path's, so the estimate is conservative
+    for both.
+    """
+    count = modules_count_for_version(version)
+    span = count + 2 * border  # modules across the rendered symbol
+    radius = disc_size / 2 / (target_size // span)
+    center = span / 2
+    covered = set()
+    for row in range(count):
+        for col in range(count):
+            # Closest point of the module square to the disc centre
+            top, left = row + border, col + border
+            dy = max(top - center, 0, center - top - 1)
+            dx = max(left - center, 0, center - left - 1)
+            if dx * dx + dy * dy < radius * radius:
+                covered.add((row, col))
+    return covered
+
+
+@lru_cache(maxsize=None)
+def block_damage(version, error_correction, disc_size, target_size, border):
+    """Damaged codewords per Reed-Solomon block when the disc hides its modules"""
+    from qrcode.base import rs_blocks
+    owners = codeword_blocks(version, error_correction)
+    covered = disc_modules(version, disc_size, target_size, border) if disc_size else set()
+    damaged = {bit // 8 for bit, position in enumerate(placement_order(version))
+               if position in covered and bit // 8 < len(owners)}
+    counts = [0] * len(rs_blocks(version, error_correction))
+    for codeword in damaged:
+        counts[owners[codeword]] += 1
+    return tuple(counts)
+
+
+def is_recoverable(version, error_correction, disc_size, target_size, border, margin):
+    """True if every block corrects its logo damage with margin to spare"""
+    from qrcode.base import rs_blocks
+    protection = MISDECODE_PROTECTION.get((version, error_correction), 0)
+    blocks = rs_blocks(version, error_correction)
+    damage = block_damage(version, error_correction, disc_size, target_size, border)
+    for block, damaged in zip(blocks, damage):
+        correctable = (block.total_count - block.data_count - protection) // 2
+        if damaged + math.ceil(margin * block.total_count) > correctable:
+            return False
+    return True
+
+
+def occluded_share(version, disc_size, target_size, border):
+    """Share of the data modules the disc covers"""
+    if not disc_size:
+        return 0.0
+    covered = disc_modules(version, disc_size, target_size, border)
+    order = placement_order(version)
+    return sum(position in covered for position in order) / len(order)
+
+
+def payload_shape(payload):
+    """Segment modes and lengths, split as QRCode.add_data does: all the fit depends on"""
+    import qrcode
+    qr = qrcode.QRCode()
+    qr.add_data(payload)
+    return tuple((chunk.mode, len(chunk.data)) for chunk in qr.data_list)
+
+
+@lru_cache(maxsize=4096)
+def _tune(shape, disc_size, target_size, border, margin):
+    import qrcode
+    from qrcode.exceptions import DataOverflowError
+    from qrcode.util import QRData
+    qr = qrcode.QRCode()
+    qr.data_list = [QRData(b'0' * length, mode=mode, check_data=False) for mode, length in shape]
+    best = None
+    for error_correction in ERROR_CORRECTION_LEVELS:
+        qr.error_correction = error_correction
+        try:
+            version = qr.best_fit()
+        except DataOverflowError:
+            continue
+        while version <= 40 and not is_recoverable(version, error_correction, disc_size, target_size,
+                                                   border, margin):
+            version += 1
+        # Stronger levels come later, so ties go to them
+        if version <= 40 and (best is None or version <= best[0]):
+            best = (version, error_correction)
+    if best is None:
+        raise ValueError("No QR version can hold this payload with the logo and recovery margin")
+    return best
+
+
+def tune_qr(payload, disc_size=0, target_size=1000, border=4, margin=DEFAULT_RECOVERY_MARGIN):
+    """(version, error_correction) for payload, cached per payload shape"""
+    return _tune(payload_shape(payload), disc_size, target_size, border, margin)
+
+
+def parse_recovery_margin(text):
+    """argparse type for a recovery margin: a share of each block, 0 or more and below 1"""
+    import argparse
+    try:
+        margin = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a number, e.g. {DEFAULT_RECOVERY_MARGIN}")
+    if not 0 <= margin < 1:
+        raise argparse.ArgumentTypeError(f"recovery margin {text}: must be at least 0 and below 1")
+    return margin
+
+
+def describe_choice(version, error_correction, disc_size=0, target_size=1000, border=4):
+    """Short description of a tuned symbol for progress output"""
+    count = modules_count_for_version(version)
+    text = f"version {version}-{LEVEL_NAMES[error_correction]} ({count}×{count})"
+    if disc_size:
+        share = occluded_share(version, disc_size, target_size, border)
+        text += f", logo covers {share:.0%} of data modules"
+    return text
@@ -0,0 +1,104 @@
+"""
+Precomputed function-pattern index for every QR version.
+
+Each module of a QR symbol is either data or part of a fixed function
+pattern. The index classifies every (row, col) once per version, so drawers
+look a module up in O(1) instead of re-deriving the geometry with range
+checks for every module. Styles can then treat finder rings, finder centres,
+alignment patterns or timing lines differently without extra geometry code.
+
+Usage:
+    index = pattern_index_for_size(modules_count)
+    if index[row][col] == FINDER:
+        ...
+"""
+from functools import lru_cache
+
+# Module classes
+DATA = 0
+FINDER = 1  # 7x7 position marker minus its 3x3 centre (what VercelStyle rounds)
+FINDER_CENTER = 2  # 3x3 centre of a position marker
+SEPARATOR = 3  # Light band around each position marker
+TIMING = 4
+ALIGNMENT = 5
+FORMAT = 6  # Format information, including the always-dark module
+VERSION = 7  # Version information (versions 7 and up)
+
+CLASS_NAMES = {
+    DATA: 'data',
+    FINDER: 'finder',
+    FINDER_CENTER: 'finder_center',
+    SEPARATOR: 'separator',
+    TIMING: 'timing',
+    ALIGNMENT: 'alignment',
+    FORMAT: 'format',
+    VERSION: 'version',
+}
+
+
+def modules_count_for_version(version):
+    """Modules per side for a QR version"""
+    return 17 + 4 * version
+
+
+def version_for_modules_count(modules_count):
+    """QR version with this many modules per side"""
+    version, remainder = divmod(modules_count - 17, 4)
+    if remainder or not 1 <= version <= 40:
+        raise ValueError(f"{modules_count} modules per side is not a QR code size")
+    return version
+
+
+@lru_cache(maxsize=None)
+def function_pattern_index(version):
+    """
+    Class of every module of a QR version, as a tuple of bytes rows.
+
+    index[row][col] is one of the module class constants above.
+    """
+    count = modules_count_for_version(version)
+    grid = [bytearray(count) for _ in range(count)]
+
+    def fill(top, left, height, width, value):
+        for row in range(max(top, 0), min(top + height, count)):
+            for col in range(max(left, 0), min(left + width, count)):
+                grid[row][col] = value
+
+    # Position markers with their separators
+    for top, left in ((0, 0), (0, count - 7), (count - 7, 0)):
+        fill(top - 1, left - 1, 9, 9, SEPARATOR)
+        fill(top, left, 7, 7, FINDER)
+        fill(top + 2, left + 2, 3, 3, FINDER_CENTER)
+
+    # Timing patterns between the separators
+    fill(6, 8, 1, count - 16, TIMING)
+    fill(8, 6, count - 16, 1, TIMING)
+
+    # Alignment patterns (they take precedence over the timing lines)
+    from qrcode.util import pattern_position
+    centers = pattern_position(version)
+    for row in centers:
+        for col in centers:
+            if grid[row][col] in (FINDER, FINDER_CENTER, SEPARATOR):
+                continue
+            fill(row - 2, col - 2, 5, 5, ALIGNMENT)
+
+    # Format information next to the position markers, plus the dark module
+    for i in range(9):
+        if i != 6:
+            grid[8][i] = FORMAT
+            grid[i][8] = FORMAT
+    fill(8, count - 8, 1, 8, FORMAT)
+    fill(count - 8, 8, 8, 1, FORMAT)
+
+    # Version information blocks
+    if version >= 7:
+        fill(0, count - 11, 6, 3, VERSION)
+        fill(count - 11, 0, 3, 6, VERSION)
+
+    return tuple(bytes(row) for row in grid)
+
+
+def pattern_index_for_size(modules_count):
+    """function_pattern_index for a symbol with modules_count modules per side"""
+    return function_pattern_index(version_for_modules_count(modules_count))
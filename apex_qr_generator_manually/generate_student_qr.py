@@ -1,104 +1,10 @@
-import qrcode
-import os
-from pathlib import Path
-from PIL import Image, ImageDraw, ImageFont
-from qrcode.image.styledpil import StyledPilImage
-from qrcode.image.styles.moduledrawers import RoundedModuleDrawer
-import math
-
-class VercelStyleModuleDrawer:
-    """
-    Custom module drawer that creates Vercel-style QR codes with rounded edges
-    on the three positioning squares (markers) and standard square modules for
-    the rest of the QR code
-    """
-    def __init__(self, radius_ratio=0.3):
-        self.radius_ratio = radius_ratio
-
-    def drawrect(self, box, is_position_marker=False):
-        """
-        Draw a rectangle for a QR code module
-        """
-        # For position markers, draw with rounded corners
-        if is_position_marker:
-            # Draw a rounded rectangle
-            return lambda draw, x, y, size, color: draw.rounded_rectangle(
-                [(x, y), (x + size, y + size)],
-                radius=size * self.radius_ratio,
-                fill=color
-            )
-        else:
-            # For regular modules, draw standard square
-            return lambda draw, x, y, size, color: draw.rectangle(
-                [(x, y), (x + size, y + size)],
-                fill=color
-            )
-
-
-class VercelStyleImage(StyledPilImage):
-    """
-    Custom QR code image factory that applies Vercel-style rounded corners
-    to the position markers while keeping other modules as squares
-    """
-    def __init__(self, *args, **kwargs):
-        self.vercel_drawer = kwargs.pop('vercel_drawer', VercelStyleModuleDrawer())
-        super().__init__(*args, **kwargs)
-        
-    def drawrect(self, row, col, is_active=True):
-        """
-        Draw a module rectangle, with special handling for position markers
-        """
-        if not is_active:
-            return
-            
-        # Determine if this module is part of a position marker
-        is_position_marker = self._is_position_marker_module(row, col)
-        
-        # Get the appropriate drawing function from our custom drawer
-        draw_func = self.vercel_drawer.drawrect(None, is_position_marker)
-        
-        # Calculate coordinates
-        x = (col + self.border) * self.box_size
-        y = (row + self.border) * self.box_size
-        size = self.box_size
-        
-        # Draw the module
-        draw_func(self._img, x, y, size, self.fill_color)
-        
-    def _is_position_marker_module(self, row, col):
-        """
-        Determine if a module at (row, col) is part of one of the three position markers
-        """
-        # Position markers are located at fixed positions in QR codes:
-        # 1. Top-left marker (always at position (0,0))
-        # 2. Top-right marker (at position (0, size-7))
-        # 3. Bottom-left marker (at position (size-7, 0))
-        
-        size = self.width - 2 * self.border  # Size without border
-        modules_count = size // self.box_size  # Number of modules
-        
-        # Check if module is in top-left position marker area (7x7 modules)
-        if row < 7 and col < 7:
-            # But not in the inner 3x3 "hole"
-            if row >= 2 and row < 5 and col >= 2 and col < 5:
-                return False
-            return True
-            
-        # Check if module is in top-right position marker area (7x7 modules)
-        if row < 7 and col >= modules_count - 7:
-            # But not in the inner 3x3 "hole"
-            if row >= 2 and row < 5 and col >= modules_count - 5 and col < modules_count - 2:
-                return False
-            return True
-            
-        # Check if module is in bottom-left position marker area (7x7 modules)
-        if row >= modules_count - 7 and col < 7:
-            # But not in the inner 3x3 "hole"
-            if row >= modules_count - 5 and row < modules_count - 2 and col >= 2 and col < 5:
-                return False
-            return True
-            
-        return False
+from badge_build import BadgeKind, generate_badges, main, watch_badges, write_badge
+from badge_engine import RASTER_BACKENDS, BadgeSpec, BadgeStyle, LineStyle
+from build_manifest import badge_digest
+from compact_payload import compact_url
+from ecc_tuner import DEFAULT_RECOVERY_MARGIN
+from roster_input import iter_records
+from supabase_roster import DEFAULT_CONNECTIONS, DEFAULT_PAGE_SIZE, is_postgrest, iter_records as iter_table_records
 
 # ============================================
 # CONFIGURATION - EDIT THESE
@@ -107,7 +13,7 @@ class VercelStyleImage(StyledPilImage):
 APP_URL = "https://apexgne.vercel.app/"  # Change to your production URL later
 
 # Paste your student data here (copy from Supabase export)
-# Format: student_id (just the last 4 digits of uuid)
+# Format: student_id (just the first 4 characters of the uuid)
 STUDENTS_DATA = """
 085f
 a339
@@ -145,172 +51,189 @@ ed6b
 7760
 """
 
+# Column names accepted in roster files passed with --input (Supabase exports)
+STUDENT_HEADER_NAMES = ('student_id', 'id_text', 'id')  # A first CSV/TSV row starting with these is a header
+STUDENT_JSON_FIELDS = (('student_id', 'id_text', 'id'),)  # JSONL keys for the ID, first match wins
+
+# The dashboard scanner accepts a student_id of 4 (school) or 8 (college)
+# characters and looks it up as a prefix of id_text; full UUIDs from an
+# export or the table are cut to the same short ID STUDENTS_DATA holds
+SCANNER_ID_LENGTHS = (4, 8)
+SHORT_ID_LENGTH = 4
+
+# --input supabase reads this table through PostgREST (a select= in an
+# --input URL overrides the columns)
+STUDENTS_TABLE = 'students'
+STUDENT_SELECT = 'id,id_text'  # id is the paging key
+
 OUTPUT_DIR = 'student_qr_codes'
 
 # QR Code Settings
 QR_SIZE = 1000  # Base QR code size in pixels
 QR_BORDER_RADIUS = 50  # Rounded corners radius for QR code
 
+# Error correction: with --auto-ecc the QR version and level are tuned per
+# payload so that this share of every block stays correctable
+ECC_RECOVERY_MARGIN = DEFAULT_RECOVERY_MARGIN
+
 # Text Settings
 TEXT_HEIGHT = 120  # Space for text below QR code
 STUDENT_ID_FONT_SIZE = 48  # Font size for student ID
 TEXT_COLOR = (0, 0, 0)  # Black color for text
+TEXT_MARGIN = 40  # Minimum space left and right of the text (longer IDs shrink to fit)
+STUDENT_ID_FONT_FILES = ("arial.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf")  # First that loads wins
 
 # ============================================
 # SCRIPT - DON'T EDIT BELOW THIS LINE
 # ============================================
 
+# The badge layout the settings above describe
+STUDENT_STYLE = BadgeStyle(
+    qr_size=QR_SIZE, corner_radius=QR_BORDER_RADIUS, text_height=TEXT_HEIGHT,
+    lines=(LineStyle(STUDENT_ID_FONT_FILES, STUDENT_ID_FONT_SIZE, TEXT_COLOR, True),),  # Student ID (bold)
+    text_margin=TEXT_MARGIN,
+)
+
 def clean_filename(name):
     """Remove special characters from student ID for filename"""
     return "".join(c for c in name if c.isalnum() or c in (' ', '-', '_')).strip().replace(' ', '_')
 
 
-def add_rounded_corners_to_qr(qr_image, radius):
-    """Add rounded corners to the QR code"""
-    # Convert to RGBA if not already
-    qr_img = qr_image.convert('RGBA')
-    
-    # Create a mask with rounded corners
-    mask = Image.new('L', qr_img.size, 0)
-    draw = ImageDraw.Draw(mask)
-    draw.rounded_rectangle([(0, 0), qr_img.size], radius=radius, fill=255)
-    
-    # Create output with transparency
-    output = Image.new('RGBA', qr_img.size, (255, 255, 255, 0))
-    output.paste(qr_img, (0, 0))
-    output.putalpha(mask)
-    
-    return output
-
-
-def add_text_below_qr(qr_image, student_id):
-    """Add student ID text below the QR code"""
-    # Create new image with extra height for text (white background)
-    final_height = QR_SIZE + TEXT_HEIGHT
-    final_image = Image.new('RGB', (QR_SIZE, final_height), 'white')
-    
-    # Convert QR to RGB for pasting (handles transparency by compositing on white)
-    qr_rgb = Image.new('RGB', qr_image.size, 'white')
-    qr_rgb.paste(qr_image, (0, 0), qr_image if qr_image.mode == 'RGBA' else None)
-    
-    # Paste QR code at the top
-    final_image.paste(qr_rgb, (0, 0))
-    
-    # Prepare to draw text
-    draw = ImageDraw.Draw(final_image)
-    
-    # Try to load fonts
-    try:
-        student_font = ImageFont.truetype("arial.ttf", STUDENT_ID_FONT_SIZE)
-    except:
-        try:
-            student_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", STUDENT_ID_FONT_SIZE)
-        except:
-            student_font = ImageFont.load_default()
-            print("⚠️  Could not load custom font, using default")
-    
-    # Get text bounding box
-    student_bbox = draw.textbbox((0, 0), student_id, font=student_font)
-    student_width = student_bbox[2] - student_bbox[0]
-    student_height = student_bbox[3] - student_bbox[1]
-    
-    # Calculate centered positions
-    student_x = (QR_SIZE - student_width) // 2
-    student_y = QR_SIZE + (TEXT_HEIGHT - student_height) // 2
-    
-    # Draw student ID (bold effect)
-    for offset_x in range(-1, 2):
-        for offset_y in range(-1, 2):
-            draw.text((student_x + offset_x, student_y + offset_y), student_id, font=student_font, fill=TEXT_COLOR)
-    
-    return final_image
-
-
-def generate_student_qr_codes():
-    """Generate QR codes for all students"""
-    
-    # Create output directory
-    Path(OUTPUT_DIR).mkdir(exist_ok=True)
-    
-    print("🚀 Apex Student QR Code Generator (Enhanced with Vercel-style Position Markers)")
-    print("=" * 60)
-    print(f"📱 App URL: {APP_URL}")
-    print(f"📁 Output folder: {OUTPUT_DIR}/")
-    print(f"✨ QR Style: Vercel-style with rounded position markers\n")
-    
-    # Parse students data
-    students = []
-    for line in STUDENTS_DATA.strip().split('\n'):
-        if line.strip():
-            student_id = line.strip()
-            students.append(student_id)
-    
-    if not students:
-        print("❌ No students found! Please paste student data in STUDENTS_DATA variable.")
-        print("\nExpected format:")
-        print("student_id")
-        print("4-character ID like: abcd")
-        return
-    
-    print(f"📋 Found {len(students)} students to process\n")
-    
-    generated_count = 0
-    
-    for student_id in students:
-        try:
-            # Create QR code URL
-            qr_url = f"{APP_URL}/clubdashboard?student_id={student_id}"
-            
-            # Generate QR code with high error correction and rounded modules
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_H,  # Highest error correction
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(qr_url)
-            qr.make(fit=True)
-            
-            # Create QR code image with Vercel-style position markers
-            qr_img = qr.make_image(
-                image_factory=VercelStyleImage,
-                vercel_drawer=VercelStyleModuleDrawer(),
-                fill_color="black",
-                back_color="white"
-            )
-            qr_img = qr_img.resize((QR_SIZE, QR_SIZE), Image.Resampling.LANCZOS)
-            
-            # Add rounded corners to QR code
-            qr_img = add_rounded_corners_to_qr(qr_img, QR_BORDER_RADIUS)
-            
-            # Add student ID text below QR code
-            final_img = add_text_below_qr(qr_img, student_id)
-            
-            # Create filename
-            clean_name = clean_filename(student_id)
-            filename = f"student_{clean_name}.png"
-            filepath = os.path.join(OUTPUT_DIR, filename)
-            
-            # Save final image
-            final_img.save(filepath, quality=95)
-            
-            generated_count += 1
-            print(f"✅ Generated: {filename}")
-            
-        except Exception as e:
-            print(f"❌ Error generating QR for {student_id}: {str(e)}")
-            import traceback
-            traceback.print_exc()
-    
-    print("\n" + "=" * 60)
-    print(f"🎉 Successfully generated {generated_count} student QR codes!")
-    print(f"📁 Saved in: {OUTPUT_DIR}/")
-    print("\n💡 Tips:")
-    print("  • QR codes now have Vercel-style position markers with rounded corners")
-    print("  • Each QR code redirects to the club dashboard with student_id parameter")
-    print("  • Student ID is displayed below each QR code")
-    print("  • Test by scanning with your phone camera or Google Lens")
+def student_filename(student_id, output_format='png'):
+    """Output filename for a student badge"""
+    return f"student_{clean_filename(student_id)}.{output_format}"
+
+
+def style_fingerprint(raster, native, recovery_margin=None, png_options=None):
+    """Everything apart from the student ID that changes how a badge looks (or a PNG's bytes)"""
+    style = dict(
+        qr_size=QR_SIZE, qr_border_radius=QR_BORDER_RADIUS,
+        text_height=TEXT_HEIGHT, student_id_font_size=STUDENT_ID_FONT_SIZE,
+        text_color=TEXT_COLOR, text_margin=TEXT_MARGIN, student_id_font_files=STUDENT_ID_FONT_FILES,
+        raster=raster, native=native,
+    )
+    if recovery_margin is not None:
+        style['recovery_margin'] = recovery_margin
+    if png_options is not None:
+        style['png_compress_level'], style['png_strategy'] = png_options
+    return style
+
+
+def student_digest(student_id, style, compact=False):
+    """Digest of every input of a student badge"""
+    return badge_digest(style, student_url(student_id, compact), student_id)
+
+
+def student_spec(student_id, compact=False):
+    """The badge engine's description of a student badge"""
+    return BadgeSpec(student_url(student_id, compact), (student_id,), STUDENT_STYLE)
+
+
+def student_url(student_id, compact=False):
+    """URL the student badge QR code points to (short alphanumeric-mode form if compact)"""
+    if compact:
+        return compact_url(APP_URL, 'C', student_id)
+    return f"{APP_URL}/clubdashboard?student_id={student_id}"
+
+
+def render_student_badge(student_id, output_dir=OUTPUT_DIR, compact=False, **options):
+    """
+    Render and save the badge for a single student (options as for
+    badge_build.write_badge).
+
+    Returns (filename, notes) like render_event_badge; student badges have
+    no notes. Kept at module level so worker processes can run it.
+    """
+    filename = student_filename(student_id, options.get('output_format', 'png'))
+    write_badge(student_spec(student_id, compact), output_dir, filename, **options)
+    return filename, []
+
+
+def short_student_id(student_id):
+    """
+    The ID as the dashboard scanner expects it: 4- and 8-character IDs as
+    they are, anything longer (a full UUID) cut to its first SHORT_ID_LENGTH.
+
+    A row read from Supabase gives the same badge URL as its STUDENTS_DATA line:
+
+    >>> from supabase_roster import flatten_row
+    >>> from roster_input import record_columns
+    >>> uuid = '085f3c1e-9a2b-4c5d-8e7f-0123456789ab'
+    >>> row = flatten_row({'id': uuid, 'id_text': uuid})
+    >>> student_id = short_student_id(record_columns(row, STUDENT_JSON_FIELDS)[0])
+    >>> student_url(student_id) == student_url(STUDENTS_DATA.split()[0])
+    True
+    """
+    if len(student_id) in SCANNER_ID_LENGTHS:
+        return student_id
+    return student_id[:SHORT_ID_LENGTH]
+
+
+def iter_students(input_path=None, input_format=None, page_size=DEFAULT_PAGE_SIZE,
+                  connections=DEFAULT_CONNECTIONS):
+    """
+    Stream student IDs from a roster file, stdin ('-'), a PostgREST table or
+    STUDENTS_DATA.
+
+    Two different IDs that shorten to the same short ID would get the same
+    badge, which the scanner can't tell apart: the later ones are skipped
+    with an error, and once the roster is read a ValueError lists them all
+    (so the batch exits with status 1 and prunes nothing).
+    """
+    if is_postgrest(input_path):
+        records = iter_table_records(input_path, STUDENTS_TABLE, STUDENT_SELECT, STUDENT_JSON_FIELDS,
+                                     page_size=page_size, connections=connections)
+    else:
+        records = iter_records(input_path, input_format, fields=STUDENT_JSON_FIELDS,
+                               header_names=STUDENT_HEADER_NAMES, default_text=STUDENTS_DATA)
+    full_ids = {}  # short ID -> the first full ID cut to it
+    clashes = []
+    for line_number, parts in records:
+        student_id = short_student_id(parts[0])
+        if not student_id:
+            print(f"⚠️  Skipping line {line_number}: no student_id")
+            continue
+        first = full_ids.setdefault(student_id, parts[0])
+        if first != parts[0]:
+            print(f"❌ Skipping line {line_number}: {parts[0]} shortens to {student_id}, like {first}")
+            clashes.append(student_id)
+            continue
+        yield student_id
+    if clashes:
+        raise ValueError(f"short IDs shared by different students: {', '.join(sorted(set(clashes)))} "
+                         f"({len(clashes)} row{'s' if len(clashes) != 1 else ''} skipped); "
+                         f"their badges would open the wrong student")
+
+
+# How badge_build runs and watches the student badges
+STUDENT_BADGES = BadgeKind(
+    noun='students', badges='student QR codes', title='Apex Student QR Code Generator', app_url=APP_URL,
+    data_name='STUDENTS_DATA', output_dir=OUTPUT_DIR, logo_dir=None, route='C',
+    recovery_margin=ECC_RECOVERY_MARGIN,
+    rows=iter_students, key=lambda student_id: student_id, label=lambda student_id: student_id, logo_name=None,
+    spec=student_spec, filename=student_filename, digest=student_digest, fingerprint=style_fingerprint,
+    render=render_student_badge,
+    details=(),
+    empty_help=("❌ No students found! Please paste student data in STUDENTS_DATA variable or pass --input.",
+                "\nExpected format:",
+                "student_id",
+                "4-character ID like: abcd"),
+    tips=("QR codes now have Vercel-style position markers with rounded corners",
+          "Each QR code redirects to the club dashboard with student_id parameter",
+          "Student ID is displayed below each QR code",
+          "Test by scanning with your phone camera or Google Lens"),
+)
+
+
+def generate_student_qr_codes(**options):
+    """Generate QR codes for all students (options as for badge_build.generate_badges)"""
+    generate_badges(STUDENT_BADGES, **options)
+
+
+def watch_student_badges(**options):
+    """Bring the student badges up to date, then re-render the ones each roster change affects"""
+    watch_badges(STUDENT_BADGES, **options)
 
 
 if __name__ == "__main__":
-    generate_student_qr_codes()
\ No newline at end of file
+    main(STUDENT_BADGES, "Generate student QR badges")
@@ -0,0 +1,149 @@
+"""
+Raster badge output: smallest lossless PNG mode, lossless WebP, or lossy AVIF.
+
+The generators used to save every badge with final_img.save(path, quality=95):
+a full 24-bit RGB PNG at zlib's default settings (quality means nothing to
+the PNG encoder). Most badges need far less:
+
+- student badges are black modules on white with anti-aliased grey labels,
+  so they fit a palette of at most 256 greys
+- a badge that is strictly black and white fits 1 bit per pixel
+- event badges with a photo logo have thousands of colours and stay RGB
+
+reduce_colors picks the smallest of those modes that reproduces the badge
+exactly. Palette PNGs also compress better, since each pixel is one byte
+(or less) before deflate.
+
+The PNG encoder's knobs are the zlib compression level and strategy; Pillow
+chooses the row filters itself (none for palette images, adaptive for the
+rest), so the strategy is the filtering choice there is. WebP is written
+lossless. AVIF is not: Pillow can't select its lossless (identity-matrix)
+mode, so it is written lossy at quality 100 without chroma subsampling, and
+pixels may move by a few levels. Use it where size matters more than exact
+pixels; it is no lossless alternative to PNG or WebP.
+
+Usage:
+    save_badge(badge, 'badge.png', compress_level=9, strategy='filtered')
+    for result in measure_encoders(badge):
+        print(result)
+"""
+import io
+import time
+from collections import namedtuple
+
+RASTER_FORMATS = ('png', 'webp', 'avif')
+
+# zlib strategies, as PIL's compress_type PNG option. 'auto' is Pillow's own
+# choice: filtered for row-filtered (non-palette) images, default otherwise
+PNG_STRATEGIES = {'auto': -1, 'default': 0, 'filtered': 1, 'huffman': 2, 'rle': 3, 'fixed': 4}
+
+DEFAULT_COMPRESS_LEVEL = 6  # zlib's default, what a plain save() uses
+WEBP_METHOD = 4  # 0 (fast) to 6 (smallest)
+AVIF_SPEED = 6  # 0 (smallest) to 10 (fast)
+
+# How --encode-report names the alternative formats' settings
+ENCODER_LABELS = {'webp': 'WEBP lossless', 'avif': 'AVIF q100 (lossy)'}
+
+EncodeResult = namedtuple('EncodeResult', 'label size seconds exact')
+
+
+def _same_pixels(a, b):
+    from PIL import ImageChops
+    return ImageChops.difference(a.convert('RGB'), b.convert('RGB')).getbbox() is None
+
+
+def reduce_colors(image):
+    """
+    The image in the smallest mode that keeps every pixel: '1' for black and
+    white, 'P' for up to 256 colours, otherwise unchanged.
+    """
+    from PIL import Image
+    if image.mode not in ('RGB', 'L'):
+        return image
+    colors = image.getcolors(256)
+    if colors is None:
+        return image
+    palette = sorted(color if isinstance(color, tuple) else (color,) * 3 for _, color in colors)
+
+    if all(r == g == b for r, g, b in palette):
+        grey = image.convert('L')  # exact for grey RGB pixels
+        if [r for r, _, _ in palette] in ([0, 255], [0], [255]):
+            return grey.convert('1', dither=Image.Dither.NONE)
+        # Grey levels -> indices into a palette of just the levels in use
+        lut = [0] * 256
+        for index, (level, _, _) in enumerate(palette):
+            lut[level] = index
+        reduced = grey.point(lut).convert('P')
+        reduced.putpalette([channel for color in palette for channel in color])
+        return reduced
+
+    reduced = image.convert('RGB').quantize(colors=len(palette), method=Image.Quantize.MAXCOVERAGE,
+                                            dither=Image.Dither.NONE)
+    return reduced if _same_pixels(reduced, image) else image
+
+
+def save_options(output_format, compress_level=DEFAULT_COMPRESS_LEVEL, strategy='auto'):
+    """Pillow save() keyword arguments for a raster output format"""
+    if output_format == 'png':
+        return dict(format='PNG', compress_level=compress_level, compress_type=PNG_STRATEGIES[strategy])
+    if output_format == 'webp':
+        return dict(format='WEBP', lossless=True, quality=100, method=WEBP_METHOD)
+    if output_format == 'avif':
+        return dict(format='AVIF', quality=100, subsampling='4:4:4', speed=AVIF_SPEED)
+    raise ValueError(f"Unknown raster format: {output_format} (expected one of {', '.join(RASTER_FORMATS)})")
+
+
+def save_badge(image, fp, output_format='png', compress_level=DEFAULT_COMPRESS_LEVEL, strategy='auto'):
+    """Save a finished badge to a path or file object; PNGs in their smallest lossless mode"""
+    if output_format == 'png':
+        image = reduce_colors(image)
+    image.save(fp, **save_options(output_format, compress_level, strategy))
+
+
+def available_formats():
+    """The raster formats this Pillow build can write"""
+    from PIL import features
+    return tuple(fmt for fmt in RASTER_FORMATS if fmt == 'png' or features.check(fmt))
+
+
+def _encode(image, **options):
+    from PIL import Image
+    buffer = io.BytesIO()
+    start = time.perf_counter()
+    image.save(buffer, **options)
+    seconds = time.perf_counter() - start
+    buffer.seek(0)
+    return buffer.getbuffer().nbytes, seconds, _same_pixels(Image.open(buffer), image)
+
+
+def measure_encoders(image, compress_level=DEFAULT_COMPRESS_LEVEL, strategy='auto'):
+    """
+    Encode one badge every way the generators can write it.
+
+    Returns EncodeResults (label, bytes, seconds, exact) for the old RGB
+    save, the chosen PNG settings, and each alternative format available.
+    Palette reduction counts towards the reduced PNG's time.
+    """
+    results = [EncodeResult('PNG RGB (previous)', *_encode(image, format='PNG'))]
+
+    start = time.perf_counter()
+    reduced = reduce_colors(image)
+    reduce_seconds = time.perf_counter() - start
+    size, seconds, exact = _encode(reduced, **save_options('png', compress_level, strategy))
+    label = f"PNG {reduced.mode} level {compress_level} {strategy}"
+    results.append(EncodeResult(label, size, seconds + reduce_seconds, exact and _same_pixels(reduced, image)))
+
+    for output_format in available_formats()[1:]:
+        results.append(EncodeResult(ENCODER_LABELS[output_format], *_encode(image, **save_options(output_format))))
+    return results
+
+
+def format_encoders(results):
+    """Report lines comparing measure_encoders results against the first"""
+    baseline = results[0].size
+    lines = ["🗜️  Encoders on the first badge:"]
+    for result in results:
+        note = '' if result.exact else ', not pixel-exact'
+        lines.append(f"   {result.label:<28} {result.size / 1024:8.1f} KB ({result.size / baseline:4.0%}) "
+                     f"{result.seconds * 1000:7.1f} ms{note}")
+    return '\n'.join(lines)
@@ -0,0 +1,72 @@
+"""
+Cached font loading and label layout for the text below a badge.
+
+add_text_below_qr used to walk the try/except font fallback chain and reload
+TrueType files for every badge, measure every string with textbbox, and fake
+bold by drawing the text nine times. Here fonts are loaded once per process,
+and each (text, font, size, bold) run is measured and rasterised once into an
+anti-aliased mask; repeated strings such as club names are then a single
+paste. Bold is one stroked draw, and labels wider than the space available
+shrink until they fit.
+"""
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+MIN_FONT_SCALE = 0.5  # Shrink-to-fit never goes below half the configured size
+BOLD_STROKE_WIDTH = 1  # Same thickening as the old 3x3 offset loop
+
+
+@lru_cache(maxsize=None)
+def load_font(font_files, size):
+    """First font in font_files that loads at this size (PIL default as a last resort)"""
+    for font_file in font_files:
+        try:
+            return ImageFont.truetype(font_file, size)
+        except OSError:
+            continue
+    print("⚠️  Could not load custom font, using default")
+    return ImageFont.load_default()
+
+
+class LabelRun:
+    """One measured and rasterised line of text"""
+
+    def __init__(self, text, font, stroke_width):
+        self.text = text
+        self.font = font
+        self.stroke_width = stroke_width
+
+        # Ink box relative to the draw origin, as textbbox reports it
+        self.bbox = font.getbbox(text, stroke_width=stroke_width)
+        self.width = self.bbox[2] - self.bbox[0]
+        self.height = self.bbox[3] - self.bbox[1]
+
+        # Anti-aliased coverage mask of just the ink box
+        self.mask = Image.new('L', (max(self.width, 1), max(self.height, 1)), 0)
+        ImageDraw.Draw(self.mask).text(
+            (-self.bbox[0], -self.bbox[1]), text, font=font, fill=255,
+            stroke_width=stroke_width, stroke_fill=255
+        )
+
+    def draw(self, image, position, fill):
+        """Paint the run onto image with its draw origin at position"""
+        x, y = position
+        image.paste(fill, (x + self.bbox[0], y + self.bbox[1]), self.mask)
+
+
+@lru_cache(maxsize=4096)
+def layout_label(text, font_files, size, max_width, bold=False):
+    """
+    Measure and rasterise a label, shrinking the font until it fits max_width.
+
+    Cached per process, so every repeated string is laid out only once.
+    """
+    stroke_width = BOLD_STROKE_WIDTH if bold else 0
+    min_size = max(1, int(size * MIN_FONT_SCALE))
+    while True:
+        run = LabelRun(text, load_font(font_files, size), stroke_width)
+        if run.width <= max_width or size <= min_size:
+            return run
+        # Scale straight to the estimated fit, then fine-tune one point at a time
+        size = max(min_size, min(size - 1, int(size * max_width / run.width)))
@@ -0,0 +1,138 @@
+"""
+Cache of finished club-logo discs for the event badge generator.
+
+add_logo_to_qr used to re-open, convert and LANCZOS-thumbnail the logo and
+rebuild both circular masks for every event, although dozens of events share a
+handful of club logos. The finished disc (logo cut to a circle on its white
+circular background) only depends on the logo file and two settings, so it is
+built once per (path, mtime, logo size, padding) and kept in memory for the
+run. With a cache directory it is also stored as a PNG, so later runs and
+other worker processes never decode or resample the same logo again.
+
+In memory at most MAX_DISCS discs are kept, least recently used dropped
+first, and a logo file that changes (watch mode, the render service) drops
+the discs of its old version straight away.
+"""
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+# Bump when build_logo_disc changes so stale disk entries are ignored
+CACHE_VERSION = 1
+
+MAX_DISCS = 64  # Discs held in memory per cache (a fest has a few dozen club logos at most)
+
+
+def build_logo_disc(logo_path, logo_size, padding):
+    """Circular logo on a circular white background, as an RGBA image"""
+    # Open logo
+    logo = Image.open(logo_path).convert('RGBA')
+
+    # Resize logo maintaining aspect ratio
+    logo.thumbnail((logo_size, logo_size), Image.Resampling.LANCZOS)
+
+    # Make logo circular
+    logo_mask = Image.new('L', logo.size, 0)
+    draw = ImageDraw.Draw(logo_mask)
+    draw.ellipse([(0, 0), logo.size], fill=255)
+    logo.putalpha(logo_mask)
+
+    # Create circular white background with padding
+    bg_size = logo.size[0] + (padding * 2)
+    background = Image.new('RGBA', (bg_size, bg_size), (255, 255, 255, 255))
+
+    # Create circular mask for the background
+    bg_mask = Image.new('L', (bg_size, bg_size), 0)
+    draw_bg = ImageDraw.Draw(bg_mask)
+    draw_bg.ellipse([(0, 0), (bg_size, bg_size)], fill=255)
+    background.putalpha(bg_mask)
+
+    # Paste logo on circular white background
+    bg_pos = ((bg_size - logo.size[0]) // 2, (bg_size - logo.size[1]) // 2)
+    background.paste(logo, bg_pos, logo)
+
+    return background
+
+
+class LogoCache:
+    """
+    Finished logo discs keyed by (path, mtime, logo size, padding), held in
+    memory and optionally mirrored to cache_dir
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._discs = OrderedDict()  # key -> disc, least recently used first
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, logo_path, logo_size, padding):
+        path = os.path.abspath(logo_path)
+        return (path, os.stat(path).st_mtime_ns, logo_size, padding)
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(repr((CACHE_VERSION,) + key).encode()).hexdigest()
+        return self.cache_dir / f"logo_{digest}.png"
+
+    def get(self, logo_path, logo_size, padding):
+        """Return the logo disc, building (and persisting) it on first use"""
+        key = self._key(logo_path, logo_size, padding)
+        disc = self._discs.get(key)
+        if disc is not None:
+            self._discs.move_to_end(key)
+            self.hits += 1
+            return disc
+
+        disk_path = self._disk_path(key) if self.cache_dir else None
+        if disk_path is not None and disk_path.exists():
+            disc = Image.open(disk_path)
+            disc.load()
+            self.hits += 1
+        else:
+            disc = build_logo_disc(logo_path, logo_size, padding)
+            self.misses += 1
+            if disk_path is not None:
+                self._write(disc, disk_path)
+
+        self._store(key, disc)
+        return disc
+
+    def _store(self, key, disc):
+        """Keep disc in memory, dropping its logo's older versions and the least recently used discs"""
+        path, mtime = key[:2]
+        for stale in [old for old in self._discs if old[0] == path and old[1] != mtime]:
+            del self._discs[stale]
+        self._discs[key] = disc
+        while len(self._discs) > MAX_DISCS:
+            self._discs.popitem(last=False)
+
+    def _write(self, disc, disk_path):
+        """Persist atomically so parallel workers never read a half-written file"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                disc.save(f, format='PNG')
+            os.replace(tmp_path, disk_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def clear(self):
+        """Drop the in-memory discs (disk entries are keyed by mtime anyway)"""
+        self._discs.clear()
+
+
+_caches = {}
+
+
+def get_logo_cache(cache_dir=None):
+    """One LogoCache per cache directory per process"""
+    key = str(Path(cache_dir).resolve()) if cache_dir else None
+    if key not in _caches:
+        _caches[key] = LogoCache(cache_dir)
+    return _caches[key]
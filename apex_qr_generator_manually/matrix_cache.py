@@ -0,0 +1,279 @@
+"""
+Persistent cache of encoded QR module matrices.
+
+qr.make(fit=True) fits the version and scores all eight mask patterns in pure
+Python for every badge. When only the styling changes (QR_BORDER_RADIUS,
+colours, logo size) the payloads are the same, so that work is wasted. This
+cache stores each finished matrix as a packed bitmap keyed by (payload,
+error correction, version constraints, qrcode library version), and
+style-only re-renders rebuild the QRCode from the bitmap without encoding.
+Both encoders (see ENCODERS) produce identical matrices, so they share entries.
+
+On disk a cache directory holds segment pairs:
+
+    matrices-<id>.bin   packed rows, one bit per module, rows padded to bytes
+    matrices-<id>.idx   fixed-size records: sha1(key), offset, modules count
+
+Every process appends only to its own segment (so parallel workers never
+interleave writes), and .bin files are memory-mapped for reading.
+compact() merges the segments back into one after a batch.
+
+Long-running renderers (watch mode) without a cache directory use
+MEMORY_CACHE instead, which keeps the packed matrices in the process.
+"""
+import hashlib
+import mmap
+import os
+import struct
+from functools import lru_cache
+from itertools import chain
+from pathlib import Path
+
+from ecc_tuner import ERROR_CORRECT_H
+
+INDEX_RECORD = struct.Struct('<20sQH')  # key digest, offset in .bin, modules per side
+
+# Compact once a directory has more segments than this
+MAX_SEGMENTS = 8
+
+# Cache "directory" that keeps matrices in this process's memory only
+MEMORY_CACHE = ':memory:'
+
+# 'qrcode' scores mask patterns in pure Python, 'numpy' vectorized (same output)
+ENCODERS = ('qrcode', 'numpy')
+
+_BYTE_BITS = [tuple(bool(byte >> (7 - bit) & 1) for bit in range(8)) for byte in range(256)]
+
+
+@lru_cache(maxsize=None)
+def qrcode_version():
+    """Installed qrcode library version (matrices may differ between releases)"""
+    from importlib import metadata  # slow to import, and only needed once a cache is used
+    try:
+        return metadata.version('qrcode')
+    except metadata.PackageNotFoundError:
+        return 'unknown'
+
+
+def matrix_key(payload, error_correction, version=None, fit=True):
+    """Cache key digest for one encoding request"""
+    key = repr((payload, error_correction, version, fit, qrcode_version()))
+    return hashlib.sha1(key.encode('utf-8')).digest()
+
+
+def pack_modules(modules):
+    """Pack a matrix of booleans into bytes, each row padded to whole bytes"""
+    packed = bytearray()
+    for row in modules:
+        value = 0
+        for module in row:
+            value = (value << 1) | bool(module)
+        padding = -len(row) % 8
+        packed += (value << padding).to_bytes((len(row) + padding) // 8, 'big')
+    return bytes(packed)
+
+
+def unpack_modules(packed, modules_count):
+    """Inverse of pack_modules: list of lists of bools"""
+    row_bytes = (modules_count + 7) // 8
+    return [
+        list(chain.from_iterable(_BYTE_BITS[byte] for byte in packed[start:start + row_bytes]))[:modules_count]
+        for start in range(0, row_bytes * modules_count, row_bytes)
+    ]
+
+
+def packed_size(modules_count):
+    return (modules_count + 7) // 8 * modules_count
+
+
+class MatrixCache:
+    """Packed QR matrices in memory-mapped segment files under cache_dir"""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._index = {}  # key digest -> (segment bin path, offset, modules count)
+        self._maps = {}  # segment bin path -> mmap
+        self._writer = None
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _segments(self):
+        return sorted(self.cache_dir.glob('matrices-*.idx'))
+
+    def _load(self):
+        """Read every segment index, ignoring records a crash left incomplete"""
+        for idx_path in self._segments():
+            bin_path = idx_path.with_suffix('.bin')
+            if not bin_path.exists():
+                continue
+            bin_size = bin_path.stat().st_size
+            data = idx_path.read_bytes()
+            usable = len(data) - len(data) % INDEX_RECORD.size
+            for key, offset, count in INDEX_RECORD.iter_unpack(data[:usable]):
+                if offset + packed_size(count) <= bin_size:
+                    self._index[key] = (bin_path, offset, count)
+
+    def _map(self, bin_path):
+        mapped = self._maps.get(bin_path)
+        if mapped is None:
+            with open(bin_path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[bin_path] = mapped
+        return mapped
+
+    def get(self, key):
+        """(modules, modules_count) for a key, or None"""
+        entry = self._index.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        bin_path, offset, count = entry
+        mapped = self._map(bin_path)
+        if offset + packed_size(count) > len(mapped):
+            # Written by this process after the map was made
+            mapped.close()
+            del self._maps[bin_path]
+            mapped = self._map(bin_path)
+        self.hits += 1
+        return unpack_modules(mapped[offset:offset + packed_size(count)], count), count
+
+    def put(self, key, modules):
+        """Append a matrix to this process's segment"""
+        if key in self._index:
+            return
+        if self._writer is None:
+            name = f"matrices-{os.getpid()}-{os.urandom(4).hex()}"
+            self._writer = (open(self.cache_dir / f"{name}.bin", 'ab'),
+                            open(self.cache_dir / f"{name}.idx", 'ab'))
+        bin_file, idx_file = self._writer
+        packed = pack_modules(modules)
+        offset = bin_file.seek(0, os.SEEK_END)
+        bin_file.write(packed)
+        bin_file.flush()
+        idx_file.write(INDEX_RECORD.pack(key, offset, len(modules)))
+        idx_file.flush()
+        self._index[key] = (Path(bin_file.name), offset, len(modules))
+
+    def close(self):
+        for mapped in self._maps.values():
+            mapped.close()
+        self._maps.clear()
+        if self._writer:
+            for f in self._writer:
+                f.close()
+            self._writer = None
+
+    def compact(self):
+        """
+        Merge all segments into one. Only call this when no other process is
+        writing to the directory (e.g. after a batch's workers have exited).
+        """
+        self.close()
+        self._index.clear()
+        self._load()
+        segments = self._segments()
+        if len(segments) <= 1:
+            return
+
+        name = f"matrices-{os.getpid()}-{os.urandom(4).hex()}"
+        tmp_bin = self.cache_dir / f"{name}.bin.tmp"
+        tmp_idx = self.cache_dir / f"{name}.idx.tmp"
+        index = {}
+        with open(tmp_bin, 'wb') as bin_file, open(tmp_idx, 'wb') as idx_file:
+            for key, (bin_path, offset, count) in self._index.items():
+                packed = self._map(bin_path)[offset:offset + packed_size(count)]
+                index[key] = (self.cache_dir / f"{name}.bin", bin_file.tell(), count)
+                bin_file.write(packed)
+                idx_file.write(INDEX_RECORD.pack(key, index[key][1], count))
+        self.close()
+
+        # Publish the merged segment before removing the old ones
+        os.replace(tmp_bin, self.cache_dir / f"{name}.bin")
+        os.replace(tmp_idx, self.cache_dir / f"{name}.idx")
+        for idx_path in segments:
+            idx_path.unlink()
+            idx_path.with_suffix('.bin').unlink(missing_ok=True)
+        self._index = index
+
+    def compact_if_fragmented(self):
+        if len(self._segments()) > MAX_SEGMENTS:
+            self.compact()
+
+
+class MemoryMatrixCache:
+    """Packed QR matrices held in this process only"""
+
+    def __init__(self):
+        self._entries = {}  # key digest -> (packed rows, modules count)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """(modules, modules_count) for a key, or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        packed, count = entry
+        return unpack_modules(packed, count), count
+
+    def put(self, key, modules):
+        self._entries.setdefault(key, (pack_modules(modules), len(modules)))
+
+    def compact_if_fragmented(self):
+        pass  # Nothing on disk
+
+
+_caches = {}
+
+
+def get_matrix_cache(cache_dir):
+    """One MatrixCache per cache directory per process (a MemoryMatrixCache for MEMORY_CACHE)"""
+    if cache_dir == MEMORY_CACHE:
+        key = MEMORY_CACHE
+    else:
+        key = str(Path(cache_dir).resolve())
+    if key not in _caches:
+        _caches[key] = MemoryMatrixCache() if key == MEMORY_CACHE else MatrixCache(cache_dir)
+    return _caches[key]
+
+
+def qr_class(encoder='qrcode'):
+    """QRCode class for an encoder name (NumPy is only imported when asked for)"""
+    if encoder == 'numpy':
+        from numpy_encoder import NumpyMaskQRCode
+        return NumpyMaskQRCode
+    if encoder != 'qrcode':
+        raise ValueError(f"Unknown encoder: {encoder} (expected one of {', '.join(ENCODERS)})")
+    import qrcode
+    return qrcode.QRCode
+
+
+def cached_qr(payload, cache_dir=None, version=1, error_correction=ERROR_CORRECT_H,
+              box_size=10, border=4, fit=True, encoder='qrcode'):
+    """
+    A made qrcode.QRCode for payload, encoded only if the matrix isn't cached.
+
+    On a hit the QRCode gets the stored modules and is marked as made, so
+    make_image() draws it without running the encoder.
+    """
+    qr = qr_class(encoder)(version=version, error_correction=error_correction,
+                           box_size=box_size, border=border)
+    cache = get_matrix_cache(cache_dir) if cache_dir else None
+    key = matrix_key(payload, error_correction, version, fit) if cache else None
+
+    cached = cache.get(key) if cache else None
+    if cached is not None:
+        qr.modules, qr.modules_count = cached
+        qr.version = (qr.modules_count - 17) // 4
+        qr.data_cache = b''  # Marks the code as made for make_image()
+        return qr
+
+    qr.add_data(payload)
+    qr.make(fit=fit)
+    if cache:
+        cache.put(key, qr.modules)
+    return qr
@@ -0,0 +1,80 @@
+"""
+Render QR codes directly at the badge resolution.
+
+The generators used to draw every code at box_size=10 and then LANCZOS-resize
+it to QR_SIZE. That resample costs time on every badge and blurs the module
+edges. Here the module size is picked per code so the matrix plus quiet zone
+fills QR_SIZE, and any leftover pixels are split evenly around it.
+"""
+import timeit
+
+from stage_timer import stage
+
+LEGACY_BOX_SIZE = 10  # What the generators rendered at before resizing
+
+
+def native_box_size(modules_count, border, target_size):
+    """Largest whole-pixel module size that fits the code in target_size"""
+    box_size = target_size // (modules_count + 2 * border)
+    if box_size < 1:
+        raise ValueError(
+            f"{modules_count} modules plus a {border}-module border "
+            f"do not fit in {target_size}px"
+        )
+    return box_size
+
+
+def center_on_canvas(image, target_size):
+    """Pad image with white to target_size x target_size, keeping it centred"""
+    if image.size == (target_size, target_size):
+        return image
+    from PIL import Image
+    canvas = Image.new(image.mode, (target_size, target_size), 'white')
+    offset = ((target_size - image.size[0]) // 2, (target_size - image.size[1]) // 2)
+    canvas.paste(image, offset)
+    return canvas
+
+
+def render_native(qr, target_size, pad=True, **make_image_kwargs):
+    """
+    Draw an already-made qrcode.QRCode at target_size pixels with no resample.
+
+    make_image_kwargs are passed straight to qr.make_image (image_factory etc).
+    With pad=False the code is returned at its exact size (up to a few pixels
+    under target_size) for callers that centre it themselves.
+    """
+    qr.box_size = native_box_size(qr.modules_count, qr.border, target_size)
+    with stage('rasterize'):
+        image = qr.make_image(**make_image_kwargs).get_image()
+    return center_on_canvas(image, target_size) if pad else image
+
+
+def render_resized(qr, target_size, **make_image_kwargs):
+    """The old path: draw at LEGACY_BOX_SIZE, then LANCZOS-resize to target_size"""
+    qr.box_size = LEGACY_BOX_SIZE
+    with stage('rasterize'):
+        image = qr.make_image(**make_image_kwargs).get_image()
+    from PIL import Image
+    with stage('resize'):
+        return image.resize((target_size, target_size), Image.Resampling.LANCZOS)
+
+
+def measure_native_savings(qr, target_size, repeat=5, **make_image_kwargs):
+    """
+    Time both paths on one code.
+
+    Returns (resized_seconds, native_seconds), the best of `repeat` runs each.
+    """
+    resized = min(timeit.repeat(
+        lambda: render_resized(qr, target_size, **make_image_kwargs), number=1, repeat=repeat))
+    native = min(timeit.repeat(
+        lambda: render_native(qr, target_size, **make_image_kwargs), number=1, repeat=repeat))
+    return resized, native
+
+
+def format_savings(resized, native, badge_count):
+    """One-line report of the per-badge and whole-batch time saved"""
+    saved = resized - native
+    return (f"📐 Native render: {native * 1000:.1f} ms vs {resized * 1000:.1f} ms "
+            f"with box_size={LEGACY_BOX_SIZE} + LANCZOS "
+            f"(saves {saved * 1000:.1f} ms per badge, ~{saved * badge_count:.1f}s this batch)")
@@ -0,0 +1,132 @@
+"""
+NumPy-vectorized image factory for Vercel-style QR codes.
+
+VercelStyleImage draws one PIL rectangle per dark module, which is thousands
+of Python-level draw calls for every code at ERROR_CORRECT_H. This factory
+takes the finished module matrix as a boolean array and builds the whole
+raster in one go: square modules are upscaled with np.kron and the rounded
+position-marker rings are stamped from a sprite drawn once per box size.
+
+The result is pixel-identical to VercelStyleImage (rendered as 'L' instead of
+'RGB', with the same values in every channel).
+
+Usage:
+    qr.make_image(image_factory=VercelStyleNumpyImage, radius_ratio=0.3)
+"""
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw
+from qrcode.image.base import BaseImage
+
+from function_patterns import FINDER, pattern_index_for_size
+
+FINDER_SIZE = 7  # Position markers are 7x7 modules
+
+
+@lru_cache(maxsize=None)
+def position_marker_mask(modules_count):
+    """
+    Boolean (n, n) array of the modules VercelStyleImage draws rounded.
+
+    Taken from the function-pattern index: the three 7x7 marker squares minus
+    their inner 3x3 centre.
+    """
+    index = pattern_index_for_size(modules_count)
+    classes = np.frombuffer(b''.join(index), dtype=np.uint8).reshape(modules_count, modules_count)
+    mask = classes == FINDER
+    mask.setflags(write=False)
+    return mask
+
+
+@lru_cache(maxsize=None)
+def marker_ring_sprite(box_size, radius_ratio):
+    """
+    Pixel mask of one position-marker ring drawn with rounded modules.
+
+    Drawn with exactly the rounded_rectangle calls VercelStyleModuleDrawer
+    makes, so stamping it reproduces the per-module output. The sprite is one
+    pixel larger than 7 modules because PIL rectangles include their end point.
+    """
+    size = FINDER_SIZE * box_size + 1
+    sprite = Image.new('L', (size, size), 0)
+    draw = ImageDraw.Draw(sprite)
+    for row in range(FINDER_SIZE):
+        for col in range(FINDER_SIZE):
+            if row in (0, FINDER_SIZE - 1) or col in (0, FINDER_SIZE - 1):
+                x = col * box_size
+                y = row * box_size
+                draw.rounded_rectangle(
+                    [(x, y), (x + box_size, y + box_size)],
+                    radius=box_size * radius_ratio,
+                    fill=255
+                )
+    mask = np.asarray(sprite) > 0
+    mask.setflags(write=False)
+    return mask
+
+
+def rasterize_modules(modules, box_size, border, radius_ratio=0.3):
+    """
+    Build the dark-pixel mask for a module matrix.
+
+    modules is an (n, n) boolean array; returns a boolean array of
+    (n + 2 * border) * box_size pixels per side.
+    """
+    modules = np.asarray(modules, dtype=bool)
+    count = modules.shape[0]
+    pixel_size = (count + 2 * border) * box_size
+    offset = border * box_size
+
+    # One extra pixel row/column so end-inclusive rectangles never fall off
+    canvas = np.zeros((pixel_size + 1, pixel_size + 1), dtype=bool)
+
+    # Square modules: upscale each module to a box_size block, then grow every
+    # block by one pixel right and down to match PIL's inclusive rectangles
+    squares = modules & ~position_marker_mask(count)
+    blocks = np.kron(squares, np.ones((box_size, box_size), dtype=bool))
+    end = offset + count * box_size
+    canvas[offset:end, offset:end] |= blocks
+    canvas[offset + 1:end + 1, offset:end] |= blocks
+    canvas[offset:end, offset + 1:end + 1] |= blocks
+    canvas[offset + 1:end + 1, offset + 1:end + 1] |= blocks
+
+    # Rounded marker rings stamped at the three corners
+    sprite = marker_ring_sprite(box_size, radius_ratio)
+    span = sprite.shape[0]
+    far = offset + (count - FINDER_SIZE) * box_size
+    for y, x in ((offset, offset), (offset, far), (far, offset)):
+        canvas[y:y + span, x:x + span] |= sprite
+
+    return canvas[:pixel_size, :pixel_size]
+
+
+class VercelStyleNumpyImage(BaseImage):
+    """
+    Image factory that rasterizes the full module matrix with NumPy instead
+    of drawing module by module
+    """
+    kind = "PNG"
+    needs_drawrect = False
+    needs_processing = True
+
+    def __init__(self, *args, **kwargs):
+        self.radius_ratio = kwargs.pop('radius_ratio', 0.3)
+        super().__init__(*args, **kwargs)
+
+    def new_image(self, **kwargs):
+        # The raster is built in process() once the module matrix is final
+        return None
+
+    def drawrect(self, row, col):
+        raise NotImplementedError("VercelStyleNumpyImage draws the whole matrix in process()")
+
+    def process(self):
+        dark = rasterize_modules(self.modules, self.box_size, self.border, self.radius_ratio)
+        self._img = Image.fromarray(np.where(dark, 0, 255).astype(np.uint8), 'L')
+
+    def save(self, stream, format=None, **kwargs):
+        self._img.save(stream, format=format or self.kind, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._img, name)
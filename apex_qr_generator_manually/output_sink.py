@@ -0,0 +1,370 @@
+"""
+Where finished badges go: loose files, one archive, or a sprite atlas.
+
+A 30k roster as loose files is 30k inodes, which is slow to list, rsync and
+upload. The other sinks put the batch into a single file next to the output
+directory:
+
+    zip    student_qr_codes.zip     images stored as is (already compressed),
+                                    SVGs deflated
+    tar    student_qr_codes.tar     uncompressed, for streaming to other tools
+    atlas  student_qr_codes.<n>.atlas
+                                    badge files back to back, plus
+           student_qr_codes.atlas.json
+                                    {"atlas": "<file>", "files": {"<name>": [offset, length]}, ...}
+
+Each atlas slice is a complete PNG/WebP/AVIF/SVG file, so a server can
+answer a badge request with a byte range of the atlas (or an mmap slice)
+and the content type from the index. Every build publishes its atlas under
+a new generation number <n> and then replaces the index, which names the
+atlas it describes: a reader that opens the index and then the atlas it
+names always gets matching offsets. The previous generation is kept for
+readers still using it; older ones are removed.
+
+The render functions are unchanged: with an archive sink they render into a
+scratch directory (wrap()), and the main process moves each file's bytes
+into the archive as results arrive (store()). Archives are written to a
+temporary file and replaced at close(); badges the build manifest skipped
+are copied over from the previous archive, so incremental builds work the
+same as with loose files. A build that fails before close() calls abort(),
+which removes the temporary archive and scratch files and leaves the
+previous archive as it was.
+"""
+import io
+import json
+import mimetypes
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import time
+import zipfile
+from functools import partial
+from pathlib import Path
+
+SINKS = ('dir', 'zip', 'tar', 'atlas')
+
+ATLAS_VERSION = 2
+
+
+def render_to_bytes(render_func, item, scratch_dir):
+    """
+    Run a render function with output_dir=scratch_dir and take its file back.
+
+    Returns (result, file bytes). Module level so worker processes can run it.
+    """
+    result = render_func(item, output_dir=scratch_dir)
+    filename = result[0] if isinstance(result, tuple) else result
+    path = os.path.join(scratch_dir, filename)
+    with open(path, 'rb') as f:
+        data = f.read()
+    os.unlink(path)
+    return result, data
+
+
+class DirectorySink:
+    """Loose files in the output directory: what the generators always did"""
+
+    def __init__(self, output_dir):
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir
+
+    def wrap(self, render):
+        return render
+
+    def store(self, result):
+        return result
+
+    def exists(self, filename):
+        return (self.output_dir / filename).exists()
+
+    def stat(self, filename):
+        """[size, mtime_ns] of the file, None if it is missing"""
+        try:
+            stat = (self.output_dir / filename).stat()
+        except FileNotFoundError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def read(self, filename):
+        try:
+            return (self.output_dir / filename).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def remove(self, filename):
+        try:
+            (self.output_dir / filename).unlink()
+        except FileNotFoundError:
+            pass
+
+    def close(self, wanted):
+        pass
+
+    def abort(self):
+        pass
+
+    def summary(self):
+        return f"📁 Saved in: {self.output_dir}/"
+
+
+class ArchiveSink:
+    """
+    Base for single-file sinks. Subclasses read the previous archive's
+    entries and write the new one.
+    """
+
+    suffix = None
+
+    def __init__(self, output_dir):
+        output_dir = Path(output_dir).resolve()
+        self.path = output_dir.with_name(f"{output_dir.name}{self.suffix}")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.count = 0
+        self._written = set()
+        self._latest = None  # (filename, bytes) of the badge stored last
+        self._previous = None
+        if self._has_previous():
+            try:
+                self._previous = self._open_previous()
+            except (OSError, ValueError, KeyError, zipfile.BadZipFile, tarfile.TarError):
+                print(f"⚠️  Replacing unreadable archive: {self.path}")
+        self._published_path = self.path
+        self._scratch_dir = tempfile.mkdtemp(prefix='badge-sink-')
+        fd, self._tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+        os.close(fd)
+        self._open_new(self._tmp_path)
+
+    def _has_previous(self):
+        return self.path.exists()
+
+    def wrap(self, render):
+        """render, changed to hand back (result, file bytes) instead of leaving a file"""
+        return partial(render_to_bytes, render, scratch_dir=self._scratch_dir)
+
+    def store(self, result):
+        """Add a wrapped render's file to the archive and return the render's own result"""
+        result, data = result
+        filename = result[0] if isinstance(result, tuple) else result
+        self._add(filename, data)
+        self._written.add(filename)
+        self._latest = (filename, data)
+        self.count += 1
+        return result
+
+    def exists(self, filename):
+        return self._previous is not None and filename in self._previous_names()
+
+    def stat(self, filename):
+        """
+        [] for a badge in the archive, None if it is missing. Archive entries
+        only change through the generator, so there is nothing to compare.
+        """
+        return [] if filename in self._written or self.exists(filename) else None
+
+    def read(self, filename):
+        """Bytes of the badge just stored, or of one in the previous archive"""
+        if self._latest and self._latest[0] == filename:
+            return self._latest[1]
+        if self.exists(filename):
+            return self._read_previous(filename)
+        return None
+
+    def remove(self, filename):
+        pass  # Entries not carried over by close() are gone
+
+    def close(self, wanted):
+        """Carry over the unchanged badges in wanted and move the archive into place"""
+        try:
+            for filename in wanted:
+                if filename not in self._written and self.exists(filename):
+                    self._add(filename, self._read_previous(filename))
+                    self.count += 1
+            self._close_new()
+            if self._previous is not None:
+                self._previous.close()
+            os.chmod(self._tmp_path, 0o644)  # mkstemp creates it private
+            self._publish(self._tmp_path)
+        except BaseException:
+            if os.path.exists(self._tmp_path):
+                os.unlink(self._tmp_path)
+            raise
+        finally:
+            shutil.rmtree(self._scratch_dir, ignore_errors=True)
+
+    def abort(self):
+        """Drop the unfinished archive and scratch files; the previous archive stays as it was"""
+        try:
+            self._close_new()
+            if self._previous is not None:
+                self._previous.close()
+        finally:
+            if os.path.exists(self._tmp_path):
+                os.unlink(self._tmp_path)
+            shutil.rmtree(self._scratch_dir, ignore_errors=True)
+
+    def _publish(self, tmp_path):
+        """Move the finished archive into place"""
+        os.replace(tmp_path, self.path)
+
+    def summary(self):
+        size = self._published_path.stat().st_size
+        return f"📦 Saved {self.count} badges in: {self._published_path} ({size / 2**20:.1f} MB)"
+
+
+class ZipSink(ArchiveSink):
+    suffix = '.zip'
+
+    def _open_previous(self):
+        return zipfile.ZipFile(self.path)
+
+    def _previous_names(self):
+        return self._previous.NameToInfo
+
+    def _read_previous(self, filename):
+        return self._previous.read(filename)
+
+    def _open_new(self, path):
+        self._archive = zipfile.ZipFile(path, 'w')
+
+    def _add(self, filename, data):
+        info = zipfile.ZipInfo(filename, time.localtime()[:6])
+        # Raster formats are compressed already; deflating them again only costs time
+        info.compress_type = zipfile.ZIP_DEFLATED if filename.endswith('.svg') else zipfile.ZIP_STORED
+        info.external_attr = 0o644 << 16
+        self._archive.writestr(info, data)
+
+    def _close_new(self):
+        self._archive.close()
+
+
+class TarSink(ArchiveSink):
+    suffix = '.tar'
+
+    def _open_previous(self):
+        archive = tarfile.open(self.path, 'r:')
+        self._members = {member.name: member for member in archive.getmembers()}
+        return archive
+
+    def _previous_names(self):
+        return self._members
+
+    def _read_previous(self, filename):
+        return self._previous.extractfile(self._members[filename]).read()
+
+    def _open_new(self, path):
+        self._archive = tarfile.open(path, 'w:', format=tarfile.PAX_FORMAT)
+
+    def _add(self, filename, data):
+        info = tarfile.TarInfo(filename)
+        info.size = len(data)
+        info.mtime = time.time()
+        info.mode = 0o644
+        self._archive.addfile(info, io.BytesIO(data))
+
+    def _close_new(self):
+        self._archive.close()
+
+
+def atlas_index_path(atlas_path):
+    return Path(f"{atlas_path}.json")
+
+
+def atlas_generation_path(atlas_path, generation):
+    """student_qr_codes.atlas -> student_qr_codes.<generation>.atlas"""
+    atlas_path = Path(atlas_path)
+    return atlas_path.with_name(f"{atlas_path.stem}.{generation}{atlas_path.suffix}")
+
+
+class AtlasSink(ArchiveSink):
+    """
+    Badge files concatenated into one binary, indexed by a JSON offset table.
+
+    self.path names the atlas as a whole (its index is self.path + .json);
+    the bytes live in the generation file the index points to.
+    """
+
+    suffix = '.atlas'
+
+    def __init__(self, output_dir):
+        self._previous_atlas = None  # Generation file the previous index named
+        super().__init__(output_dir)
+
+    def _has_previous(self):
+        return atlas_index_path(self.path).exists()
+
+    def _open_previous(self):
+        with open(atlas_index_path(self.path), encoding='utf-8') as f:
+            index = json.load(f)
+        self._previous_index = index['files']
+        self._previous_atlas = self.path.with_name(index.get('atlas', self.path.name))
+        return open(self._previous_atlas, 'rb')
+
+    def _previous_names(self):
+        return self._previous_index
+
+    def _read_previous(self, filename):
+        offset, length = self._previous_index[filename]
+        self._previous.seek(offset)
+        return self._previous.read(length)
+
+    def _open_new(self, path):
+        self._atlas = open(path, 'wb')
+        self._index = {}
+
+    def _add(self, filename, data):
+        self._index[filename] = [self._atlas.tell(), len(data)]
+        self._atlas.write(data)
+
+    def _close_new(self):
+        self._atlas.close()
+
+    def _generations(self):
+        """Published generation files (and a pre-generation atlas), oldest first"""
+        pattern = re.compile(rf"{re.escape(self.path.stem)}\.(\d+){re.escape(self.suffix)}")
+        generations = [(0, self.path)] if self.path.exists() else []
+        for path in self.path.parent.iterdir():
+            match = pattern.fullmatch(path.name)
+            if match:
+                generations.append((int(match[1]), path))
+        return sorted(generations)
+
+    def _publish(self, tmp_path):
+        # The atlas goes in under a name no reader has open, then the index
+        # that names it replaces the old one: the index never describes
+        # another atlas's bytes
+        generations = self._generations()
+        atlas_path = atlas_generation_path(self.path, generations[-1][0] + 1 if generations else 1)
+        os.replace(tmp_path, atlas_path)
+        self._published_path = atlas_path
+
+        content_types = sorted({mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                                for filename in self._index})
+        index_path = atlas_index_path(self.path)
+        fd, tmp_index_path = tempfile.mkstemp(dir=index_path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'version': ATLAS_VERSION, 'atlas': atlas_path.name,
+                           'content_type': content_types[0] if len(content_types) == 1 else None,
+                           'files': self._index}, f, separators=(',', ':'))
+            os.chmod(tmp_index_path, 0o644)
+            os.replace(tmp_index_path, index_path)
+        except BaseException:
+            os.unlink(tmp_index_path)
+            os.unlink(atlas_path)
+            raise
+
+        # Keep the generation readers of the old index may still be reading
+        keep = {atlas_path, self._previous_atlas}
+        for _, path in generations:
+            if path not in keep:
+                path.unlink()
+
+
+def open_sink(kind, output_dir):
+    """The output sink called kind (one of SINKS) for output_dir"""
+    sinks = {'dir': DirectorySink, 'zip': ZipSink, 'tar': TarSink, 'atlas': AtlasSink}
+    if kind not in sinks:
+        raise ValueError(f"Unknown output sink: {kind} (expected one of {', '.join(SINKS)})")
+    return sinks[kind](output_dir)
@@ -0,0 +1,95 @@
+"""
+PIL image factory for Vercel-style QR codes: rounded position markers,
+square modules everywhere else, drawn one module at a time.
+
+This is the reference rasterizer ('pil'); numpy_raster.VercelStyleNumpyImage
+draws the same pixels in one vectorized pass.
+
+Usage:
+    qr.make_image(image_factory=VercelStyleImage, vercel_drawer=VercelStyleModuleDrawer(0.3))
+"""
+from PIL import ImageDraw
+from qrcode.image.styledpil import StyledPilImage
+
+from function_patterns import FINDER, pattern_index_for_size
+
+
+class VercelStyleModuleDrawer:
+    """
+    Custom module drawer that creates Vercel-style QR codes with rounded edges
+    on the three positioning squares (markers) and standard square modules for
+    the rest of the QR code
+    """
+    def __init__(self, radius_ratio=0.3):
+        self.radius_ratio = radius_ratio
+
+    def drawrect(self, box, is_position_marker=False):
+        """
+        Draw a rectangle for a QR code module
+        """
+        # For position markers, draw with rounded corners
+        if is_position_marker:
+            # Draw a rounded rectangle
+            return lambda draw, x, y, size, color: draw.rounded_rectangle(
+                [(x, y), (x + size, y + size)],
+                radius=size * self.radius_ratio,
+                fill=color
+            )
+        else:
+            # For regular modules, draw standard square
+            return lambda draw, x, y, size, color: draw.rectangle(
+                [(x, y), (x + size, y + size)],
+                fill=color
+            )
+
+
+class VercelStyleImage(StyledPilImage):
+    """
+    Custom QR code image factory that applies Vercel-style rounded corners
+    to the position markers while keeping other modules as squares
+    """
+    def __init__(self, *args, **kwargs):
+        self.vercel_drawer = kwargs.pop('vercel_drawer', VercelStyleModuleDrawer())
+        super().__init__(*args, **kwargs)
+
+    def init_new_image(self):
+        super().init_new_image()
+        self._draw = ImageDraw.Draw(self._img)
+        # BaseImage.width is the module count
+        self._pattern_index = pattern_index_for_size(self.width)
+
+    def drawrect_context(self, row, col, qr):
+        """
+        StyledPilImage sends every module through drawrect_context, so route
+        it to our drawrect instead of the default square module drawer
+        """
+        self.drawrect(row, col, bool(qr.modules[row][col]))
+        
+    def drawrect(self, row, col, is_active=True):
+        """
+        Draw a module rectangle, with special handling for position markers
+        """
+        if not is_active:
+            return
+            
+        # Determine if this module is part of a position marker
+        is_position_marker = self._is_position_marker_module(row, col)
+        
+        # Get the appropriate drawing function from our custom drawer
+        draw_func = self.vercel_drawer.drawrect(None, is_position_marker)
+        
+        # Calculate coordinates
+        x = (col + self.border) * self.box_size
+        y = (row + self.border) * self.box_size
+        size = self.box_size
+        
+        # Draw the module
+        draw_func(self._draw, x, y, size, self.paint_color)
+        
+    def _is_position_marker_module(self, row, col):
+        """
+        Determine if a module at (row, col) is part of one of the three position markers
+        """
+        # The outer 7x7 ring of each marker (not its 3x3 centre), looked up in
+        # the function-pattern index precomputed for this QR version
+        return self._pattern_index[row][col] == FINDER
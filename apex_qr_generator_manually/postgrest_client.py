@@ -0,0 +1,315 @@
+"""
+Keyset-paged, concurrently prefetched reads of a PostgREST table (see
+supabase_roster for the strategy).
+
+iter_rows() runs the event loop in a background thread and hands rows to the
+render loop as pages arrive, so rendering starts on the first page while
+the rest are still downloading.
+"""
+import asyncio
+import concurrent.futures
+import json
+import ssl
+import threading
+from collections import namedtuple
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit
+
+from supabase_roster import DEFAULT_CONNECTIONS, DEFAULT_PAGE_SIZE, RosterFetchError, auth_headers
+
+PREFETCH = 2  # pages buffered per key range ahead of the render loop
+REQUEST_TIMEOUT = 30  # seconds
+
+# Query parameters the loader sets itself
+PAGING_PARAMS = ('order', 'limit', 'offset')
+
+Response = namedtuple('Response', 'status reason headers body')
+
+
+async def _read_chunked(reader):
+    chunks = []
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise asyncio.IncompleteReadError(b'', None)
+        size = int(line.split(b';')[0].strip(), 16)
+        if size == 0:
+            while await reader.readline() not in (b'\r\n', b'\n', b''):
+                pass  # trailers
+            return b''.join(chunks)
+        chunks.append(await reader.readexactly(size))
+        await reader.readexactly(2)
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP/1.1 connections to one server, at most size in use at
+    once. Idle connections are reused; one the server has closed meanwhile
+    is replaced and the request retried.
+    """
+
+    def __init__(self, url, size=DEFAULT_CONNECTIONS, headers=None, timeout=REQUEST_TIMEOUT):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"Not an http(s) URL: {url}")
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.host_header = parts.netloc.rpartition('@')[2]
+        self.ssl = ssl.create_default_context() if parts.scheme == 'https' else None
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+        self.opened = 0
+        self.requests = 0
+        self._idle = []
+        self._slots = asyncio.Semaphore(size)
+
+    async def request(self, method, target, headers=None):
+        async with self._slots:
+            for attempt in range(2):
+                reused = bool(self._idle)
+                connection = self._idle.pop() if reused else await self._connect()
+                try:
+                    response, keep_alive = await asyncio.wait_for(
+                        self._exchange(connection, method, target, headers), self.timeout)
+                except (ConnectionError, asyncio.IncompleteReadError) as e:
+                    connection[1].close()
+                    if reused and attempt == 0:
+                        continue  # the server dropped the idle connection
+                    raise RosterFetchError(f"{method} {target}: connection lost ({e})") from e
+                except asyncio.TimeoutError:
+                    connection[1].close()
+                    raise RosterFetchError(f"{method} {target}: no response in {self.timeout}s") from None
+                except BaseException:
+                    connection[1].close()
+                    raise
+                self.requests += 1
+                if keep_alive:
+                    self._idle.append(connection)
+                else:
+                    connection[1].close()
+                return response
+
+    async def _connect(self):
+        try:
+            connection = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port, ssl=self.ssl), self.timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            raise RosterFetchError(f"Can't connect to {self.host_header}: {e or 'timed out'}") from e
+        self.opened += 1
+        return connection
+
+    async def _exchange(self, connection, method, target, headers):
+        reader, writer = connection
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {self.host_header}", "Accept-Encoding: identity"]
+        lines += [f"{name}: {value}" for name, value in {**self.headers, **(headers or {})}.items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("closed by the server")
+        version, status, *reason = status_line.decode('latin-1').split(None, 2)
+        response_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        status = int(status)
+        keep_alive = version == 'HTTP/1.1' and response_headers.get('connection', '').lower() != 'close'
+        if method == 'HEAD' or status in (204, 304) or status < 200:
+            body = b''
+        elif response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = await _read_chunked(reader)
+        elif 'content-length' in response_headers:
+            body = await reader.readexactly(int(response_headers['content-length']))
+        else:
+            body = await reader.read()  # delimited by the server closing
+            keep_alive = False
+        return Response(status, ''.join(reason).strip(), response_headers, body), keep_alive
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+        for _, writer in idle:
+            try:
+                await writer.wait_closed()
+            except (OSError, ssl.SSLError):
+                pass
+
+
+def _error_message(response):
+    """PostgREST's error message from a JSON body, else the start of the body or the reason"""
+    if not response.body:
+        return response.reason
+    try:
+        error = json.loads(response.body)
+        message = error.get('message') or error.get('error') or response.body[:200]
+        hint = f" ({error['hint']})" if error.get('hint') else ''
+        return f"{message}{hint}"
+    except (ValueError, AttributeError):
+        return response.body[:200].decode('utf-8', 'replace')
+
+
+class TableReader:
+    """
+    Keyset-paged reads of one PostgREST table, split into key ranges that
+    are fetched concurrently and yielded in key order by pages().
+    """
+
+    def __init__(self, url, key='id', select=None, page_size=DEFAULT_PAGE_SIZE,
+                 connections=DEFAULT_CONNECTIONS, prefetch=PREFETCH, api_key=None):
+        parts = urlsplit(url)
+        self.url = url
+        self.path = parts.path or '/'
+        query = parse_qsl(parts.query, keep_blank_values=True)
+        self.select = next((value for name, value in query if name == 'select'), select)
+        self.filters = [(name, value) for name, value in query if name not in PAGING_PARAMS + ('select',)]
+        self.key = key
+        self.page_size = page_size
+        self.connections = connections
+        self.prefetch = prefetch
+        self.api_key = api_key
+        self.rows = 0
+        self.pool = None
+        self._largest_page = 0
+
+    def _target(self, params):
+        return f"{self.path}?{urlencode(params, quote_via=quote, safe=',.:*()')}"
+
+    async def _get(self, params, headers=None, method='GET'):
+        response = await self.pool.request(method, self._target(params), headers)
+        if response.status >= 300:
+            raise RosterFetchError(f"{self.url}: HTTP {response.status}: {_error_message(response)}")
+        return response
+
+    async def _get_rows(self, params):
+        response = await self._get(params)
+        try:
+            rows = json.loads(response.body)
+        except ValueError as e:
+            raise RosterFetchError(f"{self.url}: response is not JSON ({e})") from e
+        if not isinstance(rows, list):
+            raise RosterFetchError(f"{self.url}: expected a JSON array of rows")
+        if rows and self.key not in rows[0]:
+            raise RosterFetchError(f"{self.url}: rows have no '{self.key}' column to page by; add it to select")
+        return rows
+
+    async def count(self):
+        """Rows matching the filters, or None if the server won't say"""
+        response = await self._get(self.filters + [('limit', 1)], {'Prefer': 'count=exact'}, method='HEAD')
+        total = response.headers.get('content-range', '').rpartition('/')[2]
+        return int(total) if total.isdigit() else None
+
+    async def split_keys(self, total):
+        """Keys at evenly spaced offsets, the lower bounds of every range after the first"""
+        ranges = min(self.connections, -(-total // self.page_size))
+        if ranges < 2:
+            return []
+        lookups = [self._get_rows([('select', self.key)] + self.filters +
+                                  [('order', f"{self.key}.asc"), ('offset', total * n // ranges), ('limit', 1)])
+                   for n in range(1, ranges)]
+        keys = [rows[0][self.key] for rows in await asyncio.gather(*lookups) if rows]
+        return list(dict.fromkeys(keys))
+
+    async def _page_range(self, lower, upper, pages):
+        """Put the pages of keys in [lower, upper) on the pages queue, then None"""
+        last = None
+        while True:
+            params = ([('select', self.select)] if self.select else []) + list(self.filters)
+            if last is not None:
+                params.append((self.key, f"gt.{last}"))
+            elif lower is not None:
+                params.append((self.key, f"gte.{lower}"))
+            if upper is not None:
+                params.append((self.key, f"lt.{upper}"))
+            params += [('order', f"{self.key}.asc"), ('limit', self.page_size)]
+            rows = await self._get_rows(params)
+            self._largest_page = max(self._largest_page, len(rows))
+            if rows:
+                await pages.put(rows)
+                last = rows[-1][self.key]
+            # A short page is the end, unless the server caps pages below
+            # page_size: then only one shorter than its cap is
+            if not rows or len(rows) < self._largest_page:
+                break
+        await pages.put(None)
+
+    async def _next(self, pages, tasks):
+        """The next item on pages, raising as soon as any range fails"""
+        get = asyncio.ensure_future(pages.get())
+        try:
+            while not get.done():
+                await asyncio.wait({get, *tasks}, return_when=asyncio.FIRST_COMPLETED)
+                for task in [task for task in tasks if task.done()]:
+                    tasks.discard(task)
+                    if not task.cancelled() and task.exception() is not None:
+                        raise task.exception()
+            return get.result()
+        finally:
+            get.cancel()
+
+    async def pages(self):
+        """Lists of rows, in key order"""
+        self.pool = ConnectionPool(self.url, self.connections, auth_headers(self.api_key))
+        tasks = set()
+        try:
+            total = await self.count()
+            splits = await self.split_keys(total) if total else []
+            bounds = list(zip([None] + splits, splits + [None]))
+            size = f"{total} rows" if total is not None else "rows"
+            print(f"🌐 Fetching {size} from {self.url} over {len(bounds)} connection"
+                  f"{'s' if len(bounds) != 1 else ''}")
+            queues = [asyncio.Queue(self.prefetch) for _ in bounds]
+            tasks = {asyncio.create_task(self._page_range(lower, upper, queue))
+                     for (lower, upper), queue in zip(bounds, queues)}
+            for queue in queues:
+                while (page := await self._next(queue, tasks)) is not None:
+                    self.rows += len(page)
+                    yield page
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.pool.close()
+
+    def summary(self):
+        return (f"🌐 Fetched {self.rows} rows in {self.pool.requests} requests "
+                f"over {self.pool.opened} connection{'s' if self.pool.opened != 1 else ''}")
+
+
+async def _next_page(pages):
+    return await anext(pages, None)
+
+
+def iter_rows(url, key='id', select=None, page_size=DEFAULT_PAGE_SIZE, connections=DEFAULT_CONNECTIONS,
+              prefetch=PREFETCH, api_key=None):
+    """
+    Stream a table's rows (dicts) in key order.
+
+    The fetching runs in an event loop on a background thread and keeps up
+    to prefetch pages per range ready while the caller works on earlier rows.
+    """
+    reader = TableReader(url, key, select, page_size, connections, prefetch, api_key)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name='roster-fetch', daemon=True)
+    thread.start()
+    pages = reader.pages()
+    finished = False
+    try:
+        while (page := asyncio.run_coroutine_threadsafe(_next_page(pages), loop).result()) is not None:
+            yield from page
+        finished = True
+    finally:
+        try:
+            asyncio.run_coroutine_threadsafe(pages.aclose(), loop).result(REQUEST_TIMEOUT)
+        except concurrent.futures.TimeoutError:
+            pass  # never hold up the render loop over a slow goodbye; the thread is a daemon
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(REQUEST_TIMEOUT)
+        if not thread.is_alive():
+            loop.close()
+    if finished:
+        print(reader.summary())
@@ -0,0 +1,329 @@
+"""
+Print-shop imposition: badges laid out N-up on A4/A3 pages of one PDF.
+
+The generators feed every badge file to PrintSheets as the render loop
+produces it. Each badge becomes a PDF image object written to the file
+straight away, and a page (placements plus crop marks) is written as soon as
+it holds N badges, so memory stays at one page of placements however many
+badges there are. Only the object offsets (a few bytes per badge) are kept
+until the cross-reference table is written at the end.
+
+Non-interlaced PNGs without transparency, which is what the generators
+write, are embedded without re-encoding: their IDAT stream is already
+Flate data with PNG predictors, which PDF decodes natively. Anything else
+is decoded with PIL and deflated.
+
+Badges keep their aspect ratio and are scaled to the largest size the
+N-up grid allows; crop marks sit in the gutters, clear of the badges.
+
+Usage:
+    sheets = PrintSheets('badges.pdf', page_size='a4', per_page=8)
+    for path in badge_paths:
+        sheets.add(path)
+    sheets.close()
+"""
+import io
+import math
+import os
+import struct
+import tempfile
+import zlib
+from collections import deque
+from itertools import islice
+from pathlib import Path
+
+MM = 72 / 25.4  # PDF points per millimetre
+
+PAGE_SIZES = {  # Portrait, in points
+    'a4': (210 * MM, 297 * MM),
+    'a3': (297 * MM, 420 * MM),
+}
+
+PAGE_MARGIN = 10 * MM
+CROP_MARK_OFFSET = 2 * MM  # Gap between a badge's edge and its marks
+CROP_MARK_LENGTH = 4 * MM
+CROP_MARK_WIDTH = 0.25  # points
+GUTTER = 2 * (CROP_MARK_OFFSET + CROP_MARK_LENGTH)  # Room for both neighbours' marks
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_COLORS = {0: 1, 2: 3, 3: 1}  # Colour type -> samples per pixel PDF can take as is
+
+
+def _number(value):
+    return f"{value:.2f}".rstrip('0').rstrip('.')
+
+
+def choose_grid(per_page, page_size, badge_size):
+    """
+    (columns, rows, scale) of the grid that prints per_page badges largest.
+
+    badge_size is the badge's (width, height) in pixels; scale is points
+    per pixel.
+    """
+    page_width, page_height = page_size
+    width, height = badge_size
+    best = None
+    for columns in range(1, per_page + 1):
+        rows = math.ceil(per_page / columns)
+        cell_width = (page_width - 2 * PAGE_MARGIN - (columns - 1) * GUTTER) / columns
+        cell_height = (page_height - 2 * PAGE_MARGIN - (rows - 1) * GUTTER) / rows
+        scale = min(cell_width / width, cell_height / height)
+        if scale > 0 and (best is None or scale > best[2]):
+            best = (columns, rows, scale)
+    if best is None:
+        raise ValueError(f"{per_page} badges don't fit on one page")
+    return best
+
+
+def _open_source(source):
+    """A binary file for a path or a badge file's bytes"""
+    return io.BytesIO(source) if isinstance(source, bytes) else open(source, 'rb')
+
+
+def read_png_stream(source):
+    """
+    (width, height, color_space, bits, decode_parms, data) for a PNG (path
+    or bytes) PDF can decode as is, or None.
+    """
+    with _open_source(source) as f:
+        if f.read(8) != PNG_SIGNATURE:
+            return None
+        header = palette = None
+        idat = []
+        while True:
+            length_bytes = f.read(8)
+            if len(length_bytes) < 8:
+                return None
+            length, kind = struct.unpack('>I4s', length_bytes)
+            body = f.read(length)
+            f.read(4)  # CRC
+            if kind == b'IHDR':
+                header = struct.unpack('>IIBBBBB', body)
+            elif kind == b'PLTE':
+                palette = body
+            elif kind == b'IDAT':
+                idat.append(body)
+            elif kind == b'tRNS':
+                return None
+            elif kind == b'IEND':
+                break
+
+    width, height, bits, color_type, _, _, interlace = header
+    if interlace or color_type not in PNG_COLORS or bits > 8:
+        return None
+    if color_type == 3:
+        color_space = (f"[/Indexed /DeviceRGB {len(palette) // 3 - 1} "
+                       f"<{palette.hex()}>]")
+    else:
+        color_space = '/DeviceGray' if color_type == 0 else '/DeviceRGB'
+    decode_parms = (f"<< /Predictor 15 /Colors {PNG_COLORS[color_type]} "
+                    f"/BitsPerComponent {bits} /Columns {width} >>")
+    return width, height, color_space, bits, decode_parms, b''.join(idat)
+
+
+def read_image_stream(source):
+    """Like read_png_stream, for any image PIL can open (decoded and deflated)"""
+    png = read_png_stream(source)
+    if png:
+        return png
+    from PIL import Image  # PNG badges never need it
+    with Image.open(_open_source(source)) as image:
+        if image.mode in ('RGBA', 'LA', 'P') or 'transparency' in image.info:
+            flat = Image.new('RGB', image.size, 'white')
+            flat.paste(image.convert('RGBA'), (0, 0), image.convert('RGBA'))
+            image = flat
+        elif image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        color_space = '/DeviceGray' if image.mode == 'L' else '/DeviceRGB'
+        return image.width, image.height, color_space, 8, None, zlib.compress(image.tobytes())
+
+
+class PrintSheets:
+    """A multi-page PDF of N-up badge pages, written as badges are added"""
+
+    def __init__(self, path, page_size='a4', per_page=8):
+        if per_page < 1:
+            raise ValueError("per_page must be at least 1")
+        self.path = Path(path)
+        self.page_size = PAGE_SIZES[page_size]
+        self.per_page = per_page
+        self.badge_count = 0
+        self.page_count = 0
+        self._grid = None
+        self._page = []  # (image object number, width, height) on the current page
+        self._page_ids = []
+        self._offsets = {}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+        self._file = os.fdopen(fd, 'wb')
+        self._file.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        # 1 is the catalog and 2 the page tree, both written by close()
+        self._next_id = 3
+
+    def _write_object(self, body, stream=None, object_id=None):
+        if object_id is None:
+            object_id = self._next_id
+            self._next_id += 1
+        self._offsets[object_id] = self._file.tell()
+        self._file.write(f"{object_id} 0 obj\n{body}\n".encode('latin-1'))
+        if stream is not None:
+            self._file.write(b'stream\n' + stream + b'\nendstream\n')
+        self._file.write(b'endobj\n')
+        return object_id
+
+    def add(self, source):
+        """Place a badge image (path or file bytes) on the current page, starting a new page when full"""
+        width, height, color_space, bits, decode_parms, data = read_image_stream(source)
+        if self._grid is None:
+            self._grid = choose_grid(self.per_page, self.page_size, (width, height))
+        parms = f" /DecodeParms {decode_parms}" if decode_parms else ''
+        image_id = self._write_object(
+            f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+            f"/ColorSpace {color_space} /BitsPerComponent {bits} /Filter /FlateDecode{parms} "
+            f"/Length {len(data)} >>",
+            data,
+        )
+        self._page.append((image_id, width, height))
+        self.badge_count += 1
+        if len(self._page) == self.per_page:
+            self._flush_page()
+
+    def add_files(self, read, filenames):
+        """add() each badge read(filename) finds (an output_sink's read: bytes or None)"""
+        for filename in filenames:
+            data = read(filename)
+            if data is not None:
+                self.add(data)
+
+    def _flush_page(self):
+        if not self._page:
+            return
+        columns, rows, _ = self._grid
+        page_width, page_height = self.page_size
+        cell_width = (page_width - 2 * PAGE_MARGIN - (columns - 1) * GUTTER) / columns
+        cell_height = (page_height - 2 * PAGE_MARGIN - (rows - 1) * GUTTER) / rows
+
+        images = []
+        marks = []
+        for slot, (image_id, width, height) in enumerate(self._page):
+            column, row = slot % columns, slot // columns
+            scale = min(cell_width / width, cell_height / height)
+            w, h = width * scale, height * scale
+            # Centred in its cell; PDF y runs up from the bottom of the page
+            x = PAGE_MARGIN + column * (cell_width + GUTTER) + (cell_width - w) / 2
+            y = page_height - PAGE_MARGIN - row * (cell_height + GUTTER) - (cell_height + h) / 2
+            images.append(f"q {_number(w)} 0 0 {_number(h)} {_number(x)} {_number(y)} cm /Im{slot} Do Q")
+            marks.extend(self._crop_marks(x, y, w, h))
+
+        content = '\n'.join(images + [f"{CROP_MARK_WIDTH} w 0 G"] + marks).encode('latin-1')
+        content = zlib.compress(content)
+        content_id = self._write_object(f"<< /Filter /FlateDecode /Length {len(content)} >>", content)
+        xobjects = ' '.join(f"/Im{slot} {image_id} 0 R" for slot, (image_id, _, _) in enumerate(self._page))
+        page_id = self._write_object(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {_number(page_width)} {_number(page_height)}] "
+            f"/Resources << /XObject << {xobjects} >> >> /Contents {content_id} 0 R >>"
+        )
+        self._page_ids.append(page_id)
+        self._page = []
+        self.page_count += 1
+
+    @staticmethod
+    def _crop_marks(x, y, w, h):
+        """Stroke commands for the eight marks around a trim box"""
+        near, far = CROP_MARK_OFFSET, CROP_MARK_OFFSET + CROP_MARK_LENGTH
+        marks = []
+        for cx, dx in ((x, -1), (x + w, 1)):
+            for cy, dy in ((y, -1), (y + h, 1)):
+                marks.append(f"{_number(cx + dx * near)} {_number(cy)} m {_number(cx + dx * far)} {_number(cy)} l S")
+                marks.append(f"{_number(cx)} {_number(cy + dy * near)} m {_number(cx)} {_number(cy + dy * far)} l S")
+        return marks
+
+    def close(self):
+        """Write the last page, page tree and cross-reference table, and move the PDF into place"""
+        try:
+            self._flush_page()
+            kids = ' '.join(f"{page_id} 0 R" for page_id in self._page_ids)
+            self._write_object(f"<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>", object_id=2)
+            self._write_object("<< /Type /Catalog /Pages 2 0 R >>", object_id=1)
+
+            xref_offset = self._file.tell()
+            count = self._next_id
+            lines = [f"xref\n0 {count}\n", "0000000000 65535 f \n"]
+            lines.extend(f"{self._offsets[object_id]:010d} 00000 n \n" for object_id in range(1, count))
+            lines.append(f"trailer\n<< /Size {count} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n")
+            self._file.write(''.join(lines).encode('latin-1'))
+            self._file.close()
+            os.chmod(self._tmp_path, 0o644)  # mkstemp creates it private
+            os.replace(self._tmp_path, self.path)
+        except BaseException:
+            self._file.close()
+            os.unlink(self._tmp_path)
+            raise
+
+    def abort(self):
+        """Drop the unfinished PDF; an existing one at path stays as it was"""
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.unlink(self._tmp_path)
+
+    def summary(self):
+        return (f"🖨️  Print sheets: {self.badge_count} badges on {self.page_count} "
+                f"page{'s' if self.page_count != 1 else ''} → {self.path}")
+
+
+class RosterOrder:
+    """
+    Output filenames in roster order, for imposing skipped badges in place.
+
+    The render loop only sees badges that were (re)rendered; the build
+    planner notes every badge in its wanted dict. track() passes the planned
+    items through while recording the filenames the planner noted meanwhile,
+    so the caller can pick up the unchanged badges between two rendered ones.
+    """
+
+    def __init__(self, wanted):
+        self.wanted = wanted
+        self._order = deque()
+        self._queued = set()
+        self._seen = 0
+
+    def _catch_up(self):
+        new = len(self.wanted) - self._seen
+        if new:
+            names = list(islice(reversed(self.wanted), new))
+            self._order.extend(reversed(names))
+            self._queued.update(names)
+            self._seen = len(self.wanted)
+
+    def track(self, items):
+        for item in items:
+            self._catch_up()
+            yield item
+        self._catch_up()
+
+    def up_to(self, filename):
+        """
+        Filenames noted before filename, which is dropped from the order.
+
+        A filename handed out already (a repeated roster row) returns nothing.
+        """
+        self._catch_up()
+        if filename not in self._queued:
+            return []
+        earlier = []
+        while True:
+            name = self._order.popleft()
+            self._queued.discard(name)
+            if name == filename:
+                return earlier
+            earlier.append(name)
+
+    def rest(self):
+        """Every filename not handed out yet"""
+        self._catch_up()
+        rest = list(self._order)
+        self._order.clear()
+        self._queued.clear()
+        return rest
@@ -0,0 +1,388 @@
+"""
+On-demand badge rendering over HTTP.
+
+The app can only show badges that a batch run rendered ahead of time, so a
+walk-in student or a last-minute event waits for someone to re-run a
+generator. This service renders a badge when it is asked for, with the same
+styles, URLs and badge engine as the generators:
+
+    GET /badge/event/<event_id>.png      (or .webp, .avif, .svg)
+    GET /badge/student/<student_id>.png
+    GET /stats
+
+Student badges only need the ID, shortened as the generator does (a full
+UUID gives the same badge as its short ID). Events are looked up in the same
+roster the event generator reads (--input). A roster file is read again as
+soon as it changes, a PostgREST table at most every ROSTER_RELOAD_INTERVAL
+seconds, so events added or edited since startup are served without
+restarting.
+
+Encoded badges are kept in an LRU cache bounded by total bytes (--cache-mb).
+Responses carry an ETag derived from the badge's input digest (the same one
+the build manifest uses, logo file bytes included), so a matching
+If-None-Match is answered 304 without rendering or touching the cache, and a
+changed roster row or logo gets a new tag. /stats reports the cache counters
+and p50/p95/p99 render latency over the last LATENCY_WINDOW renders.
+
+Requests are served on threads; renders are serialized, since the engine
+reuses one badge buffer per process, but cache hits never wait for them.
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import generate_qr
+import generate_student_qr
+from badge_engine import RASTER_BACKENDS, render_badge
+from build_manifest import badge_digest
+from image_output import DEFAULT_COMPRESS_LEVEL, PNG_STRATEGIES
+from matrix_cache import ENCODERS
+from roster_input import FORMATS as ROSTER_FORMATS
+from stage_timer import PERCENTILES, percentile
+from supabase_roster import DEFAULT_CONNECTIONS, DEFAULT_PAGE_SIZE, RosterFetchError, is_postgrest
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_MB = 64
+DEFAULT_MAX_AGE = 300  # Seconds browsers may reuse a badge before revalidating its ETag
+
+ROSTER_RELOAD_INTERVAL = 10  # Seconds between reloads of a PostgREST roster while badges are requested
+LATENCY_WINDOW = 1000  # Renders the /stats percentiles cover
+
+CONTENT_TYPES = {'png': 'image/png', 'webp': 'image/webp', 'avif': 'image/avif', 'svg': 'image/svg+xml'}
+
+# /badge/<kind>/<id>[.<format>]; IDs end up in the QR payload, so only URL-safe characters
+BADGE_PATH = re.compile(r'/badge/(event|student)/([A-Za-z0-9_-]{1,64})(?:\.([a-z]+))?')
+
+
+class ByteCache:
+    """LRU cache of encoded badges, evicting the least recently used once max_bytes is exceeded"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> bytes, least recently used first
+        self.size = 0
+        self.hits = self.misses = self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self.entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def peek(self, key):
+        """The cached bytes for key, without counting a lookup or refreshing its place"""
+        with self._lock:
+            return self.entries.get(key)
+
+    def put(self, key, body):
+        """Store body under key; a body bigger than the whole cache is not kept"""
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self.entries[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'entries': len(self.entries), 'bytes': self.size, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'hit_rate': round(self.hits / lookups, 4) if lookups else None}
+
+
+class EventRoster:
+    """
+    Events by ID from the event generator's roster, reloaded when the roster
+    file changes (a PostgREST table: when it was read over
+    ROSTER_RELOAD_INTERVAL seconds ago)
+    """
+
+    def __init__(self, input_path=None, input_format=None, page_size=DEFAULT_PAGE_SIZE,
+                 connections=DEFAULT_CONNECTIONS):
+        self.input_path = input_path
+        self.load_args = (input_path, input_format, page_size, connections)
+        self.events = {}
+        self.loaded_at = None
+        self.mtime = None
+        self._lock = threading.Lock()
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.input_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def is_stale(self):
+        """Whether the roster may have changed since it was read"""
+        if self.input_path is None or self.input_path == '-':
+            return False  # The embedded data can't change, and stdin can only be read once
+        if is_postgrest(self.input_path):
+            return time.monotonic() - self.loaded_at >= ROSTER_RELOAD_INTERVAL
+        return self._file_mtime() != self.mtime
+
+    def load(self):
+        if self.input_path is not None and not is_postgrest(self.input_path):
+            self.mtime = self._file_mtime()  # Taken first, so a change during the read is seen next time
+        events = {event[0]: event for event in generate_qr.iter_events(*self.load_args)}
+        self.events, self.loaded_at = events, time.monotonic()
+        return len(events)
+
+    def get(self, event_id):
+        # One request reloads; the others keep answering from the roster they have meanwhile
+        if self.is_stale() and self._lock.acquire(blocking=False):
+            try:
+                if self.is_stale():
+                    try:
+                        print(f"🔄 Roster changed: reloaded ({self.load()} events)")
+                    except (OSError, ValueError, RosterFetchError) as e:
+                        print(f"❌ Roster reload failed: {e}")
+                        self.loaded_at = time.monotonic()  # Keep the old roster; retry after the interval
+            finally:
+                self._lock.release()
+        return self.events.get(event_id)
+
+
+class BadgeRenderer:
+    """Renders, caches and counts badges for the request handlers"""
+
+    def __init__(self, roster, cache, raster='pil', native=False, logo_cache_dir=None, matrix_cache_dir=None,
+                 encoder='qrcode', auto_ecc=False, png_compress_level=DEFAULT_COMPRESS_LEVEL,
+                 png_strategy='auto'):
+        self.roster = roster
+        self.cache = cache
+        self.render_options = dict(
+            raster=raster, native=native, encoder=encoder, matrix_cache_dir=matrix_cache_dir,
+            logo_cache_dir=logo_cache_dir, png_compress_level=png_compress_level, png_strategy=png_strategy,
+        )
+        self.recovery = dict(
+            event=generate_qr.ECC_RECOVERY_MARGIN if auto_ecc else None,
+            student=generate_student_qr.ECC_RECOVERY_MARGIN if auto_ecc else None,
+        )
+        self.styles = dict(
+            event=generate_qr.style_fingerprint(raster, native, self.recovery['event']),
+            student=generate_student_qr.style_fingerprint(raster, native, self.recovery['student']),
+        )
+        # PNG settings change the bytes but not the picture, so they only go into the ETag
+        self.encoding = dict(png_compress_level=png_compress_level, png_strategy=png_strategy)
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.renders = self.failures = 0
+        self._render_lock = threading.Lock()
+
+    def lookup(self, kind, badge_id):
+        """
+        (spec, input digest) for a badge, or None for an unknown event or a
+        student ID the scanner can't accept even shortened
+        """
+        if kind == 'student':
+            student_id = generate_student_qr.short_student_id(badge_id)
+            if len(student_id) not in generate_student_qr.SCANNER_ID_LENGTHS:
+                return None
+            return (generate_student_qr.student_spec(student_id),
+                    generate_student_qr.student_digest(student_id, self.styles[kind]))
+        # The digest covers the row and the logo file's bytes, so an edit to either changes the ETag
+        event = self.roster.get(badge_id)
+        if event is None:
+            return None
+        return generate_qr.event_spec(event), generate_qr.event_digest(event, self.styles[kind])
+
+    def etag(self, digest, output_format):
+        return '"' + badge_digest(self.encoding, output_format, digest)[:32] + '"'
+
+    def render(self, kind, spec, etag, output_format):
+        """Encoded badge bytes, from the cache or rendered now"""
+        key = (kind, output_format, etag)
+        body = self.cache.get(key)
+        if body is not None:
+            return body
+        with self._render_lock:
+            body = self.cache.peek(key)  # Rendered while this request waited for the lock
+            if body is not None:
+                return body
+            start = time.perf_counter()
+            try:
+                body = render_badge(spec, output_format, recovery_margin=self.recovery[kind],
+                                    **self.render_options)
+            except Exception:
+                self.failures += 1
+                raise
+            self.latencies.append(time.perf_counter() - start)
+            self.renders += 1
+        self.cache.put(key, body)
+        return body
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        render_ms = {'count': self.renders, 'failures': self.failures, 'window': len(latencies)}
+        if latencies:
+            render_ms['mean'] = round(sum(latencies) / len(latencies) * 1000, 3)
+            for pct in PERCENTILES:
+                render_ms[f"p{pct}"] = round(percentile(latencies, pct) * 1000, 3)
+            render_ms['max'] = round(latencies[-1] * 1000, 3)
+        return {'cache': self.cache.stats(), 'render_ms': render_ms, 'events': len(self.roster.events)}
+
+
+class BadgeHandler(BaseHTTPRequestHandler):
+    """GET/HEAD for /badge/... and /stats; the server holds the BadgeRenderer"""
+
+    protocol_version = 'HTTP/1.1'  # Keep-alive: the app fetches many badges per page
+    disable_nagle_algorithm = True  # Headers and body are separate writes
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def _respond(self, send_body):
+        self.send_body = send_body
+        path = urlsplit(self.path).path
+        if path == '/stats':
+            stats = dict(self.server.renderer.stats(), uptime_s=round(time.monotonic() - self.server.started, 1))
+            return self._send(200, json.dumps(stats, indent=1).encode('utf-8'), 'application/json',
+                              {'Cache-Control': 'no-store'})
+
+        match = BADGE_PATH.fullmatch(path)
+        if not match:
+            return self._error(404, "expected /badge/event/<id>.<format>, /badge/student/<id>.<format> or /stats")
+        kind, badge_id, output_format = match.group(1), match.group(2), match.group(3) or 'png'
+        if output_format not in CONTENT_TYPES:
+            return self._error(400, f"unsupported format {output_format!r} (use {', '.join(CONTENT_TYPES)})")
+
+        renderer = self.server.renderer
+        found = renderer.lookup(kind, badge_id)
+        if found is None:
+            if kind == 'student':
+                lengths = ' or '.join(str(length) for length in generate_student_qr.SCANNER_ID_LENGTHS)
+                return self._error(404, f"student IDs are {lengths} characters, or a full ID to shorten")
+            return self._error(404, f"no event {badge_id} in the roster")
+        spec, digest = found
+        etag = renderer.etag(digest, output_format)
+        headers = {'ETag': etag, 'Cache-Control': f"public, max-age={self.server.max_age}"}
+        if etag in (tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')):
+            return self._send(304, b'', None, headers)
+
+        try:
+            body = renderer.render(kind, spec, etag, output_format)
+        except Exception as e:
+            print(f"❌ Error rendering {kind} {badge_id}: {e}")
+            return self._error(500, f"could not render {kind} {badge_id}: {e}")
+        self._send(200, body, CONTENT_TYPES[output_format], headers)
+
+    def _error(self, status, message):
+        self._send(status, json.dumps({'error': message}).encode('utf-8'), 'application/json',
+                   {'Cache-Control': 'no-store'})
+
+    def _send(self, status, body, content_type, headers):
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        if status != 304:
+            self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.send_body and status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Per-request lines would cost more than serving a cached badge; errors are printed
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, cache_mb=DEFAULT_CACHE_MB, max_age=DEFAULT_MAX_AGE,
+          input_path=None, input_format=None, fetch_page_size=DEFAULT_PAGE_SIZE,
+          fetch_connections=DEFAULT_CONNECTIONS, **render_options):
+    """Load the event roster and serve badges until interrupted"""
+    roster = EventRoster(input_path, input_format, fetch_page_size, fetch_connections)
+    try:
+        print(f"📋 Loaded {roster.load()} events")
+    except (OSError, ValueError, RosterFetchError) as e:
+        print(f"❌ Error reading event roster: {e}")
+        return
+
+    server = ThreadingHTTPServer((host, port), BadgeHandler)
+    server.daemon_threads = True
+    server.renderer = BadgeRenderer(roster, ByteCache(int(cache_mb * 1024 * 1024)), **render_options)
+    server.max_age = max_age
+    server.started = time.monotonic()
+    print(f"🚀 Serving badges on http://{host}:{server.server_address[1]}/badge/<event|student>/<id>.png "
+          f"(stats at /stats, cache {cache_mb:g} MB)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
+    finally:
+        server.server_close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Render event and student QR badges on request over HTTP")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="address to listen on (default: %(default)s)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="port to listen on (default: %(default)s)")
+    parser.add_argument('--cache-mb', type=float, default=DEFAULT_CACHE_MB,
+                        help="memory for encoded badges; least recently used are evicted (default: %(default)s)")
+    parser.add_argument('--max-age', type=int, default=DEFAULT_MAX_AGE,
+                        help="Cache-Control max-age in seconds; clients revalidate with the ETag after it "
+                        "(default: %(default)s)")
+    parser.add_argument('--input', metavar='PATH', default=None,
+                        help="event roster: a CSV/TSV/JSONL file, 'supabase' or a PostgREST table URL "
+                        "(default: generate_qr.EVENTS_DATA)")
+    parser.add_argument('--format', choices=ROSTER_FORMATS, default=None,
+                        help="roster format (default: from the file extension)")
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE, metavar='N',
+                        help="rows per request when reading from Supabase/PostgREST (default: %(default)s)")
+    parser.add_argument('--fetch-connections', type=int, default=DEFAULT_CONNECTIONS, metavar='N',
+                        help="pooled connections, each paging its own key range (default: %(default)s)")
+    parser.add_argument('--raster', choices=RASTER_BACKENDS, default='pil',
+                        help="module rasterizer: per-module PIL drawing or NumPy (faster)")
+    parser.add_argument('--native', action='store_true',
+                        help="draw straight at the badge size instead of box_size=10 + LANCZOS resize")
+    parser.add_argument('--logo-cache', metavar='DIR', default=None,
+                        help="also keep finished logo discs in DIR for later runs and workers")
+    parser.add_argument('--encoder', choices=ENCODERS, default='qrcode',
+                        help="mask pattern scoring: qrcode's pure Python or vectorized NumPy (same output, faster)")
+    parser.add_argument('--matrix-cache', metavar='DIR', default=None,
+                        help="reuse encoded QR matrices stored in DIR")
+    parser.add_argument('--auto-ecc', action='store_true',
+                        help="pick the smallest QR version/error-correction level that stays readable under the logo "
+                        "instead of always H")
+    parser.add_argument('--png-compress-level', type=int, choices=range(10), default=DEFAULT_COMPRESS_LEVEL,
+                        metavar='0-9', help="PNG zlib level: 1 is fastest, 9 smallest (default: %(default)s)")
+    parser.add_argument('--png-strategy', choices=PNG_STRATEGIES, default='auto',
+                        help="PNG zlib strategy (default: Pillow's choice for the image mode)")
+    args = parser.parse_args()
+    if args.cache_mb <= 0:
+        parser.error("--cache-mb must be positive")
+    if args.max_age < 0:
+        parser.error("--max-age can't be negative")
+    if args.page_size < 1 or args.fetch_connections < 1:
+        parser.error("--page-size and --fetch-connections must be at least 1")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    serve(host=args.host, port=args.port, cache_mb=args.cache_mb, max_age=args.max_age,
+          input_path=args.input, input_format=args.format,
+          fetch_page_size=args.page_size, fetch_connections=args.fetch_connections,
+          raster=args.raster, native=args.native, logo_cache_dir=args.logo_cache,
+          matrix_cache_dir=args.matrix_cache, encoder=args.encoder, auto_ecc=args.auto_ecc,
+          png_compress_level=args.png_compress_level, png_strategy=args.png_strategy)
@@ -0,0 +1,126 @@
+"""
+Streaming roster input for the badge generators.
+
+Rows are read one at a time from a CSV, TSV or JSONL file (the formats a
+Supabase table export produces), or from stdin, and handed on as plain lists
+of column values. Nothing is materialised, so rendering starts on the first
+row and memory stays flat however long the roster is. Without an input file
+the generators fall back to their embedded EVENTS_DATA / STUDENTS_DATA text,
+read through the same path.
+"""
+import csv
+import io
+import json
+import sys
+from pathlib import Path
+
+FORMATS = ('csv', 'tsv', 'jsonl')
+
+_EXTENSIONS = {
+    '.csv': 'csv',
+    '.tsv': 'tsv',
+    '.tab': 'tsv',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+    '.json': 'jsonl',
+}
+
+
+def detect_format(path, fmt=None):
+    """Explicit format, else guessed from the file extension (stdin defaults to CSV)"""
+    if fmt:
+        return fmt
+    if path in (None, '-'):
+        return 'csv'
+    return _EXTENSIONS.get(Path(path).suffix.lower(), 'csv')
+
+
+def _delimited_records(stream, delimiter, header_names):
+    """Yield (line_number, columns) from a CSV/TSV stream, skipping a header row"""
+    reader = csv.reader(stream, delimiter=delimiter)
+    first = True
+    for row in reader:
+        columns = [column.strip() for column in row]
+        if not any(columns):
+            continue
+        if first and columns[0].lower() in header_names:
+            first = False
+            continue
+        first = False
+        yield reader.line_num, columns
+
+
+def record_columns(record, fields):
+    """
+    Column values of one JSON object.
+
+    fields lists, per output column, the keys that may hold it (first match
+    wins). Missing trailing columns are dropped so the caller's 2/3/4-column
+    fallbacks apply exactly as for CSV.
+    """
+    columns = []
+    for keys in fields:
+        value = next((record[key] for key in keys if record.get(key) not in (None, '')), None)
+        columns.append('' if value is None else str(value).strip())
+    while columns and not columns[-1]:
+        columns.pop()
+    return columns
+
+
+def _jsonl_records(stream, fields):
+    """Yield (line_number, columns) from a JSONL stream (fields as for record_columns)"""
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            print(f"⚠️  Skipping line {line_number}: invalid JSON ({e})")
+            continue
+        if not isinstance(record, dict):
+            print(f"⚠️  Skipping line {line_number}: expected a JSON object")
+            continue
+        columns = record_columns(record, fields)
+        if columns:
+            yield line_number, columns
+
+
+def iter_records(path=None, fmt=None, fields=(), header_names=(), default_text=''):
+    """
+    Stream (line_number, columns) records from path, stdin ('-') or default_text.
+
+    fields maps JSONL keys to columns (see _jsonl_records); header_names are
+    lowercase first-column values that mark a CSV/TSV header row to skip.
+    """
+    fmt = detect_format(path, fmt)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown input format: {fmt} (expected one of {', '.join(FORMATS)})")
+    header_names = {name.lower() for name in header_names}
+
+    if path is None:
+        stream = io.StringIO(default_text.strip())
+        fmt = 'csv'
+    elif path == '-':
+        stream = sys.stdin
+    else:
+        stream = open(path, newline='', encoding='utf-8-sig')
+
+    try:
+        if fmt == 'jsonl':
+            yield from _jsonl_records(stream, fields)
+        else:
+            delimiter = '\t' if fmt == 'tsv' else ','
+            yield from _delimited_records(stream, delimiter, header_names)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def describe_source(path):
+    """Human-readable name of where rows come from"""
+    if path is None:
+        return "embedded data"
+    if path == '-':
+        return "stdin"
+    return path
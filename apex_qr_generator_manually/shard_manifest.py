@@ -0,0 +1,267 @@
+"""
+Deterministic sharding of a badge build across machines.
+
+With --shard i/N a generator still reads the whole roster but renders only
+the rows whose ID hashes to shard i (a SHA-256 of the ID, so every machine
+and Python version agrees on the split). Each shard writes to its own
+output, e.g. qr_codes-shard-2-of-4/ with its own build manifest, so shards
+can share a disk without pruning each other's badges. Next to it goes a
+partial manifest, qr_codes-shard-2-of-4.shard.json, listing the IDs the
+shard owns, the file and input digest of each badge, the ones that failed,
+the size and digest of the roster it read, and any ID the roster repeats.
+
+Once every shard is done (copy the outputs and .shard.json files of all
+machines into one folder), merge them:
+
+    python shard_manifest.py qr_codes
+
+This checks that all N shards are there and read the same roster, that no
+ID or filename was built twice, and that every roster ID has a badge, then
+writes qr_codes.index.json mapping each ID to its shard output and file.
+Any gap or duplicate is listed in the index and printed, and the merge exits
+with status 1. IDs the roster itself lists more than once get one badge;
+they are listed and printed as a warning only.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+from collections import namedtuple
+from pathlib import Path
+
+MANIFEST_VERSION = 1
+
+SHARD_FILE = re.compile(r'(?P<name>.+)-shard-(?P<index>\d+)-of-(?P<count>\d+)\.shard\.json')
+
+
+def shard_of(item_id, count):
+    """Shard number (1..count) that owns an ID"""
+    digest = hashlib.sha256(item_id.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count + 1
+
+
+class Shard(namedtuple('Shard', 'index count')):
+    """Shard index of count, both 1-based as written on the command line (2/4)"""
+
+    def owns(self, item_id):
+        return shard_of(item_id, self.count) == self.index
+
+    def output_dir(self, output_dir):
+        """This shard's output folder: qr_codes -> qr_codes-shard-2-of-4"""
+        return f"{output_dir}-shard-{self.index}-of-{self.count}"
+
+    def __str__(self):
+        return f"{self.index}/{self.count}"
+
+
+def parse_shard(text):
+    """argparse type for 'i/N'"""
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected i/N, e.g. 2/4")
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard {text}: i must be between 1 and N")
+    return Shard(index, count)
+
+
+def shard_manifest_path(output_dir):
+    """Partial manifest location, next to the shard's output folder"""
+    output_dir = Path(output_dir).resolve()
+    return output_dir.with_name(f"{output_dir.name}.shard.json")
+
+
+def index_path(output_dir):
+    """Consolidated index location for the unsharded output folder name"""
+    output_dir = Path(output_dir).resolve()
+    return output_dir.with_name(f"{output_dir.name}.index.json")
+
+
+def _write_json(path, data):
+    """Write JSON atomically"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.chmod(tmp_path, 0o644)  # mkstemp creates it private
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+class ShardManifest:
+    """What one shard saw and built, for shard_manifest.py to merge"""
+
+    def __init__(self, shard, name, key, filename):
+        self.shard = shard
+        self.name = name  # Unsharded output folder name, e.g. qr_codes
+        self.key = key  # row -> ID
+        self.filename = filename  # row -> output filename
+        self.files = {}  # owned ID -> filename
+        self.failed = set()
+        self.rows = 0  # Distinct IDs in the roster
+        self.repeated = set()  # IDs the roster lists more than once
+        self._seen = set()
+        self._roster_digest = hashlib.sha256()
+
+    def select(self, rows, seen=None):
+        """
+        Pass on only the rows this shard owns, noting every row of the roster.
+
+        seen, if given, is called with the ID of every row, owned or not.
+        """
+        for row in rows:
+            item_id = self.key(row)
+            self._roster_digest.update(item_id.encode('utf-8') + b'\n')
+            if item_id in self._seen:
+                self.repeated.add(item_id)
+            else:
+                self._seen.add(item_id)
+                self.rows += 1
+            if seen is not None:
+                seen(item_id)
+            if self.shard.owns(item_id):
+                self.files[item_id] = self.filename(row)
+                yield row
+
+    def fail(self, row):
+        self.failed.add(self.key(row))
+
+    def save(self, output_dir, wanted, output=None):
+        """
+        Write the partial manifest next to the shard's output folder.
+
+        wanted is the run's filename -> input digest map; output is where the
+        badges went if not loose files in output_dir (an archive or atlas).
+        """
+        badges = {item_id: {'file': filename, 'digest': wanted.get(filename)}
+                  for item_id, filename in self.files.items() if item_id not in self.failed}
+        return _write_json(shard_manifest_path(output_dir), {
+            'version': MANIFEST_VERSION, 'name': self.name,
+            'shard': {'index': self.shard.index, 'count': self.shard.count},
+            'output': Path(output or output_dir).name,
+            'roster': {'rows': self.rows, 'digest': self._roster_digest.hexdigest()},
+            'badges': badges, 'failed': sorted(self.failed), 'repeated': sorted(self.repeated),
+        })
+
+    def summary(self):
+        repeated = f" ({len(self.repeated)} IDs listed more than once)" if self.repeated else ''
+        return f"🧩 Shard {self.shard}: {len(self.files)} of {self.rows} roster IDs{repeated}"
+
+
+def load_shard_manifests(output_dir):
+    """Every partial manifest for the output folder name, in shard order"""
+    output_dir = Path(output_dir).resolve()
+    manifests = []
+    for path in sorted(output_dir.parent.glob(f"{output_dir.name}-shard-*-of-*.shard.json")):
+        match = SHARD_FILE.fullmatch(path.name)
+        if not match or match['name'] != output_dir.name:
+            continue
+        with open(path, encoding='utf-8') as f:
+            manifests.append((path, json.load(f)))
+    manifests.sort(key=lambda entry: (entry[1]['shard']['count'], entry[1]['shard']['index']))
+    return manifests
+
+
+def repeated_ids(manifests):
+    """IDs the roster lists more than once (each shard saw the whole roster)"""
+    return sorted({item_id for _, data in manifests for item_id in data.get('repeated', ())})
+
+
+def merge_shards(manifests):
+    """
+    (index, gaps, duplicates) for a list of (path, partial manifest).
+
+    index maps ID -> {shard, output, file, digest}; gaps and duplicates are
+    human-readable problems. IDs repeated within the roster are neither
+    (see repeated_ids).
+    """
+    gaps, duplicates = [], []
+    counts = sorted({data['shard']['count'] for _, data in manifests})
+    if len(counts) > 1:
+        duplicates.append(f"shards were split different ways ({', '.join(f'of {count}' for count in counts)}); "
+                          "re-run every shard with the same N")
+    count = counts[-1]
+    indices = [data['shard']['index'] for _, data in manifests]
+    for number in range(1, count + 1):
+        if number not in indices:
+            gaps.append(f"shard {number}/{count} is missing")
+
+    rosters = {(data['roster']['rows'], data['roster']['digest']) for _, data in manifests}
+    if len(rosters) > 1:
+        gaps.append("shards read different rosters (" +
+                    ', '.join(f"{data['shard']['index']}/{data['shard']['count']}: {data['roster']['rows']} rows"
+                              for _, data in manifests) + "); re-run them against the same input")
+
+    index, owners = {}, {}
+    for path, data in manifests:
+        shard = Shard(data['shard']['index'], data['shard']['count'])
+        for item_id in data['failed']:
+            gaps.append(f"{item_id} failed to render in shard {shard}")
+        for item_id, badge in data['badges'].items():
+            if item_id in index:
+                duplicates.append(f"{item_id} was built by shards {index[item_id]['shard']} and {shard}")
+                continue
+            if not shard.owns(item_id):
+                duplicates.append(f"{item_id} was built by shard {shard} but belongs to "
+                                  f"{shard_of(item_id, shard.count)}/{shard.count}")
+            owner = owners.setdefault(badge['file'], item_id)
+            if owner != item_id:
+                duplicates.append(f"{owner} and {item_id} both write {badge['file']}")
+            index[item_id] = dict(badge, shard=str(shard), output=data['output'])
+
+    if len(rosters) == 1:
+        rows = next(iter(rosters))[0]
+        missing = rows - len(index) - sum(len(data['failed']) for _, data in manifests)
+        if missing > 0 and len(indices) == count:
+            gaps.append(f"{missing} roster IDs have no badge in any shard")
+    return index, gaps, duplicates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge the partial manifests of a sharded badge build")
+    parser.add_argument('output', help="unsharded output folder name, e.g. qr_codes or student_qr_codes")
+    parser.add_argument('--index', metavar='PATH', default=None,
+                        help="where to write the consolidated index (default: next to the output folder)")
+    args = parser.parse_args()
+
+    try:
+        manifests = load_shard_manifests(args.output)
+    except (OSError, ValueError) as e:
+        print(f"❌ Unreadable shard manifest: {e}")
+        sys.exit(1)
+    if not manifests:
+        print(f"❌ No shard manifests found for {args.output} "
+              f"(expected {args.output}-shard-<i>-of-<N>.shard.json)")
+        sys.exit(1)
+    for path, data in manifests:
+        print(f"🧩 {path.name}: {len(data['badges'])} badges, {len(data['failed'])} failed")
+
+    index, gaps, duplicates = merge_shards(manifests)
+    repeated = repeated_ids(manifests)
+    path = _write_json(args.index or index_path(args.output), {
+        'version': MANIFEST_VERSION, 'name': Path(args.output).name,
+        'shards': max(data['shard']['count'] for _, data in manifests),
+        'badges': dict(sorted(index.items())), 'gaps': gaps, 'duplicates': duplicates, 'repeated': repeated,
+    })
+    if repeated:
+        print(f"⚠️  The roster lists {len(repeated)} IDs more than once (one badge each): "
+              f"{', '.join(repeated[:5])}{' ...' if len(repeated) > 5 else ''}")
+    for problem in gaps:
+        print(f"❌ Gap: {problem}")
+    for problem in duplicates:
+        print(f"❌ Duplicate: {problem}")
+    print(f"📇 Index of {len(index)} badges: {path}")
+    if gaps or duplicates:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Per-stage badge timings for --profile.
+
+Rendering code marks its stages with
+
+    with stage('encode'):
+        qr = make_qr(...)
+
+which costs nothing while timing is off (a shared no-op context). With
+timing on, every process keeps its stage durations in memory;
+badge_pool hands each worker's samples back with its chunk results, and
+StageReport merges them into per-stage latency percentiles, counts and
+histograms for the whole batch, plus per-worker totals.
+
+With a cProfile directory each process also runs cProfile around its
+renders and dumps its stats there as worker-<pid>.pstats once, when the
+process exits (the main process: just before StageReport merges them into
+combined.pstats; open with python -m pstats).
+"""
+import json
+import math
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+# Report order; stages not listed here come after, alphabetically
+STAGES = ('badge', 'encode', 'rasterize', 'resize', 'compose', 'logo', 'text', 'svg', 'save')
+
+PERCENTILES = (50, 95, 99)
+
+_NO_TIMING = nullcontext()
+
+_samples = None  # stage -> [seconds] recorded in this process since the last drain
+_profiler = None
+_profile_dir = None
+
+
+def enable(profile_dir=None):
+    """Start timing stages in this process (and cProfile if profile_dir is set)"""
+    global _samples, _profiler, _profile_dir
+    if _samples is None:
+        _samples = {}
+    if profile_dir and _profiler is None:
+        import cProfile  # only profiled runs pay for importing it
+        from multiprocessing.util import Finalize
+        _profile_dir = Path(profile_dir)
+        _profile_dir.mkdir(parents=True, exist_ok=True)
+        _profiler = cProfile.Profile()
+        # Pool workers leave through multiprocessing's exit hooks, not atexit
+        Finalize(None, dump_profile, exitpriority=10)
+
+
+def enabled():
+    return _samples is not None
+
+
+@contextmanager
+def _timed(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _samples.setdefault(name, []).append(time.perf_counter() - start)
+
+
+def stage(name):
+    """Context manager that records how long its block takes under name"""
+    if _samples is None:
+        return _NO_TIMING
+    return _timed(name)
+
+
+def timed_render(render_func, item, profile_dir=None):
+    """
+    Run render_func(item) as one timed 'badge' stage, turning timing on in
+    this process first. Module level so worker processes can run it.
+    """
+    enable(profile_dir)
+    if _profiler is not None:
+        _profiler.enable()
+    try:
+        with _timed('badge'):
+            return render_func(item)
+    finally:
+        if _profiler is not None:
+            _profiler.disable()
+
+
+def drain():
+    """This process's samples since the last drain, or None if timing is off"""
+    global _samples
+    if _samples is None:
+        return None
+    samples, _samples = _samples, {}
+    return samples
+
+
+def dump_profile():
+    """Write this process's cProfile stats as worker-<pid>.pstats (no-op without cProfile)"""
+    if _profiler is not None:
+        _profiler.dump_stats(_profile_dir / f"worker-{os.getpid()}.pstats")
+
+
+def report_path(output_dir):
+    """Default JSON report location, next to the output directory"""
+    output_dir = Path(output_dir).resolve()
+    return output_dir.with_name(f"{output_dir.name}.profile.json")
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def histogram(values):
+    """Counts per power-of-two millisecond bucket, keyed by the bucket's upper bound"""
+    buckets = {}
+    for seconds in values:
+        bound = 2 ** max(0, math.ceil(math.log2(max(seconds * 1000, 1e-9))))
+        buckets[bound] = buckets.get(bound, 0) + 1
+    return {f"<={bound}ms": buckets[bound] for bound in sorted(buckets)}
+
+
+class StageReport:
+    """Stage samples gathered from every process that rendered badges"""
+
+    def __init__(self, profile_dir=None):
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.samples = {}
+        self.workers = {}  # pid -> {stage: total seconds}
+
+    def add(self, pid, samples):
+        """Merge one drain() result from process pid"""
+        if not samples:
+            return
+        totals = self.workers.setdefault(pid, {})
+        for name, values in samples.items():
+            self.samples.setdefault(name, []).extend(values)
+            totals[name] = totals.get(name, 0.0) + sum(values)
+
+    def _ordered(self):
+        known = [name for name in STAGES if name in self.samples]
+        return known + sorted(set(self.samples) - set(known))
+
+    def summary(self):
+        """{stage: {count, total_s, mean_ms, p50_ms, ..., max_ms, histogram}}"""
+        stages = {}
+        for name in self._ordered():
+            values = sorted(self.samples[name])
+            entry = {'count': len(values), 'total_s': round(sum(values), 6),
+                     'mean_ms': round(sum(values) / len(values) * 1000, 3)}
+            for pct in PERCENTILES:
+                entry[f"p{pct}_ms"] = round(percentile(values, pct) * 1000, 3)
+            entry['max_ms'] = round(values[-1] * 1000, 3)
+            entry['histogram'] = histogram(values)
+            stages[name] = entry
+        return stages
+
+    def save(self, path):
+        """Write the JSON report; merge worker cProfile dumps if there are any"""
+        report = {
+            'stages': self.summary(),
+            'workers': {str(pid): {name: round(total, 6) for name, total in totals.items()}
+                        for pid, totals in sorted(self.workers.items())},
+        }
+        combined = self.merge_profiles()
+        if combined:
+            report['cprofile'] = str(combined)
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+        return path
+
+    def merge_profiles(self):
+        """Combine the worker-<pid>.pstats dumps from this run into combined.pstats"""
+        if self.profile_dir is None:
+            return None
+        dump_profile()  # This process's renders (workers dumped theirs when they exited)
+        dumps = [self.profile_dir / f"worker-{pid}.pstats" for pid in sorted(self.workers)]
+        dumps = [str(dump) for dump in dumps if dump.exists()]
+        if not dumps:
+            return None
+        import pstats
+        combined = self.profile_dir / 'combined.pstats'
+        pstats.Stats(*dumps).dump_stats(combined)
+        return combined
+
+    def format(self):
+        """Report lines for the console"""
+        stages = self.summary()
+        if not stages:
+            return "⏱️  Stage timings: nothing was timed"
+        badge_total = stages.get('badge', {}).get('total_s') or sum(s['total_s'] for s in stages.values())
+        lines = [f"⏱️  Stage timings ({len(self.workers)} process{'es' if len(self.workers) != 1 else ''}):"]
+        for name, entry in stages.items():
+            share = f" {entry['total_s'] / badge_total:4.0%}" if name != 'badge' and badge_total else '     '
+            lines.append(f"   {name:<10} n={entry['count']:<6} p50 {entry['p50_ms']:7.2f}  "
+                         f"p95 {entry['p95_ms']:7.2f}  p99 {entry['p99_ms']:7.2f} ms  "
+                         f"total {entry['total_s']:7.2f}s{share}")
+        return '\n'.join(lines)
@@ -0,0 +1,92 @@
+"""
+Rosters read straight from Supabase's PostgREST API.
+
+EVENTS_DATA and STUDENTS_DATA are pasted by hand from a Supabase export, so
+they go stale, and a large intake means exporting a large blob. With
+--input supabase (or a full https://<project>.supabase.co/rest/v1/<table>?...
+URL) the generators read the table itself:
+
+- keyset pagination: every page is order=id.asc&id=gt.<last id>&limit=N, an
+  index range scan however deep into the table it is (offset pagination
+  makes the database skip over every earlier row again, page after page)
+- concurrent prefetch: the key space is split at evenly spaced ids into one
+  range per connection and all ranges are paged at once; pages are handed
+  on in key order, at most PREFETCH pages ahead per range
+- a pooled keep-alive HTTP/1.1 client on asyncio streams (standard library
+  only, TLS for https URLs)
+
+The client lives in postgrest_client and is only imported once a table is
+read, so the generators don't load asyncio and ssl for file rosters.
+
+The project URL and API key come from SUPABASE_URL and SUPABASE_KEY (or the
+web app's NEXT_PUBLIC_SUPABASE_URL and NEXT_PUBLIC_SUPABASE_ANON_KEY). Any
+PostgREST server works, e.g. a local stand-in at http://127.0.0.1:3000/events
+with no key.
+"""
+import os
+
+from roster_input import record_columns
+
+DEFAULT_PAGE_SIZE = 1000  # Supabase's default cap on rows per response
+DEFAULT_CONNECTIONS = 4
+
+URL_ENV = ('SUPABASE_URL', 'NEXT_PUBLIC_SUPABASE_URL')
+KEY_ENV = ('SUPABASE_KEY', 'SUPABASE_ANON_KEY', 'NEXT_PUBLIC_SUPABASE_ANON_KEY')
+
+
+class RosterFetchError(Exception):
+    """The roster server can't be reached or answered with an error"""
+
+
+def is_postgrest(source):
+    """Whether an --input value names a PostgREST table rather than a file"""
+    return source == 'supabase' or str(source).startswith(('http://', 'https://'))
+
+
+def _env(names):
+    return next((os.environ[name] for name in names if os.environ.get(name)), None)
+
+
+def table_url(source, table):
+    """The table endpoint: $SUPABASE_URL/rest/v1/<table> for 'supabase', else the URL as given"""
+    if source != 'supabase':
+        return source
+    base = _env(URL_ENV)
+    if not base:
+        raise RosterFetchError(f"--input supabase needs {' or '.join(URL_ENV)} set to the project URL")
+    return f"{base.rstrip('/')}/rest/v1/{table}"
+
+
+def auth_headers(api_key):
+    if not api_key:
+        return {}
+    return {'apikey': api_key, 'Authorization': f"Bearer {api_key}"}
+
+
+def flatten_row(row):
+    """
+    One level of embedded resources merged into the row, so the columns of
+    e.g. select=id,event_name,clubs(club_name) read like a flat export.
+    The row's own columns win over embedded ones.
+    """
+    flat = {name: value for name, value in row.items() if not isinstance(value, (dict, list))}
+    for value in row.values():
+        if isinstance(value, dict):
+            for name, nested in value.items():
+                if not isinstance(nested, (dict, list)):
+                    flat.setdefault(name, nested)
+    return flat
+
+
+def iter_records(source, table, select, fields, key='id', page_size=DEFAULT_PAGE_SIZE,
+                 connections=DEFAULT_CONNECTIONS):
+    """
+    Stream (row_number, columns) from a PostgREST table, like
+    roster_input.iter_records does from a file (fields as for JSONL).
+    """
+    from postgrest_client import iter_rows
+    rows = iter_rows(table_url(source, table), key, select, page_size, connections, api_key=_env(KEY_ENV))
+    for row_number, row in enumerate(rows, 1):
+        columns = record_columns(flatten_row(row), fields)
+        if columns:
+            yield row_number, columns
@@ -0,0 +1,198 @@
+"""
+Vector (SVG) badges.
+
+The raster pipeline draws every module, resamples, composites and then
+deflates a 1000px+ image for each badge. An SVG badge is a few kilobytes of
+text instead, built straight from the module matrix, and scales to any print
+size:
+
+- dark data modules become one path of horizontal runs (one subpath per run
+  of adjacent modules in a row, not one per module)
+- the three position-marker rings are one path of rounded module squares,
+  the same shapes VercelStyleModuleDrawer draws
+- the logo disc is either embedded as a JPEG data URI (flattened onto white,
+  a fraction of the size of an RGBA PNG) or linked to the logo file, and cut
+  to a circle in SVG
+- labels are <text> elements laid out with the same measurements as the PNG
+  labels (see label_render)
+
+Coordinates inside the QR group are in modules and scaled to pixels once.
+"""
+import base64
+import io
+from collections import OrderedDict
+
+from function_patterns import FINDER, pattern_index_for_size
+
+SVG_LOGO_MODES = ('embed', 'link')
+
+JPEG_QUALITY = 90  # Embedded logo discs
+MAX_DATA_URIS = 64  # Encoded logo discs kept, as many as logo_cache keeps discs
+
+_ATTR_ENTITIES = {'"': '&quot;', "'": '&apos;'}
+
+
+def _number(value):
+    """Compact SVG number: no trailing zeros, at most three decimals"""
+    return f"{round(value, 3):g}"
+
+
+def _color(color):
+    """SVG colour from a PIL-style RGB tuple or a name"""
+    if isinstance(color, str):
+        return color
+    return '#{:02x}{:02x}{:02x}'.format(*color[:3])
+
+
+def module_runs_path(modules, skip=None):
+    """
+    Path data for the dark modules as merged horizontal runs, in module units.
+
+    Modules where skip[row][col] is true are left out.
+    """
+    parts = []
+    for row, line in enumerate(modules):
+        col = 0
+        count = len(line)
+        while col < count:
+            if not line[col] or (skip and skip[row][col]):
+                col += 1
+                continue
+            start = col
+            while col < count and line[col] and not (skip and skip[row][col]):
+                col += 1
+            parts.append(f"M{start} {row}h{col - start}v1h-{col - start}z")
+    return ''.join(parts)
+
+
+def rounded_modules_path(positions, radius_ratio):
+    """Path data for one rounded square per (row, col), in module units"""
+    r = _number(radius_ratio)
+    side = _number(1 - 2 * radius_ratio)
+    corner = f"a{r} {r} 0 0 1"
+    return ''.join(
+        f"M{_number(col + radius_ratio)} {row}h{side}{corner} {r} {r}v{side}"
+        f"{corner} -{r} {r}h-{side}{corner} -{r} -{r}v-{side}{corner} {r} -{r}z"
+        for row, col in positions
+    )
+
+
+_data_uris = OrderedDict()  # id(image) -> (image, URI), least recently used first
+
+
+def jpeg_data_uri(image):
+    """
+    data: URI of an image as JPEG, transparency flattened onto white.
+
+    Encoded once per image object (logo discs are shared across badges);
+    the MAX_DATA_URIS most recently used are kept.
+    """
+    cached = _data_uris.get(id(image))
+    if cached is not None and cached[0] is image:
+        _data_uris.move_to_end(id(image))
+    else:
+        flat = image.convert('RGB')
+        if image.mode in ('RGBA', 'LA'):
+            from PIL import Image
+            flat = Image.new('RGB', image.size, 'white')
+            flat.paste(image, (0, 0), image)
+        buffer = io.BytesIO()
+        flat.save(buffer, format='JPEG', quality=JPEG_QUALITY)
+        cached = (image, 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii'))
+        _data_uris[id(image)] = cached
+        _data_uris.move_to_end(id(image))
+        while len(_data_uris) > MAX_DATA_URIS:
+            _data_uris.popitem(last=False)
+    return cached[1]
+
+
+class SvgBadge:
+    """An SVG document assembled element by element"""
+
+    def __init__(self, width, height, background='white'):
+        self.width = width
+        self.height = height
+        self._defs = []
+        self._body = [f'<rect width="{width}" height="{height}" fill="{_color(background)}"/>']
+
+    def add_qr(self, modules, border, size, radius_ratio=0.3, color='black', position=(0, 0)):
+        """
+        Draw a module matrix (quiet zone included) into a size x size square.
+
+        Position-marker rings get rounded modules like VercelStyleImage; every
+        other dark module is square.
+        """
+        count = len(modules)
+        scale = size / (count + 2 * border)
+        index = pattern_index_for_size(count)
+        rings = [[cls == FINDER for cls in row] for row in index]
+        ring_modules = [(row, col) for row in range(count) for col in range(count)
+                        if rings[row][col] and modules[row][col]]
+
+        x, y = position
+        fill = _color(color)
+        self._body.append(
+            f'<g transform="translate({_number(x + border * scale)} {_number(y + border * scale)}) '
+            f'scale({_number(scale)})" fill="{fill}">'
+            f'<path shape-rendering="crispEdges" d="{module_runs_path(modules, rings)}"/>'
+            f'<path d="{rounded_modules_path(ring_modules, radius_ratio)}"/>'
+            '</g>'
+        )
+
+    def add_disc_image(self, href, center, size, padding=0):
+        """
+        A size x size image centred on center and cut to a circle, on a white
+        disc padding wider: the vector counterpart of logo_cache.build_logo_disc.
+
+        href is a URL or file path relative to the SVG, or a data URI (see
+        jpeg_data_uri).
+        """
+        from xml.sax.saxutils import quoteattr  # pulls in urllib.request
+        cx, cy = center
+        clip_id = f"disc{len(self._defs)}"
+        self._defs.append(
+            f'<clipPath id="{clip_id}"><circle cx="{_number(cx)}" cy="{_number(cy)}" '
+            f'r="{_number(size / 2)}"/></clipPath>'
+        )
+        if padding:
+            self._body.append(
+                f'<circle cx="{_number(cx)}" cy="{_number(cy)}" r="{_number(size / 2 + padding)}" fill="white"/>'
+            )
+        self._body.append(
+            f'<image x="{_number(cx - size / 2)}" y="{_number(cy - size / 2)}" '
+            f'width="{size}" height="{size}" preserveAspectRatio="xMidYMid meet" '
+            f'clip-path="url(#{clip_id})" xlink:href={quoteattr(href)}/>'
+        )
+
+    def add_text(self, run, position, color, bold=False):
+        """
+        Draw a label_render.LabelRun with its PIL draw origin at position.
+
+        The text is centred on the run's ink box, so it stays centred if the
+        viewer substitutes a font with different metrics.
+        """
+        from xml.sax.saxutils import escape
+        x, y = position
+        font = run.font
+        size = getattr(font, 'size', 10)
+        ascent = font.getmetrics()[0] if hasattr(font, 'getmetrics') else size
+        family = font.getname()[0] if hasattr(font, 'getname') else None
+        families = f"'{escape(family, _ATTR_ENTITIES)}', sans-serif" if family else 'sans-serif'
+        weight = ' font-weight="bold"' if bold else ''
+        self._body.append(
+            f'<text x="{_number(x + run.bbox[0] + run.width / 2)}" y="{y + ascent}" '
+            f'text-anchor="middle" font-family="{families}" font-size="{size}"{weight} '
+            f'fill="{_color(color)}">{escape(run.text)}</text>'
+        )
+
+    def tostring(self):
+        defs = f"<defs>{''.join(self._defs)}</defs>" if self._defs else ''
+        return (
+            '<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+            f'width="{self.width}" height="{self.height}" viewBox="0 0 {self.width} {self.height}">'
+            f'{defs}{"".join(self._body)}</svg>\n'
+        )
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.tostring())
@@ -0,0 +1,52 @@
+"""
+NumpyMaskQRCode must pick the mask qrcode picks and build the same matrix.
+
+Run with:
+    python -m pytest test_numpy_encoder.py
+"""
+import pytest
+import qrcode
+from qrcode.constants import ERROR_CORRECT_H, ERROR_CORRECT_L, ERROR_CORRECT_M, ERROR_CORRECT_Q
+
+from numpy_encoder import NumpyMaskQRCode, sample_payloads, verify_against_qrcode
+
+ERROR_CORRECTION_LEVELS = {'L': ERROR_CORRECT_L, 'M': ERROR_CORRECT_M, 'Q': ERROR_CORRECT_Q, 'H': ERROR_CORRECT_H}
+
+# What the generators encode (event, student and --compact badges), plus
+# numeric, alphanumeric and long byte-mode payloads reaching larger versions
+FIXED_PAYLOADS = (
+    "https://apexgne.vercel.app//scan?event=6d1f2c3a-8b4e-4f0a-9c7d-2e5b1a0f3c9d",
+    "https://apexgne.vercel.app//clubdashboard?student_id=085f",
+    "https://apexgne.vercel.app//clubdashboard?student_id=085f3c1e",
+    "HTTPS://APEXGNE.VERCEL.APP/S/6D1F",
+    "HTTPS://APEXGNE.VERCEL.APP/C/085F",
+    "0123456789" * 3,
+    "A",
+    "Battle of Bands | Pixel Palette | Poetry Slam " * 6,
+)
+
+
+def encode(factory, payload, error_correction):
+    """(chosen mask, final matrix) of payload encoded by factory"""
+    qr = factory(error_correction=error_correction)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    modules = [list(row) for row in qr.modules]
+    # best_mask_pattern() rebuilds qr.modules in test mode, so copy them first
+    return qr.best_mask_pattern(), modules
+
+
+@pytest.mark.parametrize('level', ERROR_CORRECTION_LEVELS)
+@pytest.mark.parametrize('payload', FIXED_PAYLOADS)
+def test_same_mask_and_matrix(payload, level):
+    error_correction = ERROR_CORRECTION_LEVELS[level]
+    mask, modules = encode(NumpyMaskQRCode, payload, error_correction)
+    expected_mask, expected_modules = encode(qrcode.QRCode, payload, error_correction)
+    assert mask == expected_mask
+    assert modules == expected_modules
+
+
+@pytest.mark.parametrize('level', ERROR_CORRECTION_LEVELS)
+def test_sample_payloads(level):
+    mismatches, _, _ = verify_against_qrcode(sample_payloads(30), ERROR_CORRECTION_LEVELS[level])
+    assert mismatches == []
@@ -0,0 +1,7 @@
+import { compactRedirect } from '@/lib/compact-ids'
+
+// Compact student badges: /C/<short id> -> /clubdashboard?student_id=<student id>
+export async function GET(request, { params }) {
+  const { id } = await params
+  return compactRedirect(request, 'C', id)
+}
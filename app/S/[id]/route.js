@@ -0,0 +1,7 @@
+import { compactRedirect } from '@/lib/compact-ids'
+
+// Compact event badges: /S/<short id> -> /scan?event=<event id>
+export async function GET(request, { params }) {
+  const { id } = await params
+  return compactRedirect(request, 'S', id)
+}
@@ -0,0 +1,19 @@
+import { NextResponse } from 'next/server'
+import decodeTable from '@/lib/compact-ids.json'
+
+// Compact badge URLs (HTTPS://APEXGNE.VERCEL.APP/S/<short id>) encode in QR
+// alphanumeric mode; the QR generators' --compact option writes the short IDs
+// into lib/compact-ids.json, and these redirects turn them back into the
+// regular /scan and /clubdashboard links
+export function compactRedirect(request, route, shortId) {
+  const target = decodeTable.routes?.[route]
+  const fullId = decodeTable.ids?.[route]?.[shortId.toUpperCase()]
+
+  if (!target || !fullId) {
+    return NextResponse.json({ error: 'Unknown badge link' }, { status: 404 })
+  }
+
+  const url = new URL(target.path, request.url)
+  url.searchParams.set(target.param, fullId)
+  return NextResponse.redirect(url)
+}